@@ -1,15 +1,35 @@
 import numpy as np
 import pandas as pd
-from astropy.table import Table
 import matplotlib.pyplot as plt
 from scipy.stats import norm
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.catalogo_sdss import carregar_dr16q, COLUNAS_DR16Q
+from trr_core.mapas_ceu import carregar_dr16q_pixels, gravar_mapas_fits, mapas_residuos
+from trr_core.permutacao import teste_permutacao_correlacao, significancia_permutacao
+from trr_core.rastreio import etapa
+from trr_core.tomografia import janelas_todas, mapa_correlacao, nulo_janelas, preparar_tomografia
 
 # CONFIGURAÇÕES HARVARD-TRR (Estratigrafia Cósmica)
 CAMINHO_SDSS = r"C:\Users\JM\tese\novos_testes\DR16Q_Superset_v3.fits"
 D0_NOMINAL = 0.794
 OMEGA_P = 1128.0
 DIRECAO_INI = 148.9 # Eixo Primordial (Volume I)
+N_SHUFFLES = 100000 # Embaralhamentos da Hipótese Nula
+N_WORKERS = None    # None = todos os núcleos
+SEMENTE = 20260101  # Semente fixa: nulo reprodutível para qualquer N_WORKERS
+
+# TOMOGRAFIA EM REDSHIFT (todas as janelas [z_lo, z_hi) da grade, não só o estrato 1.5-2.0)
+EXECUTAR_TOMOGRAFIA = False  # Opcional: 630 janelas x N_SHUFFLES_TOMOGRAFIA permutações além da auditoria
+BORDAS_Z = np.round(np.arange(0.5, 4.01, 0.1), 10)
+N_SHUFFLES_TOMOGRAFIA = 1000
+
+# MAPAS HEALPIX (RA e DEC: o sinal está espalhado no céu ou em poucas bordas do footprint?)
+EXECUTAR_MAPAS = False  # Opcional: mapas HEALPix em cada NSIDES_MAPAS além da auditoria
+NSIDES_MAPAS = (64, 128, 256)
+FRACAO_TOPO = 0.05  # Fração dos pixels de maior contribuição reportada
 
 def auditoria_sdss_final_blindada():
     print("="*80)
@@ -20,41 +40,30 @@ def auditoria_sdss_final_blindada():
         print(f"ERRO: Arquivo {CAMINHO_SDSS} não encontrado!")
         return
 
-    # 1. Carregamento e Tradução de Bytes
-    dat = Table.read(CAMINHO_SDSS, format='fits')
-    def to_native(arr): return arr.byteswap().view(arr.dtype.newbyteorder('='))
-    
-    ra = to_native(np.array(dat['RA']))
-    z = to_native(np.array(dat['Z']))
-    mag_i = to_native(np.array(dat['PSFMAG'][:, 3]))
-
-    # 2. Filtro do Estrato de Ressonância (Onde a fase atinge (2n+1)pi)
+    # 1. Carregamento Colunar (memmap + cache nativo) com o Filtro do Estrato
+    # de Ressonância (Onde a fase atinge (2n+1)pi) aplicado já na leitura.
     # A inversão ocorre por ser um campo de Spin-2 em oposição de fase
-    mask = (z > 1.5) & (z < 2.0) & (mag_i > 10) & (mag_i < 25)
-    ra_f, z_f, mag_f = ra[mask], z[mask], mag_i[mask]
+    cat = carregar_dr16q(CAMINHO_SDSS, cortes={'z': (1.5, 2.0), 'mag_i': (10, 25)})
+    ra_f, z_f, mag_f = cat['ra'], cat['z'], cat['mag_i']
     
-    # Hubble Detrending
-    residuos = mag_f - (5 * np.log10(z_f))
-    residuos -= np.mean(residuos)
+    with etapa('sdss.detrending', linhas=len(z_f)):
+        # Hubble Detrending
+        residuos = mag_f - (5 * np.log10(z_f))
+        residuos -= np.mean(residuos)
 
-    # 3. Predição da Rotação de Cortez (Paridade de Spin-2)
-    fase = (DIRECAO_INI + (OMEGA_P / z_f)) % 360
-    # BLINDAGEM: O sinal negativo (-) prova a natureza tensorial (ressonância de paridade)
-    predicao = - (D0_NOMINAL * z_f * np.cos(np.radians(ra_f - fase)))
+        # 3. Predição da Rotação de Cortez (Paridade de Spin-2)
+        fase = (DIRECAO_INI + (OMEGA_P / z_f)) % 360
+        # BLINDAGEM: O sinal negativo (-) prova a natureza tensorial (ressonância de paridade)
+        predicao = - (D0_NOMINAL * z_f * np.cos(np.radians(ra_f - fase)))
 
-    r_obs = np.corrcoef(residuos, predicao)[0, 1]
-
-    # 4. Monte Carlo (1000 Shuffles) - Destruição da Hipótese Nula
-    print(f"Processando 1000 shuffles de Monte Carlo no estrato z~1.7...")
-    r_null = []
-    res_shf = residuos.copy()
-    for _ in range(1000):
-        np.random.shuffle(res_shf)
-        r_null.append(np.corrcoef(res_shf, predicao)[0, 1])
-
-    mu_null = np.mean(r_null)
-    std_null = np.std(r_null)
-    sigma = (r_obs - mu_null) / std_null
+    # 4. Monte Carlo (Shuffles em blocos) - Destruição da Hipótese Nula
+    # A predição é padronizada uma única vez; cada bloco de embaralhamentos
+    # vira um produto matriz-vetor distribuído entre os núcleos.
+    print(f"Processando {N_SHUFFLES} shuffles de Monte Carlo no estrato z~1.7...")
+    with etapa('sdss.monte_carlo', linhas=N_SHUFFLES * len(z_f), n_shuffles=N_SHUFFLES):
+        r_obs, r_null = teste_permutacao_correlacao(residuos, predicao, n_perm=N_SHUFFLES,
+                                                    semente=SEMENTE, n_workers=N_WORKERS)
+        sigma, p_valor = significancia_permutacao(r_obs, r_null)
 
     # 5. PREDIÇÃO PARA ONDAS GRAVITACIONAIS (FARADAY GRAVITACIONAL)
     # Rotação prevista da polarização das GWs para o estrato z=1.7
@@ -75,14 +84,83 @@ def auditoria_sdss_final_blindada():
     plt.text(0.05, 0.95, f"Predição Faraday GW (z=1.7): {rotacao_gw_prevista:.2f}°", 
              transform=plt.gca().transAxes, fontsize=10, bbox=dict(facecolor='white', alpha=0.5))
 
-    plt.savefig("auditoria_sdss_spin2_blindada.png", dpi=150)
+    with etapa('sdss.grafico'):
+        plt.savefig("auditoria_sdss_spin2_blindada.png", dpi=150)
     
     print("\n" + "="*80)
     print(f"VEREDITO FINAL: SIGNIFICÂNCIA DE {sigma:.2f} SIGMAS")
+    print(f"P-VALOR EMPÍRICO ({N_SHUFFLES} shuffles): {p_valor:.2e}")
     print(f"A antirrelação confirma a inversão de paridade tensorial (Spin-2).")
     print(f"ASSINATURA FUTURA (LIGO): Rotação de polarização de {rotacao_gw_prevista:.2f}° prevista para z~1.7.")
     print("="*80)
     plt.show()
 
+def tomografia_sdss():
+    print("="*80)
+    print(f"TOMOGRAFIA TRR EM REDSHIFT: {len(BORDAS_Z) - 1} bins de {BORDAS_Z[0]} a {BORDAS_Z[-1]}")
+    print("="*80)
+
+    # Uma leitura e uma ordenação por z: cada janela sai das somas cumulativas
+    cat = carregar_dr16q(CAMINHO_SDSS, cortes={'z': (BORDAS_Z[0], BORDAS_Z[-1]), 'mag_i': (10, 25)})
+    with etapa('sdss.tomografia', linhas=len(cat['z'])):
+        tomo = preparar_tomografia(cat['z'], cat['ra'], cat['mag_i'], BORDAS_Z, D0_NOMINAL, OMEGA_P, DIRECAO_INI)
+        mapa = mapa_correlacao(tomo)
+        i, j = janelas_todas(len(BORDAS_Z))
+        nulo = nulo_janelas(tomo, i, j, N_SHUFFLES_TOMOGRAFIA, SEMENTE, N_WORKERS)
+
+    k = np.nanargmax(np.abs(nulo['sigma_local']))
+    estrato = np.flatnonzero(np.isclose(BORDAS_Z[i], 1.5) & np.isclose(BORDAS_Z[j], 2.0))
+    if estrato.size:
+        e = estrato[0]
+        print(f"Estrato 1.5 <= z < 2.0: r = {nulo['r_obs'][e]:.5f} | {nulo['sigma_local'][e]:.2f} sigma local "
+              f"({nulo['sigma_padronizado'][e]:.2f} contra o nulo simulado) | p = {nulo['p_valor'][e]:.2e}")
+    print(f"Janela mais extrema: {BORDAS_Z[i[k]]:.2f} <= z < {BORDAS_Z[j[k]]:.2f} | r = {nulo['r_obs'][k]:.5f} "
+          f"| {nulo['sigma_local'][k]:.2f} sigma local ({nulo['sigma_padronizado'][k]:.2f} contra o nulo simulado) "
+          f"(n = {nulo['n'][k]})")
+    print(f"Look-elsewhere ({len(i)} janelas, {N_SHUFFLES_TOMOGRAFIA} shuffles dentro dos bins): "
+          f"p global = {nulo['p_global']:.2e} | {nulo['sigma_global']:.2f} sigma")
+
+    plt.figure(figsize=(9, 7))
+    plt.imshow(mapa.T, origin='lower', cmap='RdBu_r', aspect='auto',
+               extent=(BORDAS_Z[0], BORDAS_Z[-1], BORDAS_Z[0], BORDAS_Z[-1]))
+    plt.colorbar(label='Correlação r')
+    plt.xlabel("z mínimo da janela")
+    plt.ylabel("z máximo da janela")
+    plt.title("Tomografia TRR: r(z_lo, z_hi) no SDSS DR16Q")
+    plt.savefig("auditoria_sdss_tomografia.png", dpi=150)
+    plt.show()
+
+def mapas_ceu_sdss():
+    print("="*80)
+    print(f"MAPAS HEALPIX DO ESTRATO z~1.7 (nside {', '.join(map(str, NSIDES_MAPAS))})")
+    print("="*80)
+
+    # Pixels calculados uma vez por nside e guardados no cache colunar do catálogo
+    cat = carregar_dr16q_pixels(CAMINHO_SDSS, NSIDES_MAPAS, colunas=dict(COLUNAS_DR16Q, dec=('DEC', None)),
+                                cortes={'z': (1.5, 2.0), 'mag_i': (10, 25)})
+    z_f = cat['z']
+    residuos = cat['mag_i'] - (5 * np.log10(z_f))
+    residuos -= np.mean(residuos)
+    predicao = - (D0_NOMINAL * z_f * np.cos(np.radians(cat['ra'] - (DIRECAO_INI + (OMEGA_P / z_f)) % 360)))
+    predicao -= np.mean(predicao)
+
+    for nside in NSIDES_MAPAS:
+        with etapa('sdss.mapas', linhas=len(z_f), nside=nside):
+            mapas = mapas_residuos(cat[f"pix_{nside}"], residuos, predicao, nside)
+            arquivo = f"auditoria_sdss_mapas_n{nside}.fits"
+            gravar_mapas_fits(arquivo, mapas, nside)
+
+        # Concentração: quanto da contribuição absoluta ao r vem dos pixels mais fortes
+        ocupados = mapas['contagem'] > 0
+        contrib = np.sort(np.abs(mapas['contribuicao'][ocupados]))[::-1]
+        n_topo = max(1, int(np.ceil(FRACAO_TOPO * len(contrib))))
+        print(f"nside {nside}: {ocupados.sum()} pixels ocupados | r global = {mapas['contribuicao'].sum():.5f} | "
+              f"{FRACAO_TOPO:.0%} dos pixels = {contrib[:n_topo].sum() / contrib.sum():.1%} da contribuição absoluta "
+              f"-> {arquivo}")
+
 if __name__ == "__main__":
-    auditoria_sdss_final_blindada()
\ No newline at end of file
+    auditoria_sdss_final_blindada()
+    if EXECUTAR_TOMOGRAFIA and os.path.exists(CAMINHO_SDSS):
+        tomografia_sdss()
+    if EXECUTAR_MAPAS and os.path.exists(CAMINHO_SDSS):
+        mapas_ceu_sdss()
\ No newline at end of file
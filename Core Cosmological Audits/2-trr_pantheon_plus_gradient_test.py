@@ -1,47 +1,51 @@
-import pandas as pd
 import numpy as np
-from astropy.coordinates import SkyCoord
-import astropy.units as u
 from astropy.io import fits
 from scipy.optimize import least_squares
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.coordenadas import vetores_catalogo, vetores_para_lonlat
+from trr_core.dipolo import DipoloLinear, vetor_para_dipolo
+from trr_core.pantheon import ler_pantheon, carregar_cholesky
+from trr_core.permutacao import gerar_blocos_permutados
+from trr_core.rastreio import etapa, rastrear
 
 # Ajuste para sua pasta de trabalho
 os.chdir(r"C:\Users\JM\tese\novos_testes")
 
-def executar_auditoria_pantheon_corrigida(file_name):
+N_MC = 100000       # Embaralhamentos do Monte Carlo (modo linear)
+SEMENTE = 20260101  # Semente fixa: nulo reprodutível
+ARQUIVO_COV = None  # Ex.: 'Pantheon+SH0ES_STAT+SYS.cov' (None = apenas pesos diagonais)
+
+@rastrear('executar_auditoria_pantheon_corrigida')
+def executar_auditoria_pantheon_corrigida(file_name, modo='linear', n_mc=N_MC, arquivo_cov=ARQUIVO_COV):
+    """
+    modo='linear': solução fechada z * (v . n) e Monte Carlo em lote (padrão).
+    modo='least_squares': ajuste não-linear original (100 embaralhamentos seriais).
+    arquivo_cov: covariância STAT+SYS completa (somente no modo linear).
+    """
     print(f"\n--- INICIANDO AUDITORIA DE ALTA PRECISÃO (TRR): {file_name} ---")
     try:
-        # 1. Carregamento
-        df = pd.read_csv(file_name, sep=None, engine='python')
-
-        # 2. Mapeamento Estrito
-        cols = {c.lower(): c for c in df.columns}
-        z_name = cols.get('zcmb') or cols.get('z')
-        m_name = cols.get('mu_shoes') or cols.get('mu_pantheon') or cols.get('m_b_corr')
-        ra_name = cols.get('ra')
-        dec_name = cols.get('dec')
-        err_name = cols.get('mu_err') or cols.get('mu_err_shoes')
-
-        if m_name is None:
-            raise KeyError("ERRO: Módulo de distância (MU) não encontrado.")
+        # 1. Carregamento (motor C tipado) e 2. Mapeamento Estrito (lembrado em disco)
+        with etapa('pantheon.leitura') as e:
+            dados = ler_pantheon(file_name)
+            e.linhas = len(dados['z'])
 
         # 3. Limpeza e Filtro z > 0.02
-        df = df.dropna(subset=[z_name, m_name, ra_name, dec_name]).copy()
-        df = df[df[z_name] > 0.02].copy()
+        filtro = dados['z'] > 0.02
+        z = dados['z'][filtro]
+        mu_obs = dados['mu'][filtro]
+        mu_err = dados['mu_err'][filtro] if dados['mu_err'] is not None else np.ones_like(z) * 0.15
 
-        z = df[z_name].values.astype(float)
-        mu_obs = df[m_name].values.astype(float)
-        mu_err = df[err_name].values.astype(float) if err_name else np.ones_like(z) * 0.15
-
-        # 4. Coordenadas Galácticas e Resíduos
-        coords = SkyCoord(ra=df[ra_name].values*u.degree, dec=df[dec_name].values*u.degree, frame='icrs')
-        l_gal = coords.galactic.l.radian
-        b_gal = coords.galactic.b.radian
+        # 4. Coordenadas Galácticas (rotação 3x3 em vetores unitários) e Resíduos
+        with etapa('pantheon.coordenadas', linhas=len(z)):
+            n_gal = vetores_catalogo(file_name, dados['ra'][filtro], dados['dec'][filtro], 'galactic')
+            l_gal, b_gal = np.radians(vetores_para_lonlat(n_gal))
         
-        # Detrending (Isolando a anisotropia)
-        residuos = mu_obs - (5 * np.log10(z))
-        residuos -= np.mean(residuos)
+            # Detrending (Isolando a anisotropia)
+            residuos = mu_obs - (5 * np.log10(z))
+            residuos -= np.mean(residuos)
         
         pesos_norm = 1.0 / mu_err # Peso linear para o least_squares
 
@@ -52,33 +56,62 @@ def executar_auditoria_pantheon_corrigida(file_name):
             return ((d0 * z_in) * cos_t - res_in) * w_in
 
         # 6. Ajuste Real (O sinal da TRR)
-        print("Calculando Gradiente Anisotrópico Real...")
-        x0 = [0.1, np.radians(148), np.radians(-5)]
-        res_real = least_squares(cost_func, x0, args=(l_gal, b_gal, z, residuos, pesos_norm), 
-                                 bounds=([0, 0, -np.pi/2], [2.0, 2*np.pi, np.pi/2]))
-        
-        d0_final = res_real.x[0]
-        l_final, b_final = np.degrees(res_real.x[1]), np.degrees(res_real.x[2])
+        if modo == 'linear':
+            # d0 * z * cos_t = z * (v . n): regressão linear ponderada exata
+            # Com a covariância STAT+SYS, ajuste real e nulo usam o mesmo fator de Cholesky
+            with etapa('pantheon.cholesky', linhas=len(z)):
+                L = carregar_cholesky(arquivo_cov, dados['linha'][filtro]) if arquivo_cov else None
+            print("Calculando Gradiente Anisotrópico Real (solução linear exata)...")
+            with etapa('pantheon.ajuste', linhas=len(z), modo=modo):
+                dipolo = DipoloLinear(n_gal, z, pesos_norm, cholesky=L)
+                v_real = dipolo.ajustar(residuos)
+                d0_final, l_final, b_final = vetor_para_dipolo(v_real)
+                fun_real = dipolo.residuos_ponderados(v_real, residuos)
 
-        # 7. TESTE MONTE CARLO SHUFFLE (A Prova de Fogo)
-        # Embaralhamos os resíduos para ver qual a chance do acaso gerar um D0 como o seu
-        print("Iniciando Simulação de Monte Carlo (100 iterações)...")
-        blind_d0s = []
-        residuos_shuffled = residuos.copy()
-        
-        for i in range(100):
-            np.random.shuffle(residuos_shuffled) # Destrói a correlação espacial
-            res_b = least_squares(cost_func, x0, args=(l_gal, b_gal, z, residuos_shuffled, pesos_norm), 
-                                 bounds=([0, 0, -np.pi/2], [2.0, 2*np.pi, np.pi/2]))
-            blind_d0s.append(res_b.x[0])
-            if (i+1) % 20 == 0: print(f"Simulação {i+1}/100 concluída...")
+            # 7. TESTE MONTE CARLO (A Prova de Fogo)
+            # Cada bloco de vetores nulos é resolvido de uma vez (um único solve 3x3)
+            print(f"Iniciando Simulação de Monte Carlo ({n_mc} iterações em lote)...")
+            with etapa('pantheon.monte_carlo', linhas=n_mc * len(z), n_mc=n_mc):
+                if L is None:
+                    # Erros independentes: embaralhar os resíduos preserva o nulo
+                    blind_d0s = np.concatenate([vetor_para_dipolo(dipolo.ajustar(bloco))[0]
+                                                for bloco in gerar_blocos_permutados(residuos, n_mc, SEMENTE)])
+                else:
+                    # Erros correlacionados: y = L eps, eps ~ N(0, I), com a mesma covariância do ajuste
+                    blind_d0s = vetor_para_dipolo(dipolo.nulo_correlacionado(n_mc, SEMENTE))[0]
+        else:
+            if arquivo_cov:
+                raise ValueError("A covariância completa exige modo='linear'.")
+            print("Calculando Gradiente Anisotrópico Real...")
+            x0 = [0.1, np.radians(148), np.radians(-5)]
+            with etapa('pantheon.ajuste', linhas=len(z), modo=modo):
+                res_real = least_squares(cost_func, x0, args=(l_gal, b_gal, z, residuos, pesos_norm), 
+                                         bounds=([0, 0, -np.pi/2], [2.0, 2*np.pi, np.pi/2]))
+            
+            d0_final = res_real.x[0]
+            l_final, b_final = np.degrees(res_real.x[1]), np.degrees(res_real.x[2])
+            fun_real = res_real.fun
+
+            # 7. TESTE MONTE CARLO SHUFFLE (A Prova de Fogo)
+            # Embaralhamos os resíduos para ver qual a chance do acaso gerar um D0 como o seu
+            print("Iniciando Simulação de Monte Carlo (100 iterações)...")
+            blind_d0s = []
+            residuos_shuffled = residuos.copy()
+            
+            with etapa('pantheon.monte_carlo', linhas=100 * len(z), n_mc=100):
+                for i in range(100):
+                    np.random.shuffle(residuos_shuffled) # Destrói a correlação espacial
+                    res_b = least_squares(cost_func, x0, args=(l_gal, b_gal, z, residuos_shuffled, pesos_norm), 
+                                         bounds=([0, 0, -np.pi/2], [2.0, 2*np.pi, np.pi/2]))
+                    blind_d0s.append(res_b.x[0])
+                    if (i+1) % 20 == 0: print(f"Simulação {i+1}/100 concluída...")
 
         # 8. Estatísticas Finais
         z_score = (d0_final - np.mean(blind_d0s)) / np.std(blind_d0s)
         
         n = len(z)
-        rss_trr = np.sum(res_real.fun**2)
-        rss_iso = np.sum((residuos * pesos_norm)**2)
+        rss_trr = np.sum(fun_real**2)
+        rss_iso = np.sum((dipolo.branquear(residuos) if modo == 'linear' else residuos * pesos_norm)**2)
         aic_trr = 2*3 + n * np.log(rss_trr/n)
         aic_iso = 2*0 + n * np.log(rss_iso/n)
         delta_aic = aic_trr - aic_iso
@@ -91,6 +124,7 @@ def executar_auditoria_pantheon_corrigida(file_name):
         print(f"GRADIENTE D0: {d0_final:.6f}")
         print(f"DIREÇÃO ENCONTRADA: l={l_final:.2f}°, b={b_final:.2f}°")
         print(f"AMOSTRA ÚTIL: {len(z)} Supernovas")
+        print(f"LIKELIHOOD: {'Covariância STAT+SYS completa' if arquivo_cov else 'Pesos diagonais (1/mu_err)'}")
         print("="*60)
 
     except Exception as e:
@@ -1,15 +1,41 @@
 import numpy as np
 import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.coordenadas import converter
+from trr_core.cmb import alm_do_arquivo, auditoria_eixos, eixo_galactico
+
+# Mapa SMICA local (ex.: COM_CMB_IQU-smica_2048_R3.00_full.fits). Ausente = eixo publicado.
+CAMINHO_MAPA_CMB = "COM_CMB_IQU-smica_2048_R3.00_full.fits"
+N_SIM_EIXOS = 10000
+SEMENTE_EIXOS = 2018
 
 def eq_to_gal(ra, dec):
-    """Conversão manual de Equatorial para Galáctica (sem astropy)"""
-    r_ra, r_dec = math.radians(ra), math.radians(dec)
-    ra_gp, dec_gp, l_cp = math.radians(192.85948), math.radians(27.12825), math.radians(122.93192)
-    sin_b = math.sin(r_dec) * math.sin(dec_gp) + math.cos(r_dec) * math.cos(dec_gp) * math.cos(r_ra - ra_gp)
-    b = math.asin(sin_b)
-    l = l_cp - math.atan2(math.cos(r_dec) * math.sin(r_ra - ra_gp), 
-                         math.cos(dec_gp) * math.sin(r_dec) - math.sin(dec_gp) * math.cos(r_dec) * math.cos(r_ra - ra_gp))
-    return math.degrees(l % (2*math.pi)), math.degrees(b)
+    """Conversão de Equatorial para Galáctica (sem astropy). Aceita escalares ou arrays."""
+    l, b = converter(ra, dec, 'icrs', 'galactic')
+    if np.ndim(l) == 0:
+        return float(l), float(b)
+    return l, b
+
+def medir_eixo_do_mal(caminho, referencia):
+    """
+    Eixos de quadrupolo e octopolo do mapa local (dispersão de momento
+    angular máxima) e o eixo médio dos dois, em (l, b) galácticos.
+    """
+    alm, coordsys = alm_do_arquivo(caminho)
+    res = auditoria_eixos(alm, n_sim=N_SIM_EIXOS, semente=SEMENTE_EIXOS)
+    for l, nome in ((2, 'Quadrupolo'), (3, 'Octopolo')):
+        l_gal, b_gal = eixo_galactico(res[l]['eixo'], coordsys, referencia)
+        print(f"[PLANCK]    {nome}: l={l_gal:.2f}°, b={b_gal:.2f}° | S={res[l]['S']:.4f} "
+              f"(p={res[l]['p_valor']:.4f}, {N_SIM_EIXOS} céus gaussianos)")
+    al = res['alinhamento']
+    print(f"[PLANCK]    Alinhamento Q-O: {al['angulo']:.2f}° (|cos|={al['cos']:.4f}, p={al['p_valor']:.4f})")
+
+    n2, n3 = res[2]['eixo'], res[3]['eixo']
+    medio = n2 + np.sign(n2 @ n3) * n3
+    return eixo_galactico(medio / np.linalg.norm(medio), coordsys, referencia)
 
 def calcular_concordancia_v3():
     print("="*70)
@@ -37,9 +63,14 @@ def calcular_concordancia_v3():
     l_predito = L_PRIMORDIAL + rotacao_efetiva
     b_predito = B_PRIMORDIAL # A latitude no Eixo do Mal é estável
     
-    # 4. DADOS REAIS DO PLANCK 2018 (SMICA)
-    l_planck_real = 237.00
-    b_planck_real = -20.00
+    # 4. DADOS REAIS DO PLANCK 2018 (SMICA): medidos do mapa local quando disponível
+    if CAMINHO_MAPA_CMB and os.path.exists(CAMINHO_MAPA_CMB):
+        l_planck_real, b_planck_real = medir_eixo_do_mal(CAMINHO_MAPA_CMB, (l_predito, b_predito))
+        origem_eixo = "medido"
+    else:
+        l_planck_real = 237.00
+        b_planck_real = -20.00
+        origem_eixo = "publicado"
     
     # 5. CÁLCULO DE ERRO E PRECISÃO (Divisor de 1.8 do Volume IV)
     erro_angular = math.sqrt((l_predito - l_planck_real)**2 + (b_predito - b_planck_real)**2)
@@ -50,7 +81,7 @@ def calcular_concordancia_v3():
     print("-" * 40)
     print(f"[RESULTADO] Longitude Predita: {l_predito:.2f}°")
     print(f"[RESULTADO] Latitude Predita:  {b_predito:.2f}°")
-    print(f"[PLANCK]    Eixo do Mal Real:   l=237.00°, b=-20.00°")
+    print(f"[PLANCK]    Eixo do Mal Real:   l={l_planck_real:.2f}°, b={b_planck_real:.2f}° ({origem_eixo})")
     print("-" * 40)
     print(f"[VEREDITO] Erro Residual: {erro_angular:.2f}°")
     print(f"[VEREDITO] CONCORDÂNCIA TRR-PLANCK: {precisao_trr:.2f}%")
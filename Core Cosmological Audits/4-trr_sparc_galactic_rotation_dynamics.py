@@ -1,46 +1,33 @@
-import pandas as pd
 import numpy as np
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.sparc import ArmazemSPARC
+from trr_core.grade_sparc import residuos_por_galaxia, varrer_grade
 
 # CONFIGURAÇÃO DE RIGOR MÁXIMO (SEM PARÂMETROS LIVRES)
 PASTA_DADOS = r'C:\Users\JM\tese\novos_testes\Rotmod_LTG'
 A0_FIXO = 1.2e-10  # A constante da TRR
 ML_ESTRITO = 0.5   # O valor físico real medido pelo Spitzer
+ML_BOJO = 0.7
 
-def lei_de_cortez_pura(rad, v_gas, v_disk, v_bul):
-    # Cálculo barônico sem qualquer ajuste artificial
-    v_bar_sq = v_gas**2 + (v_disk**2 * ML_ESTRITO) + (v_bul**2 * 0.7)
-    r_meters = rad * 3.086e19
-    
-    if r_meters <= 0 or v_bar_sq <= 0: return 0
-    
-    g_bar = (v_bar_sq * 1000**2) / r_meters
-    
-    # A equação fundamental da TRR (sem simplificações)
-    # g_total = g_bar / (1 - exp(-sqrt(g_bar / a0)))
-    g_total = g_bar / (1 - np.exp(-np.sqrt(g_bar / A0_FIXO)))
-    
-    return np.sqrt(g_total * r_meters) / 1000
+# GRADE DE SENSIBILIDADE (em torno de A0_FIXO)
+GRADE_A0 = np.geomspace(0.3e-10, 4.8e-10, 41)
+GRADE_ML_DISCO = np.linspace(0.2, 1.0, 33)
+GRADE_ML_BOJO = np.linspace(0.3, 1.1, 17)
 
 def auditoria_estrita():
     print("--- TRR: AUDITORIA DE RIGOR ABSOLUTO (SEM AJUSTES AD HOC) ---")
-    arquivos = [f for f in os.listdir(PASTA_DADOS) if f.endswith('.dat')]
-    log_erros = []
-
-    for arquivo in arquivos:
-        try:
-            df = pd.read_csv(os.path.join(PASTA_DADOS, arquivo), sep=r'\s+', comment='#', header=None,
-                             names=['Rad', 'Vobs', 'errV', 'Vgas', 'Vdisk', 'Vbul', 'SBdis', 'SBbul'])
-            df = df.apply(pd.to_numeric, errors='coerce').dropna(subset=['Vobs'])
-            
-            # Pegamos apenas os dados da borda (onde a Matéria Escura supostamente domina)
-            # É aqui que a TRR tem que provar seu valor
-            df_borda = df[df['Rad'] > df['Rad'].max() * 0.8] 
-
-            v_trr = df_borda.apply(lambda x: lei_de_cortez_pura(x['Rad'], x['Vgas'], x['Vdisk'], x['Vbul']), axis=1)
-            erro = np.mean(v_trr - df_borda['Vobs']) # Diferença real em km/s
-            log_erros.append(erro)
-        except: continue
+
+    # Pegamos apenas os dados da borda (onde a Matéria Escura supostamente domina)
+    # É aqui que a TRR tem que provar seu valor
+    armazem = ArmazemSPARC.carregar(PASTA_DADOS).somente_borda()
+
+    # Cálculo barônico sem qualquer ajuste artificial
+    # A equação fundamental da TRR (sem simplificações), vetorizada:
+    # g_total = g_bar / (1 - exp(-sqrt(g_bar / a0)))
+    log_erros = residuos_por_galaxia(armazem, A0_FIXO, ML_ESTRITO, ML_BOJO) # Diferença real em km/s
 
     media_residuo = np.mean(log_erros)
     desvio_padrao = np.std(log_erros)
@@ -54,5 +41,14 @@ def auditoria_estrita():
     else:
         print("[VIÉS] Existe um desvio sistemático que sugere calibração de escala.")
 
+    # Superfície de sensibilidade (a0, M/L disco, M/L bojo) em vez de um único número
+    grade = varrer_grade(armazem, GRADE_A0, GRADE_ML_DISCO, GRADE_ML_BOJO, n_workers=None)
+    minimo = grade['minimo']
+    print("-" * 50)
+    print(f"SENSIBILIDADE ({grade['rms'].size} pontos de grade):")
+    print(f"Mínimo RMS: {minimo['rms']:.2f} km/s em a0={minimo['a0']:.3e}, "
+          f"M/L disco={minimo['ml_disk']:.3f}, M/L bojo={minimo['ml_bul']:.3f}")
+    np.savez("sensibilidade_cortez_sparc.npz", **{k: v for k, v in grade.items() if k != 'minimo'})
+
 if __name__ == "__main__":
     auditoria_estrita()
\ No newline at end of file
@@ -1,61 +1,66 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import glob
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.acumulador_lageos import AcumuladorLAGEOS, mais_recentes
+from trr_core.orbita import residuos_orbita
+from trr_core.sp3 import ler_sp3_multiplos
 
 # CONFIGURAÇÃO TRR
 EIXO_CORTEZ_RA = 148.9
-ARQUIVO = "asi.orb.lageos2.251220.v80.sp3"
+ARQUIVOS = "asi.orb.lageos2.*.sp3"  # Glob: um ou vários produtos diários/semanais
+SATELITE = "L52"  # ID ILRS exato do LAGEOS-2
+N_WORKERS = None  # None = todos os núcleos
+DURACAO_ARCO_H = 24.0  # Arcos de ajuste orbital (Kepler + J2 secular)
+
+# MODO INCREMENTAL: cada produto novo do ILRS é processado uma única vez e somado ao estado
+MODO_INCREMENTAL = False
+PASTA_ESTADO = "lageos_estado"
+JANELA_MOVEL_DIAS = 30
 
 def auditoria_lageos_v3():
     print(f"--- TRR: AUDITORIA GRAVITACIONAL LAGEOS-2 (ID: L52) ---")
     
-    if not os.path.exists(ARQUIVO):
-        print(f"ERRO: Arquivo {ARQUIVO} não encontrado.")
+    if not glob.glob(ARQUIVOS):
+        print(f"ERRO: Nenhum arquivo {ARQUIVOS} encontrado.")
         return
 
-    posicoes = []
-    
-    # Lendo o arquivo com o ID correto identificado na sua amostra
-    with open(ARQUIVO, 'r', encoding='latin-1') as f:
-        for linha in f:
-            partes = linha.split()
-            # Procuramos linhas que começam com P e identificam o satélite 52 ou L52
-            if len(partes) >= 5 and partes[0].startswith('P'):
-                if '52' in partes[0] or '52' in partes[1]:
-                    try:
-                        # O formato SP3: P ID X Y Z
-                        # Se o ID estiver grudado no P (ex: PL52), o X é partes[1]
-                        # Se houver espaço (ex: P L52), o X é partes[2]
-                        idx_x = 1 if len(partes[0]) > 1 else 2
-                        x = float(partes[idx_x])
-                        y = float(partes[idx_x+1])
-                        z = float(partes[idx_x+2])
-                        posicoes.append([x, y, z])
-                    except (ValueError, IndexError):
-                        continue
-
-    pos = np.array(posicoes)
+    # Leitor SP3-c/d: épocas com data/hora, satélite pelo ID exato, arquivos em paralelo
+    orbita = ler_sp3_multiplos(ARQUIVOS, satelites=[SATELITE], n_workers=N_WORKERS)
+    pos = orbita['pos']
     
     if len(pos) == 0:
-        print("ERRO: Ainda não foi possível extrair coordenadas. Verifique o ID nas linhas de posição.")
+        print(f"ERRO: Nenhuma posição do satélite {SATELITE} nos arquivos SP3.")
         return
 
-    print(f"Sucesso: {len(pos)} pontos de dados extraídos.")
+    print(f"Sucesso: {len(pos)} pontos de dados extraídos de {len(orbita['arquivos'])} arquivo(s) "
+          f"({orbita['tempo'][0]} a {orbita['tempo'][-1]}).")
 
     # 1. Geometria Causal (Ângulo de Ascensão Reta)
     ra_inst = np.degrees(np.arctan2(pos[:, 1], pos[:, 0])) % 360
     
-    # 2. Resíduos de Energia Gravitacional (Variação do Raio)
-    raios = np.linalg.norm(pos, axis=1)
-    residuos_r = raios - np.mean(raios)
+    # 2. Resíduos Gravitacionais: observado - órbita ajustada por arco (RTN)
+    # (raio - média seria dominado pela própria excentricidade da órbita)
+    residuos = residuos_orbita(orbita['tempo'], pos, duracao_h=DURACAO_ARCO_H, n_workers=N_WORKERS)
+    for falha in residuos['falhas']:
+        print(f"AVISO: {falha}")
+    print(f"Arcos ajustados: {np.count_nonzero(np.isfinite(residuos['rms_arco']))} | "
+          f"RMS mediano do ajuste: {np.nanmedian(residuos['rms_arco'])*1e3:.1f} m")
     
     # 3. Cálculo da Significância TRR
     alinhamento = np.cos(np.radians(ra_inst - EIXO_CORTEZ_RA))
-    df = pd.DataFrame({'ra': ra_inst, 'residuo': residuos_r, 'alinhamento': alinhamento})
+    df = pd.DataFrame({'ra': ra_inst, 'residuo': residuos['radial'], 'along': residuos['along'],
+                       'cross': residuos['cross'], 'alinhamento': alinhamento}).dropna()
     
     r_obs = df['alinhamento'].corr(df['residuo'])
     sigma = abs(r_obs) * np.sqrt(len(df))
+    for componente in ('along', 'cross'):
+        r_comp = df['alinhamento'].corr(df[componente])
+        print(f"Correlação {componente:<5} x eixo: {r_comp:+.4f} ({abs(r_comp)*np.sqrt(len(df)):.2f} sigma)")
 
     print("\n" + "="*60)
     print(f"VEREDITO LAGEOS-2 (UNIFICAÇÃO MACRO): {sigma:.2f} SIGMA")
@@ -74,5 +79,35 @@ def auditoria_lageos_v3():
     plt.legend()
     plt.show()
 
+def auditoria_lageos_incremental():
+    print(f"--- TRR: AUDITORIA LAGEOS-2 INCREMENTAL (ID: {SATELITE}) ---")
+
+    arquivos = sorted(glob.glob(ARQUIVOS))
+    if not arquivos:
+        print(f"ERRO: Nenhum arquivo {ARQUIVOS} encontrado.")
+        return
+
+    estado = AcumuladorLAGEOS(PASTA_ESTADO, satelites=[SATELITE], eixo_ra=EIXO_CORTEZ_RA, duracao_h=DURACAO_ARCO_H)
+    # Só a versão mais nova de cada produto (ex.: .v81 em vez de .v80)
+    recentes = mais_recentes(arquivos)
+    novos = [a for a in recentes if estado.ingerir(a)]
+    print(f"Produtos no estado: {len(estado.manifesto)} | processados agora: {len(novos)} | "
+          f"versões antigas ignoradas: {len(arquivos) - len(recentes)}")
+
+    total = estado.estatisticas(sat=SATELITE)
+    dias, sigmas = estado.sigma_janelas(JANELA_MOVEL_DIAS, sat=SATELITE)
+
+    print("\n" + "="*60)
+    print(f"VEREDITO LAGEOS-2 (ACUMULADO, {total['n']} pontos): {total['sigma']:.2f} SIGMA")
+    print(f"CORRELAÇÃO COM EIXO {EIXO_CORTEZ_RA}°: {total['correlacao']:.4f}")
+    if len(dias):
+        print(f"Sigma na janela móvel de {JANELA_MOVEL_DIAS} dias até {dias[-1]}: {sigmas[-1]:.2f} "
+              f"(máximo {np.nanmax(sigmas):.2f} em {dias[np.nanargmax(sigmas)]})")
+    print(f"RESULTADO: {'QUEBRA DE ISOTROPIA CONFIRMADA' if total['sigma'] > 5 else 'ISOTROPIA DE EINSTEIN PREVALECE'}")
+    print("="*60)
+
 if __name__ == "__main__":
-    auditoria_lageos_v3()
\ No newline at end of file
+    if MODO_INCREMENTAL:
+        auditoria_lageos_incremental()
+    else:
+        auditoria_lageos_v3()
\ No newline at end of file
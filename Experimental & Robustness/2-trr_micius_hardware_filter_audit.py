@@ -1,6 +1,15 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.permutacao import teste_permutacao, p_valor_exato, significancia_permutacao
+
+N_SIM = 10000       # Embaralhamentos, só usados se n! passar do limite de enumeração exata
+SEMENTE = 20260101
+N_WORKERS = None    # None = todos os núcleos
 
 # --- FASE 1: RECONSTRUÇÃO DO DATASET REAL (Micius/QUESS) ---
 def gerar_dados_micius():
@@ -33,20 +42,18 @@ def auditoria_quântica_final():
     # 2. Correlação (Fidelidade vs Eixo)
     # No Modelo Padrão, a correlação deve ser ZERO (Isotropia).
     # Na TRR, a correlação deve ser NEGATIVA e FORTE (Mergulho no Eixo).
-    r_obs = np.corrcoef(df['alinhamento'], df['fidelidade_chsh'])[0, 1]
-    
-    # 3. Teste de Significância (Monte Carlo)
-    n_sim = 10000
-    corrs_nulas = []
-    for _ in range(n_sim):
-        shuffled = np.random.permutation(df['fidelidade_chsh'])
-        corrs_nulas.append(np.corrcoef(df['alinhamento'], shuffled)[0, 1])
-    
-    sigma = (r_obs - np.mean(corrs_nulas)) / np.std(corrs_nulas)
+    # 3. Teste de Significância: com 10 passagens as 10! = 3.628.800 permutações
+    # são enumeradas (nula exata, sem ruído de Monte Carlo)
+    r_obs, corrs_nulas, exato = teste_permutacao(df['fidelidade_chsh'].to_numpy(), df['alinhamento'].to_numpy(),
+                                                 N_SIM, SEMENTE, N_WORKERS)
+    sigma, p_valor = significancia_permutacao(r_obs, corrs_nulas)
+    if exato:
+        p_valor = p_valor_exato(r_obs, corrs_nulas)
 
     print("\n" + "="*60)
     print(f"VEREDITO UNIFICAÇÃO (MICIUS): {abs(sigma):.2f} SIGMA")
     print(f"CORRELAÇÃO DETECTADA: {r_obs:.4f}")
+    print(f"P-VALOR {'EXATO' if exato else 'MONTE CARLO'} ({len(corrs_nulas)} permutações): {p_valor:.6f}")
     print(f"RESULTADO: {'MECÂNICA QUÂNTICA UNIFICADA' if abs(sigma) > 5 else 'TRR APENAS COSMOLÓGICA'}")
     print("="*60)
 
@@ -1,64 +1,72 @@
 import numpy as np
-import pandas as pd
-from astropy.table import Table
-from scipy.optimize import least_squares
 import matplotlib.pyplot as plt
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.catalogo_sdss import carregar_dr16q, COLUNAS_DR16Q
+from trr_core.jackknife import (estatisticas_suficientes, resolver_parametros, jackknife_delete_um,
+                                jackknife_delete_d, erro_jackknife, grupos_aleatorios,
+                                grupos_fatias_ra, grupos_blocos_ceu)
+from trr_core.rastreio import etapa
 
 # Parâmetros Nominais da TRR
 D0_NOMINAL = 0.794
 OMEGA_P = 1128.0
 DIRECAO_NOMINAL = 148.9
 
-def to_native(array):
-    if array.dtype.byteorder not in ('=', '|'):
-        return array.byteswap().view(array.dtype.newbyteorder('='))
-    return array
-
-def residuo_trr(params, ra, z, mag_res):
-    d0, theta0 = params
-    # Modelo de Precessão de Cortez
-    fase = (theta0 + (OMEGA_P / z)) % 360
-    predicao = d0 * z * np.cos(np.radians(ra - fase))
-    return predicao - mag_res
+def executar_jackknife(caminho, n_cortes=50, modo='aleatorio', d=1, n_replicas=5000, semente=None):
+    """
+    Jackknife da Precessão de Cortez sobre o catálogo COMPLETO do estrato.
 
-def executar_jackknife(caminho, n_cortes=50):
-    print(f"Iniciando Teste Jackknife em {caminho}...")
-    dat = Table.read(caminho, format='fits')
+    modo: 'aleatorio' (dobras), 'ra' (fatias de RA) ou 'ceu' (blocos de área igual).
+    d=1 remove um grupo por réplica; d>1 sorteia n_replicas subconjuntos de d grupos.
+    """
+    print(f"Iniciando Teste Jackknife ({modo}, delete-{d}) em {caminho}...")
     
     # Extração e limpeza (Foco no estrato de ressonância z: 1.5 - 2.0)
-    ra = to_native(np.array(dat['RA']))
-    z = to_native(np.array(dat['Z']))
-    mag_i = to_native(np.array(dat['PSFMAG'][:, 3]))
-    
-    df = pd.DataFrame({'ra': ra, 'z': z, 'mag': mag_i})
-    df = df[(df['z'] >= 1.5) & (df['z'] <= 2.0) & (df['mag'] > 0)].copy()
-    df['mag_res'] = df['mag'] - (5 * np.log10(df['z']))
+    # Leitura colunar: os cortes são aplicados antes de qualquer cópia
+    colunas = dict(COLUNAS_DR16Q, dec=('DEC', None)) if modo == 'ceu' else None
+    cat = carregar_dr16q(caminho, colunas=colunas, cortes={'z': (1.5, 2.0, True), 'mag_i': (0, None)})
+    ra, z = cat['ra'], cat['z']
+    mag_res = cat['mag_i'] - (5 * np.log10(z))
     
-    print(f"Amostra total: {len(df)} objetos.")
+    print(f"Amostra total: {len(z)} objetos.")
     
-    # Listas para armazenar resultados das iterações
-    d0_results = []
-    theta0_results = []
-    
-    # Loop Jackknife: Remove 10% dos dados aleatoriamente em cada iteração
-    for i in range(n_cortes):
-        # Sampling: removemos uma fração dos dados
-        df_jack = df.sample(frac=0.9)
-        
-        # Ajuste de Mínimos Quadrados
-        x0 = [D0_NOMINAL, DIRECAO_NOMINAL]
-        res = least_squares(residuo_trr, x0, args=(df_jack['ra'], df_jack['z'], df_jack['mag_res']))
-        
-        d0_results.append(res.x[0])
-        theta0_results.append(res.x[1] % 360)
-        
-        if i % 10 == 0: print(f"Iteração {i}/{n_cortes} concluída...")
+    # Grupos Jackknife
+    with etapa('jackknife.grupos', linhas=len(z), modo=modo):
+        if modo == 'aleatorio':
+            grupos = grupos_aleatorios(len(z), n_cortes, semente)
+        elif modo == 'ra':
+            grupos = grupos_fatias_ra(ra, n_cortes)
+        elif modo == 'ceu':
+            n_dec = max(1, int(round(np.sqrt(n_cortes / 2))))
+            grupos = grupos_blocos_ceu(ra, cat['dec'], n_cortes // n_dec, n_dec)
+        else:
+            raise ValueError(f"Modo jackknife desconhecido: {modo}")
+
+    # Modelo de Precessão de Cortez linear em (d0*cos theta0, d0*sin theta0):
+    # as somas por grupo determinam o ajuste exato, cada réplica é uma subtração.
+    with etapa('jackknife.estatisticas', linhas=len(z)):
+        S = estatisticas_suficientes(ra, z, mag_res, grupos, omega_p=OMEGA_P)
+        S = S[S[:, -1] > 0] # Blocos vazios (fora do footprint) não contam como grupos
+        n_grupos = len(S)
+        d0_total, theta_total = resolver_parametros(S.sum(axis=0))
+
+    with etapa('jackknife.replicas', d=d) as e:
+        if d == 1:
+            d0_results, theta0_results = jackknife_delete_um(S)
+        else:
+            d0_results, theta0_results = jackknife_delete_d(S, d, n_replicas, semente)
+        e.linhas = len(d0_results)
 
-    # Estatística Final
-    d0_mean, d0_std = np.mean(d0_results), np.std(d0_results)
-    theta_mean, theta_std = np.mean(theta0_results), np.std(theta0_results)
+    # Estatística Final (erro-padrão jackknife; theta0 tratado como ângulo)
+    d0_mean, d0_std = erro_jackknife(d0_results, n_grupos, d)
+    theta_mean, theta_std = erro_jackknife(theta0_results, n_grupos, d, angular=True)
     
     print(f"\n--- RELATÓRIO DE ESTABILIDADE JACKKNIFE ---")
+    print(f"Grupos: {n_grupos} | Réplicas: {len(d0_results)}")
+    print(f"Ajuste Completo: D0={d0_total:.4f}, theta0={theta_total:.2f}° (Nominal: D0={D0_NOMINAL}, theta0={DIRECAO_NOMINAL}°)")
     print(f"Coeficiente D0: {d0_mean:.4f} +/- {d0_std:.4f}")
     print(f"Direção Inicial theta0: {theta_mean:.2f}° +/- {theta_std:.2f}°")
     
@@ -1,16 +1,29 @@
+import os
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.regime_eft import (LIMIAR_CHI, chi_transicao, eixo_densidade, eixo_potencial,
+                                 fronteira_transicao, gerar_mapa, posicionar)
+
 # CONSTANTES TRR
 EIXO_CORTEZ = 148.9
 TC_IDADE_VACUO = 3.9e12  # Anos
 ALPHA_ZERO = 1/137.03599
 
+# MAPA DE REGIMES (potencial x densidade, em décadas)
+GERAR_MAPA = True
+PASTA_MAPA = 'mapa_regime_eft'
+DECADAS_POTENCIAL = (-25, 5)   # |Phi| de 1e-25 a 1e5
+DECADAS_DENSIDADE = (-30, 15)  # rho de 1e-30 a 1e15
+N_POTENCIAIS = 2000
+N_DENSIDADES = 2000
+
 def funcao_transicao_chi(potencial_grav):
-    # Potencial crítico onde a TRR "desperta"
-    pot_limite = -1e-9 
-    k = 1e10 # Inclinação da transição
-    return 1 / (1 + np.exp(-k * (potencial_grav - pot_limite)))
+    # Potencial crítico -1e-9 onde a TRR "desperta", inclinação k = 1e10 (logística estável)
+    return chi_transicao(potencial_grav)
 
 def teste_calibracao_regime():
     print("--- TRR: TESTE DE CALIBRAÇÃO DE REGIME (HARVARD PROTOCOL) ---")
@@ -23,16 +36,56 @@ def teste_calibracao_regime():
         'Quasares (SDSS)': {'pot': -1e-15, 'rho': 1e-27, 'label': 'Cosmológico'}
     }
 
+    mapa = None
+    if GERAR_MAPA:
+        print(f"Gerando mapa de regimes {N_POTENCIAIS}x{N_DENSIDADES} em '{PASTA_MAPA}/'...")
+        mapa = gerar_mapa(eixo_potencial(*DECADAS_POTENCIAL, N_POTENCIAIS),
+                          eixo_densidade(*DECADAS_DENSIDADE, N_DENSIDADES), PASTA_MAPA)
+
+    # sigma = 46.43 * chi acima de chi = 0.01, senão 0.22 (ruído de Einstein)
+    posicoes = posicionar(regimes, mapa)
     for nome, dados in regimes.items():
-        chi = funcao_transicao_chi(dados['pot'])
-        sigma_esperado = 46.43 * chi if chi > 0.01 else 0.22 # 0.22 é o ruído de Einstein
+        chi = posicoes[nome]['chi']
+        sigma_esperado = posicoes[nome]['sigma']
         
         # Se for partícula (CERN), o PNB é anulado pela energia (fase nula)
         if nome == 'LHC (CERN)': sigma_esperado = 13.0 
             
         print(f"Alvo: {nome:15} | Potencial: {dados['pot']:.1e} | Ativação TRR (chi): {chi*100:6.2f}% | Sigma: {sigma_esperado:5.2f}")
 
+    densidades = eixo_densidade(*DECADAS_DENSIDADE, 256)
+    meia = fronteira_transicao(densidades, *DECADAS_POTENCIAL)
+    limiar = fronteira_transicao(densidades, *DECADAS_POTENCIAL, nivel=LIMIAR_CHI)
+    print(f"\n[FRONTEIRA] chi = 50%: |Phi| = {np.nanmedian(meia):.6e} | "
+          f"chi = {LIMIAR_CHI:.0%}: |Phi| = {np.nanmedian(limiar):.6e} (bissecção)")
+
+    if mapa is not None:
+        plotar_mapa(mapa, regimes, densidades, meia, limiar)
+
     print("\n[VEREDITO] A transição chi(Phi) remove a contradição entre LAGEOS e SDSS.")
 
+def plotar_mapa(mapa, regimes, densidades, meia, limiar, max_pixels=1000):
+    # Subamostra o memmap para exibição; o mapa completo continua em disco
+    passo_p = max(1, len(mapa['potenciais']) // max_pixels)
+    passo_r = max(1, len(mapa['densidades']) // max_pixels)
+    sigma = np.asarray(mapa['sigma'][::passo_p, ::passo_r])
+    extensao = [np.log10(mapa['densidades'][0]), np.log10(mapa['densidades'][-1]),
+                np.log10(-mapa['potenciais'][0]), np.log10(-mapa['potenciais'][-1])]
+
+    plt.figure(figsize=(10, 7))
+    plt.imshow(sigma, origin='lower', aspect='auto', extent=extensao, cmap='viridis')
+    plt.colorbar(label='Sigma esperado')
+    plt.plot(np.log10(densidades), np.log10(meia), 'w-', label='chi = 50%')
+    plt.plot(np.log10(densidades), np.log10(limiar), 'w--', label=f'chi = {LIMIAR_CHI:.0%}')
+    for nome, dados in regimes.items():
+        plt.scatter(np.log10(dados['rho']), np.log10(-dados['pot']), color='red', edgecolors='white', zorder=3)
+        plt.annotate(nome, (np.log10(dados['rho']), np.log10(-dados['pot'])), color='white',
+                     xytext=(5, 5), textcoords='offset points')
+    plt.xlabel('log10 densidade')
+    plt.ylabel('log10 |Potencial gravitacional|')
+    plt.title('TRR: Mapa de Regimes da Transição chi(Phi)')
+    plt.legend(loc='lower right')
+    plt.show()
+
 if __name__ == "__main__":
     teste_calibracao_regime()
\ No newline at end of file
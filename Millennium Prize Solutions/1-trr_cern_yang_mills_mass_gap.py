@@ -1,12 +1,24 @@
-import pandas as pd
 import numpy as np
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.dimuon import carregar_dimuon
+from trr_core.eixo_detector import estatisticas_eixo, grade_theta, teste_global_eixo, varrer_eixo
+from trr_core.rastreio import etapa, rastrear
 
 # CONFIGURAÇÃO DE AUDITORIA
 ARQUIVO = 'Dimuon_DoubleMu.csv'
 EIXO_LOCAL = 172.96  # Calibração detectada para o detector CMS
 GAMMA = 0.001        # Constante de Acoplamento de Cortez
 
+# VARREDURA DO EIXO (o EIXO_LOCAL foi escolhido olhando os dados: o sigma precisa pagar por isso)
+PASSO_VARREDURA = 0.001  # graus
+N_PERMUTACOES = 1000
+SEMENTE = 20260101
+N_WORKERS = None  # None = todos os núcleos
+
+@rastrear('cern.yang_mills')
 def realizar_auditoria_millennium():
     print("--- RELATÓRIO DE AUDITORIA: PROBLEMAS DO MILÊNIO (TRR) ---")
     
@@ -14,29 +26,30 @@ def realizar_auditoria_millennium():
         print(f"Erro: O arquivo {ARQUIVO} não foi encontrado na pasta.")
         return
 
-    # 1. CARGA DE DADOS REAIS (CERN OPEN DATA)
-    df = pd.read_csv(ARQUIVO)
-    n_eventos = len(df)
+    # 1. CARGA DE DADOS REAIS (CERN OPEN DATA) - apenas as colunas usadas, do cache colunar
+    dados = carregar_dimuon(ARQUIVO, colunas=('M', 'phi1'))
+    n_eventos = len(dados['M'])
     
     # 2. CÁLCULO DA MASSA INVARIANTE (M_obs)
     # Usaremos a coluna 'M' já presente no dataset para evitar erros de reconstrução
-    m_obs = df['M']
+    m_obs = dados['M']
     
     # 3. APLICAÇÃO DA MÉTRICA DE CORTEZ (M_trr)
     # M_trr = M_obs / (1 + Gamma * cos(phi - Eixo))
     # Esta é a prova de que a massa é um subproduto da geometria temporal
-    phi_rad = np.radians(df['phi1'] - EIXO_LOCAL)
-    m_trr = m_obs / (1 + GAMMA * np.cos(phi_rad))
+    with etapa('cern.yang_mills.metricas', linhas=n_eventos):
+        phi_rad = np.radians(dados['phi1'] - EIXO_LOCAL)
+        m_trr = m_obs / (1 + GAMMA * np.cos(phi_rad))
     
-    # 4. ANÁLISE DE VARIÂNCIA (PROVA POR DEMONSTRAÇÃO)
-    std_bruta = m_obs.std()
-    std_trr = m_trr.std()
-    melhoria_absoluta = std_bruta - std_trr
+        # 4. ANÁLISE DE VARIÂNCIA (PROVA POR DEMONSTRAÇÃO)
+        std_bruta = m_obs.std(ddof=1)
+        std_trr = m_trr.std(ddof=1)
+        melhoria_absoluta = std_bruta - std_trr
     
-    # 5. CÁLCULO DA SIGNIFICÂNCIA (Z-SCORE / SIGMA)
-    # Um resultado > 5.0 sigma é aceito como DESCOBERTA FÍSICA
-    correlacao = m_obs.corr(np.cos(phi_rad))
-    sigma = abs(correlacao * np.sqrt(n_eventos))
+        # 5. CÁLCULO DA SIGNIFICÂNCIA (Z-SCORE / SIGMA)
+        # Um resultado > 5.0 sigma é aceito como DESCOBERTA FÍSICA
+        correlacao = np.corrcoef(m_obs, np.cos(phi_rad))[0, 1]
+        sigma = abs(correlacao * np.sqrt(n_eventos))
 
     # 6. EXIBIÇÃO DOS RESULTADOS PARA O COMITÊ
     print(f"\n[DADOS TÉCNICOS]")
@@ -47,7 +60,26 @@ def realizar_auditoria_millennium():
     
     print(f"\n[SIGNIFICÂNCIA DA PROVA]")
     print(f"Redução de Entropia: {melhoria_absoluta:.8e}")
-    print(f"VALOR FINAL: {sigma:.4f} SIGMA")
+    print(f"VALOR FINAL: {sigma:.4f} SIGMA (local, eixo fixo)")
+
+    # 7. VARREDURA DE TODOS OS EIXOS E CORREÇÃO DE LOOK-ELSEWHERE
+    with etapa('cern.yang_mills.varredura', linhas=n_eventos):
+        varredura = varrer_eixo(estatisticas_eixo(m_obs, dados['phi1']), grade_theta(PASSO_VARREDURA), GAMMA)
+    melhor = varredura['melhor']
+    with etapa('cern.yang_mills.permutacoes', linhas=N_PERMUTACOES * n_eventos, n_perm=N_PERMUTACOES):
+        global_ = teste_global_eixo(m_obs, dados['phi1'], N_PERMUTACOES, SEMENTE, N_WORKERS)
+
+    print(f"\n[VARREDURA DE EIXO (LOOK-ELSEWHERE)]")
+    print(f"Eixos testados: {len(varredura['theta'])} (passo {PASSO_VARREDURA}°)")
+    print(f"Melhor eixo: {melhor['theta']:.3f}° | corr = {melhor['correlacao']:.6f} | "
+          f"sigma local = {melhor['sigma_local']:.4f} | Variância TRR = {melhor['std_trr']:.8f}")
+    print(f"p local (melhor eixo):       {global_['p_local']:.3e}")
+    print(f"p global ({N_PERMUTACOES} permutações): {global_['p_global']:.3e} | "
+          f"<n r^2> nulo = {global_['media_nula_chi2']:.3f} (esperado 2)")
+    print(f"p global (chi2, 2 g.l.):     {global_['p_global_chi2']:.3e}")
+    print(f"Fator de tentativas = {global_['fator_tentativas']:.2f} (base: {global_['origem_global']})")
+    print(f"VALOR FINAL CORRIGIDO: {global_['sigma_global']:.4f} SIGMA (global, {global_['origem_global']})")
+    sigma = global_['sigma_global']
 
     print("\n[VEREDITO]")
     if sigma >= 5.0:
@@ -1,12 +1,31 @@
-import pandas as pd
 import numpy as np
+import os
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.dimuon import carregar_dimuon
+from trr_core.espectro_fase import espectro_coerencia, largura_nulo, nulo_maximo, significancia_global
+from trr_core.rastreio import etapa, rastrear
+from trr_core.zeros_riemann import zeros_riemann
+
+N_ZEROS = 100000  # Zeros não-triviais gerados localmente (tabela retomável)
+N_TABELA = 5      # Linhas impressas na demonstração
+
+# ESPECTRO DE COERÊNCIA (a frequência alvo só tem sentido comparada às vizinhas)
+FAIXA_ESPECTRO = 0.5  # Frequências em omega_alvo * (1 +/- FAIXA_ESPECTRO)
+N_FREQUENCIAS = 4001  # Ímpar: o alvo é o ponto central da grade
+N_SIM_NULO = 200      # Simulações do nulo do máximo espectral
+SEMENTE = 20260101
+
+@rastrear('cern.riemann')
 def realizar_prova_riemann_absoluta():
     print("--- PROVA DE RESSONÂNCIA: HIPÓTESE DE RIEMANN (TRR) ---")
     
     # 1. CARREGAR DADOS DO CERN (O seu arquivo de 100k eventos)
     try:
-        df = pd.read_csv('Dimuon_DoubleMu.csv')
+        with etapa('cern.riemann.carregar') as e_carga:
+            m = carregar_dimuon('Dimuon_DoubleMu.csv', colunas=('M',))['M']
+            e_carga.linhas = len(m)
     except Exception as e:
         print(f"Erro ao carregar arquivo: {e}")
         return
@@ -15,9 +34,10 @@ def realizar_prova_riemann_absoluta():
     WP = 1128.0   # Frequência de Precessão
     D0 = 0.794    # Gradiente de Anisotropia
     
-    # 3. ZEROS DE RIEMANN (Amostra dos 5 primeiros para verificação)
+    # 3. ZEROS DE RIEMANN (N_ZEROS primeiros, Riemann-Siegel + verificação de Gram)
     # Valores Reais da Linha Crítica (1/2)
-    zeros_reais = np.array([14.1347, 21.0220, 25.0108, 30.4248, 32.9350])
+    with etapa('cern.riemann.zeros', linhas=N_ZEROS):
+        zeros_reais = zeros_riemann(N_ZEROS)
     
     # 4. PREVISÃO TRR: O vácuo vibra em harmônicos de WP/D0
     # A fórmula da TRR para a linha crítica: Gamma_n = (WP / (D0 * pi)) * ln(n + phi)
@@ -30,21 +50,23 @@ def realizar_prova_riemann_absoluta():
     print(f"{'n':<4} | {'TRR (Calculado)':<15} | {'Riemann (Real)':<15} | {'Precisão'}")
     print("-" * 55)
     
-    for i, zero in enumerate(zeros_reais):
-        # Escalonamento de fase local (32.0 é a constante de acoplamento da massa do Z)
-        previsao = harmonico_cortez(i+1) / 32.0 
-        precisao = (1 - abs(previsao - zero) / zero) * 100
-        print(f"{i+1:<4} | {previsao:<15.4f} | {zero:<15.4f} | {precisao:.2f}%")
+    # Escalonamento de fase local (32.0 é a constante de acoplamento da massa do Z)
+    previsoes = harmonico_cortez(np.arange(1, len(zeros_reais) + 1)) / 32.0
+    precisoes = (1 - np.abs(previsoes - zeros_reais) / zeros_reais) * 100
+    for i in range(min(N_TABELA, len(zeros_reais))):
+        print(f"{i+1:<4} | {previsoes[i]:<15.4f} | {zeros_reais[i]:<15.4f} | {precisoes[i]:.2f}%")
+    print("-" * 55)
+    print(f"Precisão média nos {len(zeros_reais)} zeros: {precisoes.mean():.2f}% (mediana {np.median(precisoes):.2f}%)")
 
     # 6. AUDITORIA DE FASE NOS DADOS DO CERN
     # Verificamos se os eventos de massa (M) se agrupam nos harmônicos de Riemann
     # Se a TRR é a Teoria de Tudo, a massa M deve estar em fase com a precessão
     frequencia_alvo = WP / (D0 * np.pi)
-    df['fase_trr'] = np.cos(df['M'] * np.pi / frequencia_alvo)
-    alinhamento_causal = df['fase_trr'].mean()
+    fase_trr = np.cos(m * np.pi / frequencia_alvo)
+    alinhamento_causal = fase_trr.mean()
 
     print("\n[RESULTADO DA AUDITORIA EXPERIMENTAL]")
-    print(f"Volume de Dados: {len(df)} eventos")
+    print(f"Volume de Dados: {len(m)} eventos")
     print(f"Alinhamento de Fase (Zeta): {abs(alinhamento_causal)*100:.6f}%")
     
     # Um alinhamento não-nulo em 100k eventos prova a estrutura harmônica
@@ -55,5 +77,21 @@ def realizar_prova_riemann_absoluta():
     else:
         print("\nSTATUS: RECALIBRAR CONSTANTE DE ACOPLAMENTO.")
 
+    # 7. ESPECTRO DE COERÊNCIA DE FASE (RAYLEIGH) E NULO DO MÁXIMO
+    omega_alvo = np.pi / frequencia_alvo
+    omegas = omega_alvo * (1 + np.linspace(-FAIXA_ESPECTRO, FAIXA_ESPECTRO, N_FREQUENCIAS))
+    with etapa('cern.riemann.espectro', linhas=len(m), frequencias=N_FREQUENCIAS):
+        espectro = espectro_coerencia(m, omegas)
+    i_max = np.argmax(espectro['rayleigh'])
+    with etapa('cern.riemann.nulo', linhas=N_SIM_NULO * len(m), n_sim=N_SIM_NULO):
+        maximos = nulo_maximo(m, espectro_coerencia, largura_nulo(omegas.min()), N_SIM_NULO, SEMENTE, omegas=omegas)
+    p_global, sigma_global = significancia_global(espectro['rayleigh'][i_max], maximos)
+
+    print(f"\n[ESPECTRO DE COERÊNCIA ({N_FREQUENCIAS} frequências, modo {espectro['metodo']}, erro <= {espectro['erro_max']:.1e})]")
+    print(f"Rayleigh no alvo (f = {frequencia_alvo:.4f}): Z = {espectro['rayleigh'][N_FREQUENCIAS // 2]:.4f}")
+    print(f"Máximo do espectro: Z = {espectro['rayleigh'][i_max]:.4f} em f = {np.pi / omegas[i_max]:.4f} "
+          f"(p local = {espectro['p_local'][i_max]:.3e})")
+    print(f"p global ({N_SIM_NULO} simulações do nulo): {p_global:.3e} | {sigma_global:.2f} SIGMA")
+
 if __name__ == "__main__":
     realizar_prova_riemann_absoluta()
\ No newline at end of file
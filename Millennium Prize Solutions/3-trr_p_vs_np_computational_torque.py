@@ -1,12 +1,21 @@
-import pandas as pd
 import numpy as np
 import time
+import os
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.dimuon import carregar_dimuon
+from trr_core.rastreio import etapa, rastrear
+
+@rastrear('cern.p_vs_np')
 def realizar_prova_p_vs_np():
     print("--- RELATÓRIO DE EVIDÊNCIA BRUTA: P VS NP (TRR) ---")
     
     # 1. CARREGAR DADOS DO CERN
-    df = pd.read_csv('Dimuon_DoubleMu.csv')
+    with etapa('cern.p_vs_np.carregar') as e:
+        dados = carregar_dimuon('Dimuon_DoubleMu.csv', colunas=('M', 'phi1'))
+        m = dados['M']
+        e.linhas = len(m)
     
     # 2. DEFINIÇÃO FÍSICA DO PROBLEMA
     # P (Verificação): Checar se a massa M está no Pico do Z (91.18 GeV).
@@ -15,7 +24,7 @@ def realizar_prova_p_vs_np():
     # --- TESTE P (VERIFICAÇÃO) ---
     start_p = time.perf_counter()
     # A verificação é um filtro direto (Fase Alinhada)
-    verificacao = df[(df['M'] > 91.1) & (df['M'] < 91.3)]
+    verificacao = m[(m > 91.1) & (m < 91.3)]
     end_p = time.perf_counter()
     tempo_p = (end_p - start_p) * 1000 # ms
     
@@ -23,7 +32,7 @@ def realizar_prova_p_vs_np():
     start_np = time.perf_counter()
     # A busca exige 'rotacionar' a hipótese através dos dados (Torque de Fase)
     for tentativa in range(100): # Simulação de busca de harmônico
-        _ = df['M'].std() 
+        _ = m.std(ddof=1) 
     end_np = time.perf_counter()
     tempo_np = (end_np - start_np) * 1000 # ms
 
@@ -32,10 +41,11 @@ def realizar_prova_p_vs_np():
     gap_complexidade = tempo_np / tempo_p
     
     # Entropia de Shannon aplicada à fase do detector (phi1)
-    counts, _ = np.histogram(df['phi1'], bins=100)
-    probs = counts / len(df)
-    probs = probs[probs > 0]
-    entropia_h = -np.sum(probs * np.log2(probs))
+    with etapa('cern.p_vs_np.entropia', linhas=len(m)):
+        counts, _ = np.histogram(dados['phi1'], bins=100)
+        probs = counts / len(m)
+        probs = probs[probs > 0]
+        entropia_h = -np.sum(probs * np.log2(probs))
 
     # 4. RESULTADOS DA PROVA
     print(f"\n[MÉTRICAS CAUSAIS]")
@@ -1,6 +1,23 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import requests
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.navier_stokes import FluxoEspectral, taylor_green
+
+# INTEGRAÇÃO PSEUDO-ESPECTRAL (Taylor-Green, caixa periódica 2*pi)
+EXECUTAR_INTEGRACAO = False  # Dois Taylor-Green 64^3 até t=10: vários minutos em um núcleo
+N_GRADE = 64          # 256 para a rodada de produção
+DIM_NS = 3
+NU_NS = 1 / 400       # Viscosidade cinemática (Re = 400)
+T_FINAL_NS = 10.0
+VELOCIDADE_LIMITE_NS = 1.0  # c do gradiente de Cortez, em unidades da caixa
+AMORTECIMENTO_NS = 1.0      # gamma do arrasto de Cortez nu_c(|u|) = gamma (1 - g(|u|))
+PASTA_NS = 'navier_stokes_trr'
 
 def auditoria_detalhada_navier_stokes():
     print("--- PROTOCOLO DE AUDITORIA: NAVIER-STOKES / TRR ---")
@@ -35,4 +52,41 @@ def auditoria_detalhada_navier_stokes():
     print("a formação de singularidades (explosão de energia) é impossível.")
     print("A solução é globalmente suave em T_mu_nu.")
 
-auditoria_detalhada_navier_stokes()
\ No newline at end of file
+def integracao_navier_stokes():
+    print("\n--- INTEGRAÇÃO DIRETA: NAVIER-STOKES PADRÃO vs AMORTECIMENTO DE CORTEZ ---")
+    print(f"Taylor-Green {N_GRADE}^{DIM_NS}, nu={NU_NS:.2e}, t_final={T_FINAL_NS}")
+
+    resultados = {}
+    for nome, subpasta, cortez in (('Padrão', 'padrao', False), ('Cortez', 'cortez', True)):
+        pasta = os.path.join(PASTA_NS, subpasta)
+        fluxo = FluxoEspectral(N_GRADE, DIM_NS, nu=NU_NS, cortez=cortez, c=VELOCIDADE_LIMITE_NS,
+                               gamma=AMORTECIMENTO_NS)
+        fluxo.definir_velocidade(taylor_green(N_GRADE, DIM_NS))
+        historico = fluxo.executar(T_FINAL_NS, pasta=pasta)
+        resultados[nome] = historico
+
+        t = np.array([l['t'] for l in historico])
+        vort = np.array([l['vorticidade_max'] for l in historico])
+        enst = np.array([l['enstrofia'] for l in historico])
+        finito = np.all(np.isfinite(vort))
+        print(f"{nome:<7} | passos: {len(historico):5d} | |omega|_max pico: {np.nanmax(vort):8.3f} "
+              f"(t={t[np.nanargmax(vort)]:.2f}) | enstrofia pico: {np.nanmax(enst):8.4f} | "
+              f"{'FINITO' if finito else 'DIVERGENTE'} | checkpoints em {pasta}/")
+
+    fig, eixos = plt.subplots(1, 2, figsize=(12, 5))
+    for nome, historico in resultados.items():
+        t = [l['t'] for l in historico]
+        eixos[0].plot(t, [l['vorticidade_max'] for l in historico], label=nome)
+        eixos[1].plot(t, [l['enstrofia'] for l in historico], label=nome)
+    eixos[0].set_ylabel('|omega| máximo')
+    eixos[1].set_ylabel('Enstrofia')
+    for eixo in eixos:
+        eixo.set_xlabel('t')
+        eixo.legend()
+    fig.suptitle('TRR: Indicadores de Explosão (Navier-Stokes Pseudo-Espectral)')
+    plt.tight_layout()
+    plt.show()
+
+auditoria_detalhada_navier_stokes()
+if EXECUTAR_INTEGRACAO:
+    integracao_navier_stokes()
\ No newline at end of file
@@ -1,12 +1,27 @@
-import pandas as pd
 import numpy as np
+import os
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.dimuon import carregar_dimuon
+from trr_core.espectro_fase import espectro_quantizacao, largura_nulo, nulo_maximo, significancia_global
+from trr_core.rastreio import etapa, rastrear
+
+# ESPECTRO DE QUANTIZAÇÃO (a escala D0*pi só tem sentido comparada às vizinhas)
+FAIXA_ESPECTRO = 0.5  # Escalas em D0*pi * (1 +/- FAIXA_ESPECTRO)
+N_ESCALAS = 4001      # Ímpar: D0*pi é o ponto central da grade
+N_SIM_NULO = 200      # Simulações do nulo do máximo espectral
+SEMENTE = 20260101
+
+@rastrear('cern.hodge')
 def realizar_prova_hodge():
     print("--- PROVA DE TOPOLOGIA: CONJECTURA DE HODGE (TRR) ---")
     
     # 1. CARREGAR DADOS (100k eventos do CERN)
     try:
-        df = pd.read_csv('Dimuon_DoubleMu.csv')
+        with etapa('cern.hodge.carregar') as e_carga:
+            dados = carregar_dimuon('Dimuon_DoubleMu.csv', colunas=('pt1', 'eta1'))
+            e_carga.linhas = len(dados['pt1'])
     except Exception as e:
         print(f"Erro: {e}")
         return
@@ -20,22 +35,22 @@ def realizar_prova_hodge():
     # A Conjectura de Hodge exige que a forma (geometria) seja decomponível.
     # Vamos calcular a densidade de curvatura da trajetória dos múons:
     # Curvatura (K) aproximada pela relação entre momento transverso e ângulo.
-    df['curvatura_k'] = df['pt1'] * np.sinh(df['eta1'])
+    curvatura_k = dados['pt1'] * np.sinh(dados['eta1'])
     
     # 4. A PROVA: DECOMPOSIÇÃO EM CICLOS ALGÉBRICOS
     # Se Hodge estiver certo, a curvatura k dividida pela unidade de fase
     # tensional (D0 * pi) deve resultar em números quase inteiros (Ciclos).
     fator_hodge = D0 * np.pi
-    df['ciclos_hodge'] = df['curvatura_k'] / fator_hodge
+    ciclos_hodge = curvatura_k / fator_hodge
     
     # Calculamos o 'Resíduo de Quantização' (Quão perto de um ciclo algébrico está)
-    df['residuo'] = np.abs(df['ciclos_hodge'] - np.round(df['ciclos_hodge']))
-    quantizacao_media = (1 - df['residuo'].mean()) * 100
+    residuo = np.abs(ciclos_hodge - np.round(ciclos_hodge))
+    quantizacao_media = (1 - residuo.mean()) * 100
 
     # 5. RESULTADOS DA AUDITORIA GEOMÉTRICA
     print(f"\n[AUDITORIA DE TOPOLOGIA]")
-    print(f"Eventos Analisados: {len(df)}")
-    print(f"Densidade de Curvatura Média: {df['curvatura_k'].mean():.4f}")
+    print(f"Eventos Analisados: {len(curvatura_k)}")
+    print(f"Densidade de Curvatura Média: {curvatura_k.mean():.4f}")
     print(f"Taxa de Quantização (Hodge Match): {quantizacao_media:.4f}%")
     
     # 6. VEREDITO FINAL (6/6)
@@ -47,5 +62,22 @@ def realizar_prova_hodge():
     else:
         print("STATUS: DIVERGÊNCIA TOPOLÓGICA.")
 
+    # 7. ESPECTRO DE QUANTIZAÇÃO E NULO DO MÁXIMO
+    escalas = fator_hodge * (1 + np.linspace(-FAIXA_ESPECTRO, FAIXA_ESPECTRO, N_ESCALAS))
+    with etapa('cern.hodge.espectro', linhas=len(curvatura_k), escalas=N_ESCALAS):
+        espectro = espectro_quantizacao(curvatura_k, escalas)
+    i_max = np.argmax(espectro['estatistica'])
+    with etapa('cern.hodge.nulo', linhas=N_SIM_NULO * len(curvatura_k), n_sim=N_SIM_NULO):
+        maximos = nulo_maximo(curvatura_k, espectro_quantizacao, largura_nulo(2 * np.pi / escalas.max()),
+                              N_SIM_NULO, SEMENTE, escalas=escalas)
+    p_global, sigma_global = significancia_global(espectro['estatistica'][i_max], maximos)
+
+    print(f"\n[ESPECTRO DE QUANTIZAÇÃO ({N_ESCALAS} escalas)]")
+    print(f"Escala D0*pi = {fator_hodge:.4f}: {espectro['quantizacao'][N_ESCALAS // 2]:.4f}% "
+          f"(z = {espectro['estatistica'][N_ESCALAS // 2]:.2f}; sem quantização: 75%)")
+    print(f"Máximo do espectro: {espectro['quantizacao'][i_max]:.4f}% em s = {escalas[i_max]:.4f} "
+          f"(z = {espectro['estatistica'][i_max]:.2f}, p local = {espectro['p_local'][i_max]:.3e})")
+    print(f"p global ({N_SIM_NULO} simulações do nulo): {p_global:.3e} | {sigma_global:.2f} SIGMA")
+
 if __name__ == "__main__":
     realizar_prova_hodge()
\ No newline at end of file
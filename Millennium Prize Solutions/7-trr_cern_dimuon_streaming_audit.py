@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trr_core.fluxo_dimuon import auditoria_fluxo
+
+# CONFIGURAÇÃO DE AUDITORIA (Runs completos do CMS DoubleMu: dezenas de milhões de eventos)
+ARQUIVO = 'Dimuon_DoubleMu.csv'
+TAMANHO_BLOCO = 1_000_000  # Eventos por bloco (a memória de pico depende só disto)
+
+def realizar_auditoria_em_fluxo():
+    print("--- AUDITORIA CERN EM PASSADA ÚNICA: YANG-MILLS, RIEMANN, P VS NP, HODGE (TRR) ---")
+
+    if not os.path.exists(ARQUIVO):
+        print(f"Erro: O arquivo {ARQUIVO} não foi encontrado na pasta.")
+        return
+
+    inicio = time.perf_counter()
+    r = auditoria_fluxo(ARQUIVO, tamanho_bloco=TAMANHO_BLOCO)
+    duracao = time.perf_counter() - inicio
+
+    print(f"\n[DADOS TÉCNICOS]")
+    print(f"Amostra Auditada: {r['n_eventos']} eventos em {duracao:.1f} s (blocos de {TAMANHO_BLOCO})")
+
+    print(f"\n[YANG-MILLS]")
+    print(f"Variância Bruta:  {r['std_bruta']:.8f}")
+    print(f"Variância TRR:    {r['std_trr']:.8f}")
+    print(f"Redução de Entropia: {r['std_bruta'] - r['std_trr']:.8e}")
+    print(f"VALOR FINAL: {r['sigma']:.4f} SIGMA")
+
+    print(f"\n[RIEMANN]")
+    print(f"Alinhamento de Fase (Zeta): {abs(r['alinhamento'])*100:.6f}%")
+
+    print(f"\n[P VS NP]")
+    print(f"Entropia de Fase (H):     {r['entropia_h']:.4f} bits")
+
+    print(f"\n[HODGE]")
+    print(f"Densidade de Curvatura Média: {r['curvatura_media']:.4f}")
+    print(f"Taxa de Quantização (Hodge Match): {r['quantizacao_media']:.4f}%")
+
+if __name__ == "__main__":
+    realizar_auditoria_em_fluxo()
\ No newline at end of file
@@ -0,0 +1,178 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import master_unification_test as master
+from trr_core.bancada import carregar_baseline, comparar, medir, metadados_maquina, salvar_baseline
+from trr_core.dimuon import carregar_dimuon
+from trr_core.dipolo import DipoloLinear
+from trr_core.jackknife import estatisticas_suficientes, grupos_aleatorios, jackknife_delete_d, jackknife_delete_um
+from trr_core.permutacao import gerar_blocos_permutados, teste_permutacao_correlacao
+from trr_core.sparc import COLUNAS_SPARC, ArmazemSPARC
+from trr_core.varredura import varrer_universos
+from trr_core.zeros_riemann import pontos_gram
+
+# ==============================================================================
+# BANCADA DE DESEMPENHO DOS CAMINHOS QUENTES DAS AUDITORIAS
+# Dados sintéticos determinísticos (SEMENTE) no lugar de SDSS, Pantheon+, SPARC
+# e CERN; ESCALA multiplica todos os tamanhos.
+# ==============================================================================
+SEMENTE = 20260101
+N_QUASARES = 200_000
+N_SHUFFLES = 2_000
+N_SNE = 1_700
+N_MC = 20_000
+N_GALAXIAS = 175
+N_EVENTOS = 500_000
+N_ZEROS = 100_000
+
+# ==============================================================================
+# 1. DADOS SINTÉTICOS
+# ==============================================================================
+
+def quasares_sinteticos(n, rng):
+    ra = rng.uniform(0, 360, n)
+    z = rng.uniform(1.5, 2.0, n)
+    residuos = rng.normal(0, 0.3, n)
+    return ra, z, residuos - residuos.mean()
+
+def escrever_sparc(pasta, n_galaxias, rng):
+    os.makedirs(pasta, exist_ok=True)
+    for g in range(n_galaxias):
+        n = rng.integers(10, 60)
+        rad = np.sort(rng.uniform(0.2, 30, n))
+        vgas, vdisk, vbul = (rng.uniform(5, 120, n) for _ in range(3))
+        vobs = np.sqrt(vgas**2 + 0.5 * vdisk**2 + 0.7 * vbul**2) + rng.normal(0, 5, n)
+        tabela = np.column_stack((rad, vobs, np.full(n, 5.0), vgas, vdisk, vbul, np.ones(n), np.zeros(n)))
+        np.savetxt(os.path.join(pasta, f"G{g:04d}_rotmod.dat"), tabela, fmt='%.4f',
+                   header='  '.join(COLUNAS_SPARC))
+
+def escrever_dimuon(caminho, n, rng):
+    pd.DataFrame({'Run': 1, 'Event': np.arange(n), 'pt1': rng.gamma(2, 10, n), 'eta1': rng.normal(0, 1.2, n),
+                  'phi1': rng.uniform(-np.pi, np.pi, n), 'Q1': 1, 'M': rng.normal(91, 5, n)}).to_csv(caminho, index=False)
+
+# ==============================================================================
+# 2. CASOS
+# ==============================================================================
+
+def montar_casos(escala, pasta):
+    rng = np.random.default_rng(SEMENTE)
+    casos = {}
+
+    # SDSS: laço nulo de permutações
+    ra, z, residuos = quasares_sinteticos(int(N_QUASARES * escala), rng)
+    predicao = -(0.794 * z * np.cos(np.radians(ra - (148.9 + 1128.0 / z) % 360)))
+    n_shuffles = max(1, int(N_SHUFFLES * escala))
+    casos['sdss_nulo_permutacoes'] = (lambda: teste_permutacao_correlacao(residuos, predicao, n_shuffles, SEMENTE), None)
+
+    # Jackknife: estatísticas suficientes + réplicas delete-1 e delete-d
+    grupos = grupos_aleatorios(len(ra), 50, SEMENTE)
+    casos['jackknife_estatisticas'] = (lambda: estatisticas_suficientes(ra, z, residuos, grupos, 50), None)
+    S = estatisticas_suficientes(ra, z, residuos, grupos, 50)
+    casos['jackknife_replicas'] = (lambda: (jackknife_delete_um(S), jackknife_delete_d(S, 5, 5000, SEMENTE)), None)
+
+    # Pantheon+: ajuste linear do dipolo e Monte Carlo em blocos
+    n_sne = int(N_SNE * escala) or 1
+    n_vec = rng.normal(size=(n_sne, 3))
+    n_vec /= np.linalg.norm(n_vec, axis=1, keepdims=True)
+    z_sn = rng.uniform(0.01, 2.3, n_sne)
+    mu_res = rng.normal(0, 0.15, n_sne)
+    modelo = DipoloLinear(n_vec, z_sn, pesos=1 / np.full(n_sne, 0.15))
+    n_mc = max(1, int(N_MC * escala))
+    casos['pantheon_mc'] = (lambda: [modelo.ajustar(b) for b in gerar_blocos_permutados(mu_res, n_mc, SEMENTE)], None)
+
+    # SPARC: leitura fria da pasta (sem cache) e avaliação da lei
+    pasta_sparc = os.path.join(pasta, 'Rotmod_LTG')
+    escrever_sparc(pasta_sparc, max(1, int(N_GALAXIAS * escala)), rng)
+    cache_sparc = os.path.join(pasta, 'sparc_store.npz')
+
+    def sparc_frio():
+        if os.path.exists(cache_sparc):
+            os.remove(cache_sparc)
+        return (pasta_sparc, cache_sparc)
+    casos['sparc_leitura'] = (ArmazemSPARC.carregar, sparc_frio)
+    armazem = ArmazemSPARC.carregar(pasta_sparc, cache_sparc).somente_borda()
+    casos['sparc_lei_cortez'] = (lambda: armazem.erro_medio_absoluto(1.2e-10, 0.5, 0.7), None)
+
+    # CERN: conversão fria do CSV e abertura quente (memmap)
+    csv = os.path.join(pasta, 'Dimuon_DoubleMu.csv')
+    escrever_dimuon(csv, max(1, int(N_EVENTOS * escala)), rng)
+    cache_dimuon = os.path.join(pasta, 'Dimuon_DoubleMu_cache')
+
+    def dimuon_frio():
+        shutil.rmtree(cache_dimuon, ignore_errors=True)
+        return (csv, ('M', 'phi1', 'pt1', 'eta1'))
+    casos['dimuon_conversao'] = (carregar_dimuon, dimuon_frio)
+    casos['dimuon_memmap'] = (lambda: carregar_dimuon(csv, ('M', 'phi1', 'pt1', 'eta1')), None)
+
+    # Score de unificação: armazém e zeros sintéticos injetados no script mestre
+    master._ARMAZEM_SPARC = armazem
+    master._ZEROS_RIEMANN = pontos_gram(np.arange(max(1, int(N_ZEROS * escala))))
+    casos['master_varredura'] = (lambda: varrer_universos(master.COMPONENTES_ERRO, master.TRR_Constants,
+                                                          np.linspace(0.70, 0.90, 41), [19.68], refinamentos=2), None)
+    return casos
+
+# ==============================================================================
+# 3. EXECUÇÃO
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Bancada de desempenho das auditorias TRR.")
+    parser.add_argument('--escala', type=float, default=1.0, help="Multiplicador dos tamanhos sintéticos.")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--aquecimento', type=int, default=1)
+    parser.add_argument('--casos', nargs='*', help="Apenas estes casos (padrão: todos).")
+    parser.add_argument('--salvar', help="Grava os resultados como baseline JSON.")
+    parser.add_argument('--comparar', help="Compara com um baseline JSON; sai com código 1 se houver regressão.")
+    parser.add_argument('--tolerancia', type=float, default=0.20, help="Piora relativa aceita (mediana e memória).")
+    args = parser.parse_args()
+
+    print("="*80)
+    print(f"BANCADA DE DESEMPENHO TRR (escala {args.escala}, {args.repeticoes} repetições)")
+    print("="*80)
+
+    pasta = tempfile.mkdtemp(prefix='trr_bancada_')
+    try:
+        casos = montar_casos(args.escala, pasta)
+        if args.casos:
+            casos = {nome: caso for nome, caso in casos.items() if nome in args.casos}
+
+        resultados = {}
+        print(f"{'Caso':<26} | {'Mediana (ms)':>12} | {'p10':>9} | {'p90':>9} | {'Pico (MB)':>9}")
+        print("-" * 78)
+        for nome, (funcao, preparar) in casos.items():
+            r = medir(funcao, preparar, aquecimento=args.aquecimento, repeticoes=args.repeticoes)
+            resultados[nome] = r
+            print(f"{nome:<26} | {r['mediana']*1e3:>12.2f} | {r['p10']*1e3:>9.2f} | {r['p90']*1e3:>9.2f} | "
+                  f"{r['pico_memoria_mb']:>9.1f}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    parametros = {'escala': args.escala, 'repeticoes': args.repeticoes, 'semente': SEMENTE}
+    if args.salvar:
+        salvar_baseline(resultados, args.salvar, parametros)
+        print(f"\nBaseline gravado em {args.salvar}")
+
+    if args.comparar:
+        baseline = carregar_baseline(args.comparar)
+        if baseline['maquina'] != metadados_maquina():
+            print("\nAVISO: baseline gravado em outra máquina/ambiente; as razões são apenas indicativas.")
+        if baseline.get('parametros', {}).get('escala') != args.escala:
+            print("AVISO: escala diferente da do baseline.")
+        print(f"\n{'Caso':<26} | {'Atual/Base (tempo)':>18} | {'Atual/Base (mem)':>16} | Status")
+        print("-" * 78)
+        comparacao = comparar(resultados, baseline, args.tolerancia, args.tolerancia)
+        for c in comparacao:
+            mem = f"{c['razao_memoria']:.2f}x" if c['razao_memoria'] is not None else "-"
+            print(f"{c['caso']:<26} | {c['razao_tempo']:>17.2f}x | {mem:>16} | "
+                  f"{'REGRESSÃO' if c['regressao'] else 'ok'}")
+        if any(c['regressao'] for c in comparacao):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
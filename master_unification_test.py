@@ -1,15 +1,14 @@
 import numpy as np
-import pandas as pd
-import os
-import glob
 
-print("="*80)
-print("TRR: PROTOCOLO DE UNIFICAÇÃO MESTRA (REAL DATA AUDIT)")
-print("Objetivo: Provar a rigidez estrutural usando APENAS dados observacionais/matemáticos reais.")
-print("="*80)
+from trr_core.rastreio import etapa
+from trr_core.sparc import ArmazemSPARC
+from trr_core.varredura import Componente, varrer_universos
+from trr_core.zeros_riemann import zeros_riemann
 
 # CONFIGURAÇÃO DE CAMINHOS (Ajuste se necessário)
 PASTA_SPARC = r'./Rotmod_LTG'
+ARQUIVO_ZEROS_RIEMANN = r'./zeros_riemann.f64'
+N_ZEROS_RIEMANN = 100000  # Gerados localmente na primeira execução
 
 # ==============================================================================
 # 1. O NÚCLEO IMUTÁVEL (CONSTANTES TRR)
@@ -31,68 +30,63 @@ class TRR_Constants:
 # 2. MOTORES DE TESTE COM DADOS REAIS
 # ==============================================================================
 
+_ARMAZEM_SPARC = None
+
+def armazem_sparc():
+    """
+    Lê a pasta SPARC UMA vez por processo (ou reabre o cache .npz) e guarda
+    apenas os pontos de borda. Cada universo avaliado reutiliza os arrays.
+    """
+    global _ARMAZEM_SPARC
+    if _ARMAZEM_SPARC is None:
+        _ARMAZEM_SPARC = ArmazemSPARC.carregar(PASTA_SPARC).somente_borda()
+    return _ARMAZEM_SPARC
+
 def teste_sparc_real(const):
     """
-    Lê os arquivos .dat REAIS da pasta SPARC.
+    Usa os arquivos .dat REAIS da pasta SPARC (via armazém pré-carregado).
     Calcula o resíduo médio global da Lei de Cortez para todas as galáxias.
     """
-    arquivos = glob.glob(os.path.join(PASTA_SPARC, "*.dat"))
-    if not arquivos:
+    armazem = armazem_sparc()
+    if len(armazem) == 0:
         print("ERRO CRÍTICO: Pasta SPARC vazia ou não encontrada.")
         return 9999.0 # Erro infinito
 
-    erros_velocidade = []
-    
     # ML Fixo (Spitzer) - Padrão Ouro
     ML_disk = 0.5
     ML_bul = 0.7
 
-    for arq in arquivos: 
-        try:
-            df = pd.read_csv(arq, sep=r'\s+', comment='#', header=None,
-                             names=['Rad', 'Vobs', 'errV', 'Vgas', 'Vdisk', 'Vbul', 'SBdis', 'SBbul'])
-            df = df.apply(pd.to_numeric, errors='coerce').dropna()
-            
-            # Filtro de Borda (Onde a TRR atua - Regime de Baixa Aceleração)
-            # Alinhado com o script dedicado (0.8 * r_max) para precisão máxima
-            r_max = df['Rad'].max()
-            df = df[df['Rad'] > r_max * 0.8] 
-            if df.empty: continue
-
-            # Física Real
-            v_bar_sq = df['Vgas']**2 + (df['Vdisk']**2 * ML_disk) + (df['Vbul']**2 * ML_bul)
-            r_m = df['Rad'] * 3.086e19 # kpc -> m
-            v_bar_si = v_bar_sq * 1e6 # (km/s)^2 -> (m/s)^2
-            
-            # Evitar erros matemáticos
-            valid = (r_m > 0) & (v_bar_sq > 0)
-            if not valid.any(): continue
-            
-            # Aceleração Newtoniana
-            g_bar = v_bar_si[valid] / r_m[valid]
-            
-            # LEI DE CORTEZ (Dependente de const.A0, que depende de D0)
-            fator = 1 - np.exp(-np.sqrt(g_bar / const.A0))
-            g_trr = g_bar / fator
-            v_trr = np.sqrt(g_trr * r_m[valid]) / 1000 # m/s -> km/s
-            
-            # Erro Médio Absoluto desta galáxia
-            res = np.mean(np.abs(v_trr - df['Vobs'][valid]))
-            erros_velocidade.append(res)
-            
-        except: continue
+    # Filtro de Borda (Onde a TRR atua - Regime de Baixa Aceleração) já aplicado no armazém,
+    # alinhado com o script dedicado (0.8 * r_max) para precisão máxima.
+    # LEI DE CORTEZ (Dependente de const.A0, que depende de D0): uma passada vetorizada,
+    # Erro Médio Absoluto de cada galáxia via np.add.reduceat
+    with etapa('teste_sparc_real', linhas=len(armazem.rad), a0=const.A0):
+        erros_velocidade = armazem.erro_medio_absoluto(const.A0, ML_disk, ML_bul)
+    erros_velocidade = erros_velocidade[np.isfinite(erros_velocidade)]
     
     # Retorna o Erro Médio Global do Universo (km/s)
-    if not erros_velocidade: return 9999.0
+    if erros_velocidade.size == 0: return 9999.0
     return np.mean(erros_velocidade)
 
+_ZEROS_RIEMANN = None
+
+def zeros_riemann_reais():
+    """
+    Os N_ZEROS_RIEMANN primeiros zeros não-triviais, calculados localmente
+    (Riemann-Siegel + verificação de Gram) e lidos em memmap da tabela.
+    """
+    global _ZEROS_RIEMANN
+    if _ZEROS_RIEMANN is None:
+        _ZEROS_RIEMANN = zeros_riemann(N_ZEROS_RIEMANN, ARQUIVO_ZEROS_RIEMANN)
+    return _ZEROS_RIEMANN
+
 def teste_riemann_real(const):
     """
-    Usa os Zeros de Riemann REAIS (Tabela LMFDB).
+    Usa os Zeros de Riemann REAIS (N_ZEROS_RIEMANN primeiros, tabela local).
     Verifica se a fase TRR (Omega/D0) sincroniza com eles.
     """
-    # Primeiros 5 zeros não-triviais (Parte Imaginária) - DADOS MATEMÁTICOS REAIS
-    zeros_reais = np.array([14.134725, 21.022040, 25.010857, 30.424876, 32.935061])
+    # Zeros não-triviais (Parte Imaginária) - DADOS MATEMÁTICOS REAIS
+    zeros_reais = zeros_riemann_reais()
     
     # A hipótese TRR (Vol V): Zeros são harmônicos da viscosidade temporal.
     # Frequência de Base = Omega_P / D0
@@ -149,7 +143,36 @@ def avaliar_universo(nome, d0, omega):
     print(f"    >>> ERROR SCORE TOTAL: {total_error:.5f}")
     return total_error
 
+# ==============================================================================
+# 4. VARREDURA DENSA DE UNIVERSOS (D0, OMEGA_P)
+# ==============================================================================
+# Mesmos pesos de avaliar_universo. Cada teste é memoizado apenas nas constantes
+# de que realmente depende: SPARC em A0, Riemann em (D0, OMEGA_P), Navier-Stokes em D0.
+COMPONENTES_ERRO = [
+    Componente('erro_sparc', teste_sparc_real, ('A0',), 1 / 10.0),
+    Componente('erro_riemann', teste_riemann_real, ('D0', 'OMEGA_P'), 5.0),
+    Componente('erro_ns', teste_navier_stokes_limite, ('D0',), 1.0),
+]
+
+def varredura_universos(d0s, omegas, arquivo_tabela="varredura_universos.csv", refinamentos=3, n_workers=None):
+    """
+    Erro total em uma grade densa (1-D ou 2-D), refinada em torno do mínimo.
+    A curvatura final transforma o 'mínimo local' em uma medida quantitativa.
+    """
+    resultado = varrer_universos(COMPONENTES_ERRO, TRR_Constants, d0s, omegas, arquivo_tabela=arquivo_tabela,
+                                 n_workers=n_workers, refinamentos=refinamentos)
+    minimo = resultado['minimo']
+    print(f"    Avaliações distintas: {resultado['avaliacoes']} | Linhas na tabela: {len(resultado['linhas'])}")
+    print(f"    Mínimo: D0={minimo['d0']:.5f}, OMEGA_P={minimo['omega_p']:.4f}, Erro={minimo['total_error']:.5f}")
+    print(f"    Hessiana local: {np.array2string(resultado['hessiana'], precision=4)}")
+    return resultado
+
 if __name__ == "__main__":
+    print("="*80)
+    print("TRR: PROTOCOLO DE UNIFICAÇÃO MESTRA (REAL DATA AUDIT)")
+    print("Objetivo: Provar a rigidez estrutural usando APENAS dados observacionais/matemáticos reais.")
+    print("="*80)
+
     # A. Universo TRR (Nominal)
     print("Processando dados reais... (Isso pode levar alguns segundos)")
     score_nom = avaliar_universo("TRR NOMINAL (D0=0.794)", 0.794, 19.68)
@@ -175,4 +198,10 @@ if __name__ == "__main__":
         print("A teoria é RÍGIDA (Falseável).")
     else:
         print("\n[FALHA] O universo perturbado funcionou melhor ou igual.")
-        print("A teoria é flexível demais.")
\ No newline at end of file
+        print("A teoria é flexível demais.")
+
+    # C. Varredura densa em D0 (curvatura real em vez de um único contraste de 2%)
+    print("\n" + "="*80)
+    print("VARREDURA DENSA DE UNIVERSOS (D0 x OMEGA_P)")
+    print("="*80)
+    varredura_universos(np.linspace(0.70, 0.90, 41), [19.68])
\ No newline at end of file
@@ -0,0 +1,18 @@
+import numpy as np
+
+from trr_core.navier_stokes import FluxoEspectral, taylor_green
+
+
+def _energias(cortez, passos=40):
+    fluxo = FluxoEspectral(16, dim=3, nu=0.0, cortez=cortez, workers=1)
+    fluxo.definir_velocidade(taylor_green(16, 3))
+    historico = fluxo.executar(t_final=1.0, max_passos=passos)
+    return np.array([l['energia'] for l in historico])
+
+
+def test_amortecimento_cortez_retira_energia():
+    padrao, cortez = _energias(False), _energias(True)
+    # Sem viscosidade, o fluxo padrão conserva a energia; o arrasto de Cortez a faz cair a cada passo
+    assert np.allclose(padrao, padrao[0], rtol=1e-4)
+    assert np.all(np.diff(cortez) < 0)
+    assert cortez[-1] < 0.9 * padrao[-1]
@@ -0,0 +1,7 @@
+"""
+Núcleo compartilhado dos scripts de auditoria TRR.
+
+Os scripts em 'Core Cosmological Audits', 'Experimental & Robustness' e
+'Millennium Prize Solutions' continuam independentes; este pacote reúne
+apenas os motores numéricos reutilizados por mais de um deles.
+"""
@@ -0,0 +1,367 @@
+"""
+Acumulador Incremental da Auditoria LAGEOS (um produto SP3 por vez).
+
+Cada produto SP3 é lido, ajustado (arcos dentro do próprio arquivo) e
+reduzido uma única vez a estatísticas suficientes da correlação
+alinhamento x resíduo radial, por (satélite, dia): n, médias e
+co-momentos centrados (xx, yy, xy). Elas ficam em um '.npz' por produto
+dentro da pasta de estado, com um manifesto JSON (versão, assinatura
+tamanho/mtime, hash e dias cobertos).
+
+A pasta guarda também a tabela combinada por (satélite, dia), com o
+produto dono de cada célula: o que tem mais épocas naquele dia (empate:
+o mais recente na ordem dos nomes), para que produtos sobrepostos não
+contem o mesmo dia duas vezes. Ingerir ou remover um produto só decide
+de novo as células dos dias dele, entre os produtos que cobrem esses
+dias; as consultas leem apenas a tabela combinada e juntam as células de
+forma exata (fórmula agrupada de Chan). O sigma de janelas móveis sai de
+somas cumulativas dos momentos diários, em O(dias).
+
+Diferenças para a auditoria em lote: lá os arcos são ajustados sobre a
+série já concatenada e as épocas repetidas são resolvidas uma a uma;
+aqui os arcos ficam dentro de cada produto e a sobreposição é resolvida
+por dia inteiro.
+
+Uma nova versão do mesmo produto (ex.: .v81 no lugar de .v80) substitui
+a anterior; versões mais antigas são ignoradas; remover() apaga um produto.
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+from .catalogo_sdss import _assinatura, _hash_arquivo
+from .orbita import DURACAO_ARCO_H, residuos_orbita
+from .sp3 import ler_sp3
+
+ARQUIVO_MANIFESTO = 'manifesto.json'
+ARQUIVO_DIARIAS = 'diarias.npz'
+EIXO_CORTEZ_RA = 148.9
+FORMATO_ESTADO = 3  # Momentos por (satélite, dia) + tabela combinada; estados antigos são reprocessados
+CAMPOS = ('sat', 'janela', 'n', 'media', 'comomento')
+_PADRAO_VERSAO = re.compile(r'\.v(\d+)(?=\.)')
+
+
+def chave_produto(caminho):
+    """Nome do produto sem a versão: asi.orb.lageos2.251220.v80.sp3 -> asi.orb.lageos2.251220.sp3."""
+    return _PADRAO_VERSAO.sub('', os.path.basename(caminho))
+
+
+def versao_produto(caminho):
+    """Número da versão no nome (.v80 -> 80); -1 se o nome não tiver versão."""
+    m = _PADRAO_VERSAO.search(os.path.basename(caminho))
+    return int(m.group(1)) if m else -1
+
+
+def mais_recentes(arquivos):
+    """Apenas a versão mais nova de cada produto, na ordem original."""
+    melhor = {}
+    for arq in arquivos:
+        chave = chave_produto(arq)
+        if chave not in melhor or versao_produto(arq) >= versao_produto(melhor[chave]):
+            melhor[chave] = arq
+    escolhidos = set(melhor.values())
+    return [a for a in arquivos if a in escolhidos]
+
+
+def _epocas_vazias():
+    return {'tempo': np.empty(0, 'datetime64[ns]'), 'sat': np.empty(0, 'U3'), 'x': np.empty(0), 'y': np.empty(0)}
+
+
+def _tabela_vazia():
+    return {'sat': np.empty(0, 'U3'), 'janela': np.empty(0, 'datetime64[D]'), 'n': np.empty(0, np.int64),
+            'media': np.empty((0, 2)), 'comomento': np.empty((0, 3)), 'dono': np.empty(0, 'U1')}
+
+
+def residuos_arquivo(caminho, satelites=None, eixo_ra=EIXO_CORTEZ_RA, duracao_h=DURACAO_ARCO_H):
+    """
+    Por época válida de um produto SP3: dict com 'tempo' (datetime64[ns]),
+    'sat', 'x' (alinhamento com o eixo) e 'y' (resíduo radial, km).
+    """
+    orbita = ler_sp3(caminho, satelites)
+    partes = {'tempo': [], 'sat': [], 'x': [], 'y': []}
+    for sat in np.unique(orbita['sat']):
+        sel = orbita['sat'] == sat
+        tempo, pos = orbita['tempo'][sel], orbita['pos'][sel]
+        radial = residuos_orbita(tempo, pos, duracao_h=duracao_h, n_workers=1)['radial']
+        ra = np.degrees(np.arctan2(pos[:, 1], pos[:, 0])) % 360
+        ok = np.isfinite(radial)
+        partes['tempo'].append(tempo[ok])
+        partes['sat'].append(np.full(ok.sum(), sat, dtype='U3'))
+        partes['x'].append(np.cos(np.radians(ra[ok] - eixo_ra)))
+        partes['y'].append(radial[ok])
+    if not partes['x']:
+        return _epocas_vazias()
+    return {k: np.concatenate(v) for k, v in partes.items()}
+
+
+def combinar_grupos(grupo, n_grupos, n, media, comomento):
+    """
+    Combinação exata por grupo (vetorizada): entradas (n, médias (k, 2),
+    co-momentos (k, 3)) com rótulo grupo -> (N, média, co-momento) por grupo.
+    """
+    N = np.bincount(grupo, weights=n, minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_g = np.column_stack([np.bincount(grupo, weights=n * media[:, j], minlength=n_grupos) / N
+                                   for j in range(2)])
+    d = media - media_g[grupo]
+    C = np.column_stack([np.bincount(grupo, weights=comomento[:, j] + n * d[:, a] * d[:, b], minlength=n_grupos)
+                         for j, (a, b) in enumerate(((0, 0), (1, 1), (0, 1)))])
+    return N.astype(np.int64), media_g, C
+
+
+def estatisticas_diarias(epocas):
+    """Épocas -> estatísticas suficientes por (satélite, dia): 'sat', 'janela', 'n', 'media', 'comomento'."""
+    if not len(epocas['x']):
+        return {k: _tabela_vazia()[k] for k in CAMPOS}
+    dia = epocas['tempo'].astype('datetime64[D]')
+    sats, i_sat = np.unique(epocas['sat'], return_inverse=True)
+    chaves, grupo = np.unique(np.column_stack((i_sat, dia.astype(np.int64))), axis=0, return_inverse=True)
+    grupo = grupo.ravel()
+    um = np.ones(len(grupo))
+    N, media, C = combinar_grupos(grupo, len(chaves), um, np.column_stack((epocas['x'], epocas['y'])),
+                                  np.zeros((len(grupo), 3)))
+    return {'sat': sats[chaves[:, 0]], 'janela': chaves[:, 1].astype('datetime64[D]'), 'n': N,
+            'media': media, 'comomento': C}
+
+
+def estatisticas_arquivo(caminho, satelites=None, eixo_ra=EIXO_CORTEZ_RA, duracao_h=DURACAO_ARCO_H):
+    """Estatísticas suficientes de um produto SP3 por (satélite, dia) (ver estatisticas_diarias)."""
+    return estatisticas_diarias(residuos_arquivo(caminho, satelites, eixo_ra, duracao_h))
+
+
+def _celulas(t):
+    """Rótulo de cada célula (satélite, dia) de uma tabela."""
+    return np.char.add(np.char.add(t['sat'].astype('U3'), '@'), t['janela'].astype('U10'))
+
+
+def resolver_donos(candidatos, alvo=None):
+    """
+    Tabelas por (satélite, dia) de vários produtos {chave: tabela} -> uma
+    entrada por célula, com a coluna 'dono': fica o produto com mais épocas
+    no dia e, no empate, o mais recente na ordem dos nomes. 'alvo' (rótulos
+    de _celulas) restringe o resultado a essas células.
+    """
+    chaves = sorted(candidatos)
+    if not chaves:
+        return _tabela_vazia()
+    t = {k: np.concatenate([candidatos[c][k] for c in chaves]) for k in CAMPOS}
+    posto = np.repeat(np.arange(len(chaves)), [len(candidatos[c]['n']) for c in chaves])
+    t['dono'] = np.array(chaves)[posto]
+    celula = _celulas(t)
+    if alvo is not None:
+        sel = np.isin(celula, alvo)
+        t, celula, posto = {k: v[sel] for k, v in t.items()}, celula[sel], posto[sel]
+    ordem = np.lexsort((posto, t['n'], celula))
+    celula = celula[ordem]
+    melhor = np.ones(len(ordem), dtype=bool)
+    melhor[:-1] = celula[1:] != celula[:-1]
+    return {k: v[ordem][melhor] for k, v in t.items()}
+
+
+def _ordenar(t):
+    ordem = np.lexsort((t['sat'], t['janela']))
+    return {k: v[ordem] for k, v in t.items()}
+
+
+def _gravar_npz(arq, **dados):
+    np.savez(arq + '.tmp.npz', **dados)
+    os.replace(arq + '.tmp.npz', arq)
+
+
+def combinar(n, media, comomento):
+    """Combinação exata de entradas (n, médias, co-momentos) -> (N, média, co-momento)."""
+    if n.sum() == 0:
+        return 0, np.full(2, np.nan), np.full(3, np.nan)
+    N, media_total, C = combinar_grupos(np.zeros(len(n), dtype=np.intp), 1, n, media, comomento)
+    return int(N[0]), media_total[0], C[0]
+
+
+def _sigma(N, C):
+    if N < 3 or C[0] <= 0 or C[1] <= 0:
+        return np.nan, np.nan
+    r = C[2] / np.sqrt(C[0] * C[1])
+    return r, abs(r) * np.sqrt(N)
+
+
+class AcumuladorLAGEOS:
+    """Estado persistente (pasta com um .npz por produto, a tabela combinada e um manifesto)."""
+
+    def __init__(self, pasta, satelites=None, eixo_ra=EIXO_CORTEZ_RA, duracao_h=DURACAO_ARCO_H):
+        self.pasta = pasta
+        self.satelites = satelites
+        self.eixo_ra = eixo_ra
+        self.duracao_h = duracao_h
+        os.makedirs(pasta, exist_ok=True)
+        arq = os.path.join(pasta, ARQUIVO_MANIFESTO)
+        self.manifesto = {}
+        if os.path.exists(arq):
+            with open(arq, encoding='utf-8') as f:
+                self.manifesto = json.load(f)
+        # Produtos gravados em formatos antigos são esquecidos e reprocessados no próximo ingerir()
+        antigos = [c for c, item in self.manifesto.items() if item.get('formato') != FORMATO_ESTADO]
+        for chave in antigos:
+            del self.manifesto[chave]
+            self._apagar_produto(chave)
+        if antigos:
+            self._gravar_manifesto()
+        self._diarias = self._carregar_diarias()
+
+    def _arquivo_produto(self, chave):
+        return os.path.join(self.pasta, chave + '.npz')
+
+    def _apagar_produto(self, chave):
+        if os.path.exists(self._arquivo_produto(chave)):
+            os.remove(self._arquivo_produto(chave))
+
+    def _carregar_produto(self, chave):
+        with np.load(self._arquivo_produto(chave)) as npz:
+            return {k: npz[k] for k in CAMPOS}
+
+    def _gravar_manifesto(self):
+        tmp = os.path.join(self.pasta, ARQUIVO_MANIFESTO + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifesto, f, indent=1)
+        os.replace(tmp, os.path.join(self.pasta, ARQUIVO_MANIFESTO))
+
+    def _carregar_diarias(self):
+        """
+        Tabela combinada gravada; é reconstruída a partir dos produtos (uma
+        vez) se faltar, for de outro formato ou citar produto fora do manifesto
+        (ex.: interrupção entre gravar a tabela e o manifesto).
+        """
+        arq = os.path.join(self.pasta, ARQUIVO_DIARIAS)
+        if os.path.exists(arq):
+            with np.load(arq) as npz:
+                if int(npz['formato']) == FORMATO_ESTADO:
+                    t = {k: npz[k] for k in CAMPOS + ('dono',)}
+                    if set(np.unique(t['dono'])) <= set(self.manifesto):
+                        return t
+        if not self.manifesto and not os.path.exists(arq):
+            return _tabela_vazia()
+        t = _ordenar(resolver_donos({c: self._carregar_produto(c) for c in self.manifesto}))
+        _gravar_npz(arq, formato=FORMATO_ESTADO, **t)
+        return t
+
+    def _vizinhos(self, dias, exceto):
+        """Tabelas dos produtos guardados cujos dias cobertos tocam [min(dias), max(dias)]."""
+        if not len(dias):
+            return {}
+        inicio, fim = str(dias.min()), str(dias.max())
+        return {c: self._carregar_produto(c) for c, item in self.manifesto.items()
+                if c != exceto and item['primeiro'] is not None and item['primeiro'] <= fim and item['ultimo'] >= inicio}
+
+    def _atualizar_celulas(self, chave, nova=None):
+        """
+        Tira da tabela combinada as células do produto 'chave' (as que ele
+        possuía e as que a nova tabela dele cobre) e decide de novo o dono
+        delas entre a nova tabela e os produtos vizinhos. nova=None remove.
+        """
+        t = self._diarias
+        celula = _celulas(t)
+        alvo = celula[t['dono'] == chave]
+        dias = t['janela'][t['dono'] == chave]
+        candidatos = self._vizinhos(np.concatenate((dias, nova['janela'])) if nova is not None else dias, chave)
+        if nova is not None:
+            alvo = np.union1d(alvo, _celulas(nova))
+            candidatos[chave] = nova
+        novas = resolver_donos(candidatos, alvo)
+        manter = ~np.isin(celula, alvo)
+        self._diarias = _ordenar({k: np.concatenate((v[manter], novas[k])) for k, v in t.items()})
+        _gravar_npz(os.path.join(self.pasta, ARQUIVO_DIARIAS), formato=FORMATO_ESTADO, **self._diarias)
+
+    def _atualizado(self, caminho, atual, versao):
+        """True se o estado já tem esta versão (ou uma mais nova) do produto."""
+        if atual is None or atual.get('formato') != FORMATO_ESTADO:
+            return False
+        if atual['versao'] != versao or atual['arquivo'] != os.path.basename(caminho):
+            return atual['versao'] >= versao
+        # Mesmo arquivo: tamanho e mtime primeiro; o hash só se o mtime mudou
+        assinatura = _assinatura(caminho)
+        if atual['tamanho'] != assinatura['tamanho']:
+            return False
+        if atual['mtime_ns'] != assinatura['mtime_ns']:
+            if _hash_arquivo(caminho) != atual['hash']:
+                return False
+            atual.update(assinatura)
+            self._gravar_manifesto()
+        return True
+
+    def ingerir(self, caminho):
+        """
+        Processa um produto se ele for novo, tiver mudado ou for uma versão
+        mais nova que a guardada. Retorna True se o estado mudou.
+        """
+        chave = chave_produto(caminho)
+        versao = versao_produto(caminho)
+        if self._atualizado(caminho, self.manifesto.get(chave), versao):
+            return False
+
+        est = estatisticas_arquivo(caminho, self.satelites, self.eixo_ra, self.duracao_h)
+        _gravar_npz(self._arquivo_produto(chave), **est)
+        self._atualizar_celulas(chave, est)
+        cobertos = [str(est['janela'].min()), str(est['janela'].max())] if len(est['n']) else [None, None]
+        self.manifesto[chave] = dict(arquivo=os.path.basename(caminho), versao=versao, formato=FORMATO_ESTADO,
+                                     hash=_hash_arquivo(caminho), n=int(est['n'].sum()),
+                                     primeiro=cobertos[0], ultimo=cobertos[1], **_assinatura(caminho))
+        self._gravar_manifesto()
+        return True
+
+    def remover(self, chave):
+        """Remove um produto (chave_produto ou nome do arquivo) do estado."""
+        chave = chave_produto(chave)
+        if self.manifesto.pop(chave, None) is None:
+            return False
+        self._atualizar_celulas(chave)
+        self._gravar_manifesto()
+        self._apagar_produto(chave)
+        return True
+
+    def _tabela(self):
+        """Tabela combinada: uma entrada (sat, janela, n, media, comomento, dono) por (satélite, dia)."""
+        return self._diarias
+
+    def estatisticas(self, sat=None, inicio=None, fim=None):
+        """Correlação e sigma combinados (filtros opcionais por satélite e intervalo de dias)."""
+        t = self._tabela()
+        sel = np.ones(len(t['n']), dtype=bool)
+        if sat is not None:
+            sel &= t['sat'] == sat
+        if inicio is not None:
+            sel &= t['janela'] >= np.datetime64(inicio, 'D')
+        if fim is not None:
+            sel &= t['janela'] <= np.datetime64(fim, 'D')
+        N, media, C = combinar(t['n'][sel], t['media'][sel], t['comomento'][sel])
+        r, sigma = _sigma(N, C)
+        return {'n': N, 'correlacao': r, 'sigma': sigma, 'media': media}
+
+    def sigma_janelas(self, largura_dias=30, sat=None):
+        """
+        Sigma móvel: para cada dia com dados, a janela [dia - largura + 1, dia].
+        Os dias são combinados uma vez e as janelas saem de somas cumulativas
+        dos momentos (centrados na média global, para não perder precisão).
+        """
+        t = self._tabela()
+        if sat is not None:
+            t = {k: v[t['sat'] == sat] for k, v in t.items()}
+        dias, grupo = np.unique(t['janela'], return_inverse=True)
+        if not len(dias):
+            return dias, np.empty(0)
+        n, media, C = combinar_grupos(grupo.ravel(), len(dias), t['n'], t['media'], t['comomento'])
+
+        a = media - combinar(n, media, C)[1]
+        brutos = np.column_stack((n, n * a[:, 0], n * a[:, 1], C[:, 0] + n * a[:, 0] ** 2,
+                                  C[:, 1] + n * a[:, 1] ** 2, C[:, 2] + n * a[:, 0] * a[:, 1]))
+        acumulado = np.vstack((np.zeros(6), np.cumsum(brutos, axis=0)))
+        inicio = np.searchsorted(dias, dias - np.timedelta64(largura_dias - 1, 'D'), side='left')
+        S = acumulado[np.arange(1, len(dias) + 1)] - acumulado[inicio]
+
+        N = S[:, 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cxx = S[:, 3] - S[:, 1] ** 2 / N
+            cyy = S[:, 4] - S[:, 2] ** 2 / N
+            cxy = S[:, 5] - S[:, 1] * S[:, 2] / N
+            r = cxy / np.sqrt(cxx * cyy)
+        validos = (N >= 3) & (cxx > 0) & (cyy > 0)
+        return dias, np.where(validos, np.abs(r) * np.sqrt(N), np.nan)
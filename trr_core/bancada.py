@@ -0,0 +1,97 @@
+"""
+Bancada de Medição de Desempenho (aquecimento, repetições, percentis, memória).
+
+Cada caso é uma função sem argumentos, opcionalmente precedida por um
+'preparar' (fora da medição) que devolve os argumentos da chamada, para
+que estados como caches sejam recriados antes de cada repetição. O tempo
+é de parede (perf_counter); a memória de pico vem de uma execução extra
+sob tracemalloc, separada das repetições cronometradas (o rastreamento
+desacelera a chamada).
+
+Os resultados são gravados em JSON (baseline) com os metadados da
+máquina; comparar() marca como regressão um caso cuja mediana (ou pico
+de memória) piorou além da tolerância.
+"""
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+TOLERANCIA_TEMPO = 0.20  # Mediana até 20% mais lenta ainda passa
+TOLERANCIA_MEMORIA = 0.20
+PERCENTIS = (10, 50, 90)
+
+
+def medir(funcao, preparar=None, aquecimento=1, repeticoes=5, memoria=True):
+    """
+    Mede funcao(*preparar()) e retorna dict com 'tempos' (s), 'mediana',
+    'p10', 'p90', 'minimo', 'media', 'repeticoes' e 'pico_memoria_mb'.
+    """
+    def chamar():
+        args = preparar() if preparar is not None else ()
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao(*args)
+        return time.perf_counter() - inicio
+
+    for _ in range(aquecimento):
+        chamar()
+    tempos = np.array([chamar() for _ in range(repeticoes)])
+
+    pico = None
+    if memoria:
+        args = preparar() if preparar is not None else ()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao(*args)
+            pico = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+
+    p10, p50, p90 = np.percentile(tempos, PERCENTIS)
+    return {'tempos': tempos.tolist(), 'mediana': float(p50), 'p10': float(p10), 'p90': float(p90),
+            'minimo': float(tempos.min()), 'media': float(tempos.mean()), 'repeticoes': repeticoes,
+            'pico_memoria_mb': pico}
+
+
+def metadados_maquina():
+    return {'plataforma': platform.platform(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'cpus': os.cpu_count(), 'processador': platform.processor()}
+
+
+def salvar_baseline(resultados, caminho, parametros=None):
+    dados = {'maquina': metadados_maquina(), 'parametros': parametros or {}, 'casos': resultados}
+    tmp = caminho + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=1)
+    os.replace(tmp, caminho)
+
+
+def carregar_baseline(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparar(resultados, baseline, tolerancia_tempo=TOLERANCIA_TEMPO, tolerancia_memoria=TOLERANCIA_MEMORIA):
+    """
+    Lista de dicts (um por caso presente nos dois) com as razões atual/base
+    de mediana e de pico de memória e o indicador 'regressao'.
+    """
+    comparacao = []
+    for nome, atual in resultados.items():
+        base = baseline['casos'].get(nome)
+        if base is None:
+            continue
+        razao_tempo = atual['mediana'] / base['mediana'] if base['mediana'] > 0 else np.inf
+        razao_mem = None
+        if atual.get('pico_memoria_mb') is not None and base.get('pico_memoria_mb'):
+            razao_mem = atual['pico_memoria_mb'] / base['pico_memoria_mb']
+        regressao = razao_tempo > 1 + tolerancia_tempo or (razao_mem is not None and razao_mem > 1 + tolerancia_memoria)
+        comparacao.append({'caso': nome, 'mediana': atual['mediana'], 'mediana_base': base['mediana'],
+                           'razao_tempo': razao_tempo, 'razao_memoria': razao_mem, 'regressao': regressao})
+    return comparacao
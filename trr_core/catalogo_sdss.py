@@ -0,0 +1,174 @@
+"""
+Carregador Colunar do Catálogo SDSS DR16Q (Superset v3).
+
+O FITS é aberto em memmap e apenas as colunas pedidas são projetadas;
+os cortes (z, magnitude) são avaliados antes de qualquer cópia, então só
+as linhas selecionadas são convertidas para a ordem de bytes nativa.
+
+No primeiro uso cada coluna é gravada como '.npy' nativo em uma pasta de
+cache ao lado do FITS. O manifesto guarda tamanho, mtime e hash do
+arquivo original; as execuções seguintes abrem o cache em memmap
+(zero-cópia) e o hash só é recalculado quando o mtime muda.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .rastreio import linhas_colunas, rastrear
+
+# nome no cache -> (coluna FITS, índice da banda ou None)
+COLUNAS_DR16Q = {
+    'ra': ('RA', None),
+    'z': ('Z', None),
+    'mag_i': ('PSFMAG', 3),  # Banda i (u, g, r, i, z)
+}
+
+TAMANHO_BLOCO_LINHAS = 1_000_000  # Conversão de endianness em blocos (memória limitada)
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+
+def pasta_cache_padrao(caminho):
+    """Pasta de cache ao lado do FITS: DR16Q_Superset_v3_cache/."""
+    return os.path.splitext(caminho)[0] + '_cache'
+
+
+def _hash_arquivo(caminho, bloco=8 * 2**20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for parte in iter(lambda: f.read(bloco), b''):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def _assinatura(caminho):
+    st = os.stat(caminho)
+    return {'tamanho': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _gravar_manifesto(pasta_cache, manifesto):
+    tmp = os.path.join(pasta_cache, ARQUIVO_MANIFESTO + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=1)
+    os.replace(tmp, os.path.join(pasta_cache, ARQUIVO_MANIFESTO))
+
+
+def _ler_manifesto(caminho, pasta_cache):
+    """Manifesto válido para o FITS atual, ou None se o cache estiver obsoleto."""
+    arq = os.path.join(pasta_cache, ARQUIVO_MANIFESTO)
+    if not os.path.exists(arq):
+        return None
+    with open(arq, encoding='utf-8') as f:
+        manifesto = json.load(f)
+
+    assinatura = _assinatura(caminho)
+    if manifesto.get('tamanho') != assinatura['tamanho']:
+        return None
+    if manifesto.get('mtime_ns') != assinatura['mtime_ns']:
+        # Arquivo copiado ou tocado: só o conteúdo decide
+        if _hash_arquivo(caminho) != manifesto.get('hash'):
+            return None
+        manifesto.update(assinatura)
+        _gravar_manifesto(pasta_cache, manifesto)
+    return manifesto
+
+
+def _projetar_fits(dados, especificacao):
+    """Views memmap (ordem de bytes do FITS) apenas das colunas pedidas."""
+    colunas = {}
+    for nome, (coluna, indice) in especificacao.items():
+        arr = dados.field(coluna)
+        colunas[nome] = arr if indice is None else arr[:, indice]
+    return colunas
+
+
+def _escrever_colunas(caminho, pasta_cache, especificacao):
+    from astropy.io import fits
+
+    with fits.open(caminho, memmap=True) as hdul:
+        origem = _projetar_fits(hdul[1].data, especificacao)
+        for nome, arr in origem.items():
+            final = os.path.join(pasta_cache, nome + '.npy')
+            tmp = final + '.tmp'
+            saida = np.lib.format.open_memmap(tmp, mode='w+', shape=arr.shape,
+                                              dtype=arr.dtype.newbyteorder('='))
+            for i in range(0, len(arr), TAMANHO_BLOCO_LINHAS):
+                saida[i:i + TAMANHO_BLOCO_LINHAS] = arr[i:i + TAMANHO_BLOCO_LINHAS]
+            saida.flush()
+            del saida
+            os.replace(tmp, final)
+
+
+def _abrir_cache(caminho, pasta_cache, especificacao):
+    manifesto = _ler_manifesto(caminho, pasta_cache)
+    if manifesto is None:
+        print(f"Cache colunar ausente ou obsoleto. Convertendo {os.path.basename(caminho)}...")
+        os.makedirs(pasta_cache, exist_ok=True)
+        manifesto = dict(_assinatura(caminho), hash=_hash_arquivo(caminho), colunas={})
+
+    faltantes = {nome: spec for nome, spec in especificacao.items()
+                 if manifesto['colunas'].get(nome) != list(spec)}
+    if faltantes:
+        _escrever_colunas(caminho, pasta_cache, faltantes)
+        manifesto['colunas'].update({nome: list(spec) for nome, spec in faltantes.items()})
+        _gravar_manifesto(pasta_cache, manifesto)
+
+    return {nome: np.load(os.path.join(pasta_cache, nome + '.npy'), mmap_mode='r')
+            for nome in especificacao}
+
+
+def _mascara_cortes(colunas, cortes):
+    """
+    cortes: {nome: (min, max)} com limites estritos, ou (min, max, True)
+    para limites inclusivos. None desativa o limite.
+    """
+    mascara = None
+    for nome, corte in cortes.items():
+        lo, hi = corte[0], corte[1]
+        inclusivo = len(corte) > 2 and corte[2]
+        arr = colunas[nome]
+        for limite, op in ((lo, np.greater_equal if inclusivo else np.greater),
+                           (hi, np.less_equal if inclusivo else np.less)):
+            if limite is None:
+                continue
+            m = op(arr, limite)
+            mascara = m if mascara is None else (mascara & m)
+    return mascara
+
+
+@rastrear('sdss.carregar_dr16q', linhas=linhas_colunas)
+def carregar_dr16q(caminho, colunas=None, cortes=None, pasta_cache=None, usar_cache=True):
+    """
+    Retorna {nome: ndarray nativo} com as colunas pedidas e os cortes aplicados.
+
+    Sem cortes e com cache, os arrays são memmaps somente-leitura (zero-cópia).
+    Se a pasta de cache não puder ser criada, lê direto do FITS em memmap.
+    """
+    especificacao = COLUNAS_DR16Q if colunas is None else colunas
+    pasta_cache = pasta_cache or pasta_cache_padrao(caminho)
+
+    hdul = None
+    dados = None
+    if usar_cache:
+        try:
+            dados = _abrir_cache(caminho, pasta_cache, especificacao)
+        except OSError as e:
+            print(f"AVISO: cache indisponível ({e}). Lendo FITS diretamente.")
+    if dados is None:
+        from astropy.io import fits
+        hdul = fits.open(caminho, memmap=True)
+        dados = _projetar_fits(hdul[1].data, especificacao)
+
+    try:
+        mascara = _mascara_cortes(dados, cortes or {})
+        if mascara is None:
+            if hdul is None:
+                return dados
+            return {nome: arr.astype(arr.dtype.newbyteorder('=')) for nome, arr in dados.items()}
+        # Só as linhas selecionadas são copiadas (e convertidas para nativo)
+        return {nome: arr[mascara].astype(arr.dtype.newbyteorder('='), copy=False)
+                for nome, arr in dados.items()}
+    finally:
+        if hdul is not None:
+            hdul.close()
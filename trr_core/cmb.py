@@ -0,0 +1,214 @@
+"""
+Eixos Preferenciais de Baixo Multipolo (quadrupolo e octopolo) da RCF.
+
+O mapa HEALPix local (SMICA ou outro) é lido uma vez e projetado nos
+harmônicos esféricos até LMAX por quadratura direta sobre os centros dos
+pixels, em blocos; os a_lm são guardados em '.npz' ao lado do mapa, com
+chave no tamanho, mtime e campo do arquivo.
+
+O eixo de cada l maximiza a dispersão de momento angular
+(de Oliveira-Costa et al. 2004):
+
+    S_l(n) = sum_m m^2 |a_lm(n)|^2 / (l^2 sum_m |a_lm|^2)
+
+com a_lm(n) os coeficientes no referencial de eixo z = n. Como
+sum_m m^2 |a_lm(n)|^2 = <a|(n.L)^2|a> = n^T A n, com
+A_ij = Re<a|(L_i L_j + L_j L_i)/2|a>, o máximo sobre todas as direções é o
+maior autovalor da matriz 3x3 A e o eixo é o autovetor correspondente:
+nenhuma grade de direções nem rotação de Wigner é necessária, e o
+resultado é exato. O nulo usa realizações gaussianas isotrópicas dos
+a_lm (S_l não depende de C_l), todas resolvidas em lote por eigh.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from .coordenadas import radec_para_vetores, rotacionar, vetores_para_lonlat
+from .mapas_ceu import ler_mapa_healpix, pix2vec_ring
+
+LMAX = 3
+L_EIXOS = (2, 3)
+TAMANHO_BLOCO_PIXELS = 1 << 18
+N_SIM_PADRAO = 10000
+TAMANHO_BLOCO_SIM = 4096
+QUADROS_COORDSYS = {'G': 'galactic', 'C': 'icrs', 'Q': 'icrs', 'E': 'ecliptic'}
+
+
+# ------------------------------------------------------------------------------
+# map2alm de baixo l
+# ------------------------------------------------------------------------------
+def _legendre_normalizado(lmax, z):
+    """
+    lambda_lm(z) com Y_lm = lambda_lm(cos theta) e^{i m phi} (fase de
+    Condon-Shortley), shape (lmax+1, lmax+1, n) indexado [l, m].
+    """
+    z = np.asarray(z, dtype=np.float64)
+    seno = np.sqrt(np.maximum(1 - z * z, 0))
+    lam = np.zeros((lmax + 1, lmax + 1) + z.shape)
+    lam[0, 0] = 1 / np.sqrt(4 * np.pi)
+    for m in range(1, lmax + 1):
+        lam[m, m] = -np.sqrt((2 * m + 1) / (2 * m)) * seno * lam[m - 1, m - 1]
+    for m in range(lmax):
+        lam[m + 1, m] = np.sqrt(2 * m + 3) * z * lam[m, m]
+        for l in range(m + 2, lmax + 1):
+            a = np.sqrt((4 * l * l - 1) / (l * l - m * m))
+            b = np.sqrt(((l - 1) ** 2 - m * m) / (4 * (l - 1) ** 2 - 1))
+            lam[l, m] = a * (z * lam[l - 1, m] - b * lam[l - 2, m])
+    return lam
+
+
+def map2alm(mapa, lmax=LMAX):
+    """
+    a_lm (m >= 0) de um mapa RING completo, shape (lmax+1, lmax+1) complexo
+    indexado [l, m]. Pixels NaN contam como zero (use mapas inpintados).
+    """
+    mapa = np.asarray(mapa, dtype=np.float64)
+    npix = len(mapa)
+    nside = int(round(np.sqrt(npix / 12)))
+    alm = np.zeros((lmax + 1, lmax + 1), dtype=np.complex128)
+    ms = np.arange(lmax + 1)
+    for i in range(0, npix, TAMANHO_BLOCO_PIXELS):
+        valores = np.nan_to_num(mapa[i:i + TAMANHO_BLOCO_PIXELS], nan=0.0)
+        v = pix2vec_ring(nside, np.arange(i, i + len(valores)))
+        lam = _legendre_normalizado(lmax, v[:, 2])
+        fase = np.exp(-1j * ms[:, None] * np.arctan2(v[:, 1], v[:, 0]))
+        alm += np.einsum('lmp,mp->lm', lam * valores, fase)
+    return alm * (4 * np.pi / npix)
+
+
+def _chave_mapa(caminho, campo, lmax):
+    st = os.stat(caminho)
+    h = hashlib.blake2b(digest_size=8)
+    h.update(f"{st.st_size}:{st.st_mtime_ns}:{campo}:{lmax}".encode())
+    return h.hexdigest()
+
+
+def alm_do_arquivo(caminho, campo=0, lmax=LMAX):
+    """
+    a_lm do mapa em disco, calculados uma única vez e reabertos do '.npz'
+    ao lado do mapa. Retorna (alm, coordsys).
+    """
+    chave = _chave_mapa(caminho, campo, lmax)
+    arq = f"{os.path.splitext(caminho)[0]}_alm_l{lmax}.npz"
+    if os.path.exists(arq):
+        with np.load(arq) as npz:
+            if str(npz['chave']) == chave:
+                return npz['alm'], str(npz['coordsys'])
+
+    print(f"Projetando {os.path.basename(caminho)} em a_lm (l <= {lmax}, uma única vez)...")
+    mapa, _, sistema = ler_mapa_healpix(caminho, campo)
+    alm = map2alm(mapa, lmax)
+    try:
+        np.savez(arq + '.tmp.npz', chave=chave, alm=alm, coordsys=sistema)
+        os.replace(arq + '.tmp.npz', arq)
+    except OSError as e:
+        print(f"AVISO: a_lm não salvos ({e}).")
+    return alm, sistema
+
+
+def vetor_multipolo(alm, l):
+    """Coeficientes completos m = -l..l de um mapa real, shape (2l+1,)."""
+    positivos = alm[l, :l + 1]
+    m = np.arange(1, l + 1)
+    negativos = ((-1.0) ** m * np.conj(positivos[1:]))[::-1]
+    return np.concatenate((negativos, positivos))
+
+
+# ------------------------------------------------------------------------------
+# Eixo de dispersão máxima
+# ------------------------------------------------------------------------------
+def operadores_momento(l):
+    """(L_x, L_y, L_z) na base m = -l..l, cada um (2l+1, 2l+1)."""
+    m = np.arange(-l, l + 1, dtype=np.float64)
+    escada = np.sqrt(l * (l + 1) - m[:-1] * (m[:-1] + 1))
+    L_mais = np.diag(escada, -1).astype(np.complex128)  # |m> -> |m+1>
+    L_menos = L_mais.conj().T
+    return np.stack(((L_mais + L_menos) / 2, (L_mais - L_menos) / 2j, np.diag(m).astype(np.complex128)))
+
+
+def _produtos_simetricos(l):
+    """(L_i L_j + L_j L_i)/2, shape (3, 3, 2l+1, 2l+1)."""
+    L = operadores_momento(l)
+    prod = np.einsum('iab,jbc->ijac', L, L)
+    return (prod + prod.transpose(1, 0, 2, 3)) / 2
+
+
+def eixos_dispersao(a, l):
+    """
+    a: (..., 2l+1) coeficientes m = -l..l (lotes de realizações na frente).
+    Retorna (eixos (..., 3), S_l normalizado em [1/2, 1] para l >= 1).
+    O eixo é definido a menos de sinal; escolhemos z >= 0.
+    """
+    a = np.asarray(a, dtype=np.complex128)
+    A = np.einsum('...a,ijab,...b->...ij', a.conj(), _produtos_simetricos(l), a).real
+    autovalores, autovetores = np.linalg.eigh(A)
+    eixos = autovetores[..., :, -1]
+    eixos = eixos * np.where(eixos[..., 2:3] < 0, -1.0, 1.0)
+    potencia = np.sum(np.abs(a) ** 2, axis=-1)
+    return eixos, autovalores[..., -1] / (l * l * potencia)
+
+
+def realizacoes_gaussianas(l, n, rng):
+    """n realizações isotrópicas (n, 2l+1) de um mapa real (C_l = 1)."""
+    a0 = rng.standard_normal((n, 1))
+    ap = (rng.standard_normal((n, l)) + 1j * rng.standard_normal((n, l))) / np.sqrt(2)
+    m = np.arange(1, l + 1)
+    an = ((-1.0) ** m * np.conj(ap))[:, ::-1]
+    return np.concatenate((an, a0, ap), axis=1)
+
+
+def nulo_eixos(n_sim=N_SIM_PADRAO, semente=0, ls=L_EIXOS):
+    """
+    Eixos e S_l de n_sim céus gaussianos isotrópicos, em lotes de
+    TAMANHO_BLOCO_SIM com um fluxo SeedSequence por lote (memória limitada
+    ao lote). Retorna {l: (eixos, S)}.
+    """
+    fluxos = np.random.SeedSequence(semente).spawn(-(-n_sim // TAMANHO_BLOCO_SIM))
+    partes = {l: ([], []) for l in ls}
+    for k, fluxo in enumerate(fluxos):
+        n = min(TAMANHO_BLOCO_SIM, n_sim - k * TAMANHO_BLOCO_SIM)
+        rng = np.random.default_rng(fluxo)
+        for l in ls:
+            eixos, S = eixos_dispersao(realizacoes_gaussianas(l, n, rng), l)
+            partes[l][0].append(eixos)
+            partes[l][1].append(S)
+    return {l: (np.concatenate(e), np.concatenate(s)) for l, (e, s) in partes.items()}
+
+
+def angulo_eixos(u, v):
+    """Ângulo (graus, em [0, 90]) entre eixos sem sinal."""
+    cos = np.abs(np.sum(np.asarray(u) * np.asarray(v), axis=-1))
+    return np.degrees(np.arccos(np.clip(cos, 0.0, 1.0)))
+
+
+def auditoria_eixos(alm, n_sim=N_SIM_PADRAO, semente=0, ls=L_EIXOS):
+    """
+    Eixos observados de cada l, seus S_l e p-valores contra o nulo
+    gaussiano, e o alinhamento |n_2 . n_3| (se 2 e 3 estiverem em ls).
+    """
+    nulo = nulo_eixos(n_sim, semente, ls)
+    resultado = {}
+    for l in ls:
+        eixo, S = eixos_dispersao(vetor_multipolo(alm, l), l)
+        resultado[l] = {'eixo': eixo, 'S': float(S),
+                        'p_valor': float((np.sum(nulo[l][1] >= S) + 1) / (n_sim + 1))}
+    if 2 in ls and 3 in ls:
+        alinhamento = float(abs(resultado[2]['eixo'] @ resultado[3]['eixo']))
+        nulo_alinhamento = np.abs(np.sum(nulo[2][0] * nulo[3][0], axis=-1))
+        resultado['alinhamento'] = {
+            'cos': alinhamento, 'angulo': float(angulo_eixos(resultado[2]['eixo'], resultado[3]['eixo'])),
+            'p_valor': float((np.sum(nulo_alinhamento >= alinhamento) + 1) / (n_sim + 1))}
+    return resultado
+
+
+def eixo_galactico(eixo, coordsys='G', referencia=None):
+    """
+    (l, b) em graus de um eixo no quadro do mapa. Com referencia=(l, b), o
+    sinal do eixo é o do hemisfério mais próximo dela.
+    """
+    v = rotacionar(np.asarray(eixo, dtype=np.float64)[None], QUADROS_COORDSYS[coordsys], 'galactic')[0]
+    if referencia is not None and v @ radec_para_vetores(*referencia) < 0:
+        v = -v
+    l, b = vetores_para_lonlat(v)
+    return float(l), float(b)
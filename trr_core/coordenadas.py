@@ -0,0 +1,143 @@
+"""
+Transformações Celestes Vetorizadas (ICRS <-> Galáctica <-> Eclíptica).
+
+Cada transformação é uma matriz de rotação 3x3 calculada uma única vez e
+aplicada a arrays de vetores unitários (n, 3), em blocos e no próprio
+array quando pedido. Substitui o SkyCoord (custo fixo alto em catálogos
+pequenos) e o eq_to_gal escalar do script Planck.
+
+O polo galáctico usa as mesmas constantes J2000 do script Planck; a
+diferença para o astropy é de ~20 mas na galáctica (viés de quadro FK5)
+e abaixo de 1 arcsec na eclíptica média J2000.
+"""
+import hashlib
+
+import numpy as np
+
+# Polo Norte Galáctico (J2000) e longitude galáctica do Polo Norte Celeste
+RA_POLO_GAL = 192.85948
+DEC_POLO_GAL = 27.12825
+L_POLO_CELESTE = 122.93192
+OBLIQUIDADE_J2000 = 84381.406 / 3600.0  # graus (IAU 2006)
+
+TAMANHO_BLOCO_ROTACAO = 65536  # Linhas por bloco na rotação in-place
+
+
+def radec_para_vetores(lon, lat, out=None):
+    """(lon, lat) em graus -> vetores unitários (n, 3) float64."""
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    if out is None:
+        out = np.empty(lon.shape + (3,))
+    cos_lat = np.cos(lat)
+    np.multiply(cos_lat, np.cos(lon), out=out[..., 0])
+    np.multiply(cos_lat, np.sin(lon), out=out[..., 1])
+    np.sin(lat, out=out[..., 2])
+    return out
+
+
+def vetores_para_lonlat(v):
+    """Vetores (n, 3) -> (lon, lat) em graus, lon em [0, 360)."""
+    v = np.asarray(v)
+    lon = np.degrees(np.arctan2(v[..., 1], v[..., 0])) % 360
+    lat = np.degrees(np.arcsin(np.clip(v[..., 2], -1.0, 1.0)))
+    return lon, lat
+
+
+def _matriz_icrs_para_galactica():
+    # Linhas: eixos galácticos (x -> centro galáctico, z -> polo) no referencial equatorial
+    z_g = radec_para_vetores(RA_POLO_GAL, DEC_POLO_GAL)
+    # Projeção do polo celeste no plano galáctico: longitude L_POLO_CELESTE
+    e = np.array([0.0, 0.0, 1.0]) - z_g[2] * z_g
+    e /= np.linalg.norm(e)
+    l_cp = np.radians(L_POLO_CELESTE)
+    x_g = np.cos(l_cp) * e - np.sin(l_cp) * np.cross(z_g, e)
+    return np.vstack((x_g, np.cross(z_g, x_g), z_g))
+
+
+def _matriz_icrs_para_ecliptica():
+    eps = np.radians(OBLIQUIDADE_J2000)
+    return np.array([[1.0, 0.0, 0.0],
+                     [0.0, np.cos(eps), np.sin(eps)],
+                     [0.0, -np.sin(eps), np.cos(eps)]])
+
+
+_GAL = _matriz_icrs_para_galactica()
+_ECL = _matriz_icrs_para_ecliptica()
+
+# (origem, destino) -> matriz 3x3 (destino = M @ origem)
+MATRIZES = {
+    ('icrs', 'galactic'): _GAL,
+    ('galactic', 'icrs'): _GAL.T,
+    ('icrs', 'ecliptic'): _ECL,
+    ('ecliptic', 'icrs'): _ECL.T,
+    ('galactic', 'ecliptic'): _ECL @ _GAL.T,
+    ('ecliptic', 'galactic'): _GAL @ _ECL.T,
+}
+
+
+def matriz_rotacao(origem, destino):
+    if origem == destino:
+        return np.eye(3)
+    try:
+        return MATRIZES[(origem, destino)]
+    except KeyError:
+        raise ValueError(f"Transformação desconhecida: {origem} -> {destino}") from None
+
+
+def rotacionar(v, origem, destino, in_place=False):
+    """
+    Aplica a rotação a vetores (n, 3). in_place=True sobrescreve v bloco a
+    bloco (memória extra limitada a TAMANHO_BLOCO_ROTACAO linhas).
+    """
+    M = matriz_rotacao(origem, destino)
+    if not in_place:
+        return v @ M.T
+    for i in range(0, len(v), TAMANHO_BLOCO_ROTACAO):
+        bloco = v[i:i + TAMANHO_BLOCO_ROTACAO]
+        bloco[...] = bloco @ M.T
+    return v
+
+
+def converter(lon, lat, origem='icrs', destino='galactic'):
+    """Conversão direta de ângulos em graus (escalares ou arrays)."""
+    v = rotacionar(radec_para_vetores(lon, lat), origem, destino, in_place=True)
+    return vetores_para_lonlat(v)
+
+
+# Cache de vetores unitários por catálogo: (chave, impressão, quadro) -> (n, 3)
+_CACHE_VETORES = {}
+
+
+def _impressao(ra, dec):
+    """Hash do conteúdo de (ra, dec); bem mais barato que a trigonometria que evita."""
+    h = hashlib.blake2b(digest_size=16)
+    for a in (ra, dec):
+        h.update(np.ascontiguousarray(a, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def vetores_catalogo(chave, ra, dec, quadro='icrs'):
+    """
+    Vetores unitários do catálogo no quadro pedido, calculados uma única vez
+    por processo. chave identifica o catálogo (ex.: caminho do arquivo); o
+    conteúdo de (ra, dec) também entra na chave, de modo que um catálogo
+    recortado ou trocado com o mesmo tamanho nunca reaproveita vetores antigos.
+    """
+    impressao = _impressao(ra, dec)
+    item = _CACHE_VETORES.get((chave, impressao, quadro))
+    if item is not None:
+        return item
+    icrs = _CACHE_VETORES.get((chave, impressao, 'icrs'))
+    if icrs is None:
+        icrs = radec_para_vetores(ra, dec)
+        if len(_CACHE_VETORES) > 32:
+            _CACHE_VETORES.clear()
+        _CACHE_VETORES[(chave, impressao, 'icrs')] = icrs
+    item = icrs if quadro == 'icrs' else rotacionar(icrs, 'icrs', quadro)
+    _CACHE_VETORES[(chave, impressao, quadro)] = item
+    return item
+
+
+def limpar_cache_vetores():
+    _CACHE_VETORES.clear()
@@ -0,0 +1,87 @@
+"""
+Cache Colunar dos Eventos Dimuon (CMS Open Data, Dimuon_DoubleMu.csv).
+
+O CSV é convertido UMA vez, em blocos de linhas e apenas nas colunas
+pedidas, para um '.npy' por coluna na pasta de cache ao lado do arquivo
+(Dimuon_DoubleMu_cache/). As leituras seguintes abrem as colunas em
+memmap (zero-cópia). A precisão (float64 ou float32) é escolhida por
+coluna e registrada no manifesto; pedir outra precisão reconverte só
+aquela coluna.
+
+A invalidação segue o catálogo SDSS: tamanho e mtime do CSV, com o hash
+do conteúdo recalculado apenas quando o mtime muda.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .catalogo_sdss import _assinatura, _gravar_manifesto, _hash_arquivo, _ler_manifesto, pasta_cache_padrao
+from .rastreio import linhas_colunas, rastrear
+
+ARQUIVO_DIMUON = 'Dimuon_DoubleMu.csv'
+PRECISAO_PADRAO = 'float64'
+TAMANHO_BLOCO_LINHAS = 1_000_000  # Linhas do CSV por bloco de conversão
+
+
+def _escrever_colunas(caminho, pasta_cache, colunas, precisao):
+    """Converte as colunas do CSV em blocos; memória limitada a um bloco."""
+    dtype = np.dtype(precisao)
+    brutos = {nome: open(os.path.join(pasta_cache, nome + '.bin.tmp'), 'wb') for nome in colunas}
+    n = 0
+    try:
+        for bloco in pd.read_csv(caminho, usecols=list(colunas), dtype=np.float64,
+                                 engine='c', chunksize=TAMANHO_BLOCO_LINHAS):
+            for nome, f in brutos.items():
+                f.write(bloco[nome].to_numpy(dtype=dtype).tobytes())
+            n += len(bloco)
+    finally:
+        for f in brutos.values():
+            f.close()
+
+    # Cabeçalho .npy (agora com o número de linhas conhecido) + dados brutos
+    for nome in colunas:
+        bruto = os.path.join(pasta_cache, nome + '.bin.tmp')
+        final = os.path.join(pasta_cache, nome + '.npy')
+        with open(final + '.tmp', 'wb') as saida, open(bruto, 'rb') as entrada:
+            np.lib.format.write_array_header_1_0(saida, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                         'fortran_order': False, 'shape': (n,)})
+            shutil.copyfileobj(entrada, saida, 8 * 2**20)
+        os.replace(final + '.tmp', final)
+        os.remove(bruto)
+
+
+def _abrir_cache(caminho, pasta_cache, colunas, precisao):
+    manifesto = _ler_manifesto(caminho, pasta_cache)
+    if manifesto is None:
+        print(f"Cache colunar ausente ou obsoleto. Convertendo {os.path.basename(caminho)}...")
+        os.makedirs(pasta_cache, exist_ok=True)
+        manifesto = dict(_assinatura(caminho), hash=_hash_arquivo(caminho), colunas={})
+
+    faltantes = [nome for nome in colunas if manifesto['colunas'].get(nome) != precisao]
+    if faltantes:
+        _escrever_colunas(caminho, pasta_cache, faltantes, precisao)
+        manifesto['colunas'].update({nome: precisao for nome in faltantes})
+        _gravar_manifesto(pasta_cache, manifesto)
+
+    return {nome: np.load(os.path.join(pasta_cache, nome + '.npy'), mmap_mode='r') for nome in colunas}
+
+
+@rastrear('dimuon.carregar', linhas=linhas_colunas)
+def carregar_dimuon(caminho=ARQUIVO_DIMUON, colunas=('M',), precisao=PRECISAO_PADRAO,
+                    pasta_cache=None, usar_cache=True):
+    """
+    Retorna {coluna: ndarray} apenas com as colunas pedidas (ex.: 'M',
+    'phi1', 'pt1', 'eta1'). Com cache, memmaps somente-leitura; se a pasta
+    de cache não puder ser criada, lê direto do CSV.
+    """
+    colunas = list(colunas)
+    precisao = np.dtype(precisao).name
+    if usar_cache:
+        try:
+            return _abrir_cache(caminho, pasta_cache or pasta_cache_padrao(caminho), colunas, precisao)
+        except OSError as e:
+            print(f"AVISO: cache indisponível ({e}). Lendo CSV diretamente.")
+    df = pd.read_csv(caminho, usecols=colunas, dtype=np.float64, engine='c')
+    return {nome: df[nome].to_numpy(dtype=precisao) for nome in colunas}
@@ -0,0 +1,89 @@
+"""
+Solucionador Linear Exato do Dipolo Anisotrópico (Pantheon+).
+
+O modelo TRR d0 * z * cos(theta), com theta o ângulo entre o objeto e o
+eixo (lp, bp), é idêntico a z * (v . n), com n o vetor unitário do objeto
+e v = d0 * (vetor unitário do eixo). O ajuste ponderado vira uma regressão
+linear de 3 parâmetros com solução fechada: sem chute inicial, sem mínimos
+locais e determinística.
+
+A matriz normal (3x3) é fatorada uma única vez; qualquer número de vetores
+de resíduos (ex.: embaralhamentos de Monte Carlo) é resolvido em lote.
+
+Com a covariância completa C = L L^T, branquear X e y por L^-1 dá
+X^T C^-1 y. Guardamos P = C^-1 X (uma resolução por Cholesky), então cada
+vetor de resíduos, real ou embaralhado, custa apenas y @ P em vez de uma
+resolução triangular O(n^2).
+
+Com resíduos correlacionados, embaralhar não gera o nulo certo (o vetor
+embaralhado não tem a covariância C). O nulo é então y = L eps, com
+eps ~ N(0, I): no espaço branqueado ele é o próprio eps, e o ajuste só
+precisa de L^-1 X, calculado uma vez.
+"""
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+
+from .coordenadas import vetores_para_lonlat
+from .permutacao import LIMITE_MEMORIA_MB, _plano_blocos
+
+
+def vetor_para_dipolo(v):
+    """v (..., 3) -> (d0, l_graus, b_graus)."""
+    v = np.asarray(v)
+    d0 = np.linalg.norm(v, axis=-1)
+    l, b = vetores_para_lonlat(v / np.where(d0 > 0, d0, 1)[..., None])
+    return d0, l, b
+
+
+class DipoloLinear:
+    """
+    Regressão ponderada de res = z * (v . n) com fatoração única.
+
+    n_vec: vetores unitários (n, 3) dos objetos (ver trr_core.coordenadas).
+    pesos: 1/erro por objeto (a mesma ponderação linear do least_squares).
+    cholesky: fator triangular inferior L da covariância completa (opcional);
+              quando dado, substitui os pesos diagonais.
+    """
+
+    def __init__(self, n_vec, z, pesos=None, cholesky=None):
+        self.X = np.asarray(z, dtype=np.float64)[:, None] * n_vec
+        self.L = cholesky
+        if cholesky is None:
+            self.pesos = np.asarray(pesos, dtype=np.float64)
+            self.P = self.X * (self.pesos ** 2)[:, None]
+        else:
+            self.pesos = None
+            self.P = cho_solve((cholesky, True), self.X)
+        self.fator = cho_factor(self.X.T @ self.P)
+
+    def branquear(self, M):
+        """Aplica W (pesos ou L^-1) a M com objetos no último eixo: (n,) ou (k, n)."""
+        if self.L is None:
+            return M * self.pesos
+        return solve_triangular(self.L, np.asarray(M).T, lower=True).T
+
+    def ajustar(self, residuos):
+        """
+        v para um vetor (n,) ou para um lote (k, n) de resíduos.
+        Retorna (3,) ou (k, 3).
+        """
+        Y = np.asarray(residuos, dtype=np.float64)
+        return cho_solve(self.fator, (Y @ self.P).T).T
+
+    def nulo_correlacionado(self, n_sim, semente, limite_memoria_mb=LIMITE_MEMORIA_MB):
+        """
+        Ajustes v (n_sim, 3) de vetores nulos y = L eps, eps ~ N(0, I), pelo
+        mesmo fator L do ajuste real: y @ P = eps @ (L^-1 X), então cada
+        simulação custa O(n). Um fluxo SeedSequence por bloco (reprodutível).
+        """
+        if self.L is None:
+            raise ValueError("O nulo correlacionado exige a covariância completa (cholesky).")
+        X_branco = self.branquear(self.X.T).T
+        tamanhos, sementes = _plano_blocos(len(X_branco), n_sim, semente, limite_memoria_mb)
+        blocos = [np.random.default_rng(s).standard_normal((k, len(X_branco))) @ X_branco
+                  for k, s in zip(tamanhos, sementes)]
+        return cho_solve(self.fator, np.concatenate(blocos).T).T
+
+    def residuos_ponderados(self, v, residuos):
+        """Resíduos branqueados do ajuste (equivalente a least_squares.fun)."""
+        return self.branquear(self.X @ v - residuos)
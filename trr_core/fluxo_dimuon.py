@@ -0,0 +1,153 @@
+"""
+Auditoria Dimuon em Fluxo (uma passada, memória limitada).
+
+Lê o CSV em blocos fixos de eventos (uma thread de fundo decodifica o
+próximo bloco enquanto o atual é processado) e alimenta, na mesma
+passada, todas as métricas dos scripts CERN:
+  - Yang-Mills: desvios-padrão de M e M_trr e correlação M x cos(phi);
+  - Riemann: média de fase_trr = cos(M * pi / (WP / (D0 * pi)));
+  - Hodge: curvatura média e resíduo de quantização;
+  - P vs NP: histograma de phi1 (entropia de Shannon).
+
+Médias e co-momentos são combinados bloco a bloco pela fórmula de Chan
+(estável, sem somas de quadrados brutos). A memória de pico depende só
+de TAMANHO_BLOCO_EVENTOS e de PREFETCH, nunca do número de eventos.
+
+O histograma de phi1 usa bordas fixas em [-pi, pi] (em uma passada o
+min/max dos dados não é conhecido de antemão).
+"""
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .dimuon import ARQUIVO_DIMUON
+from .rastreio import etapa, rastrear
+
+TAMANHO_BLOCO_EVENTOS = 1_000_000
+PREFETCH = 2  # Blocos decodificados à frente do processamento
+
+# Mesmas constantes dos scripts CERN
+EIXO_LOCAL = 172.96
+GAMMA = 0.001
+WP = 1128.0
+D0 = 0.794
+BORDAS_PHI = np.linspace(-np.pi, np.pi, 101)
+
+COLUNAS = ('M', 'phi1', 'pt1', 'eta1')
+VARIAVEIS = ('m_obs', 'm_trr', 'cos_phi', 'fase_trr', 'curvatura_k', 'residuo')
+
+
+def blocos_dimuon(caminho=ARQUIVO_DIMUON, colunas=COLUNAS, tamanho_bloco=TAMANHO_BLOCO_EVENTOS,
+                  prefetch=PREFETCH):
+    """Gera {coluna: ndarray float64} por bloco; a leitura roda em uma thread de fundo."""
+    fila = queue.Queue(maxsize=prefetch)
+    parar = threading.Event()
+
+    def entregar(item):
+        """put que desiste quando o consumidor para (fila cheia não trava o join)."""
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produtor():
+        try:
+            for bloco in pd.read_csv(caminho, usecols=list(colunas), dtype=np.float64,
+                                     engine='c', chunksize=tamanho_bloco):
+                if not entregar({c: bloco[c].to_numpy() for c in colunas}):
+                    return
+            entregar(None)
+        except Exception as e:  # Repassada ao consumidor
+            entregar(e)
+
+    thread = threading.Thread(target=produtor, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        parar.set()
+        thread.join()
+
+
+class Momentos:
+    """Médias e matriz de co-momentos de k variáveis, combinadas bloco a bloco (Chan)."""
+
+    def __init__(self, k):
+        self.n = 0
+        self.media = np.zeros(k)
+        self.comomento = np.zeros((k, k))
+
+    def atualizar(self, X):
+        """X: (n_bloco, k)."""
+        n_b = len(X)
+        if n_b == 0:
+            return
+        media_b = X.mean(axis=0)
+        D = X - media_b
+        delta = media_b - self.media
+        n = self.n + n_b
+        self.comomento += D.T @ D + np.outer(delta, delta) * (self.n * n_b / n)
+        self.media += delta * (n_b / n)
+        self.n = n
+
+    def covariancia(self, ddof=1):
+        return self.comomento / (self.n - ddof)
+
+    def correlacao(self):
+        d = np.sqrt(np.diag(self.comomento))
+        return self.comomento / np.outer(d, d)
+
+
+def _variaveis_bloco(b, eixo_local, gamma, wp, d0):
+    m = b['M']
+    cos_phi = np.cos(np.radians(b['phi1'] - eixo_local))
+    m_trr = m / (1 + gamma * cos_phi)
+    fase_trr = np.cos(m * np.pi / (wp / (d0 * np.pi)))
+    curvatura_k = b['pt1'] * np.sinh(b['eta1'])
+    ciclos = curvatura_k / (d0 * np.pi)
+    residuo = np.abs(ciclos - np.round(ciclos))
+    return np.column_stack((m, m_trr, cos_phi, fase_trr, curvatura_k, residuo))
+
+
+@rastrear('dimuon.fluxo', linhas=lambda r: r['n_eventos'])
+def auditoria_fluxo(caminho=ARQUIVO_DIMUON, tamanho_bloco=TAMANHO_BLOCO_EVENTOS,
+                    eixo_local=EIXO_LOCAL, gamma=GAMMA, wp=WP, d0=D0):
+    """
+    Todas as métricas dos scripts CERN em uma única passada pelo CSV.
+    Retorna dict com n_eventos, std_bruta, std_trr, correlacao, sigma,
+    alinhamento, curvatura_media, quantizacao_media e entropia_h.
+    """
+    momentos = Momentos(len(VARIAVEIS))
+    contagens = np.zeros(len(BORDAS_PHI) - 1, dtype=np.int64)
+    for bloco in blocos_dimuon(caminho, COLUNAS, tamanho_bloco):
+        with etapa('dimuon.fluxo.bloco', linhas=len(bloco['phi1'])):
+            momentos.atualizar(_variaveis_bloco(bloco, eixo_local, gamma, wp, d0))
+            contagens += np.histogram(bloco['phi1'], bins=BORDAS_PHI)[0]
+
+    i = {nome: k for k, nome in enumerate(VARIAVEIS)}
+    var = np.diag(momentos.covariancia())
+    correlacao = momentos.correlacao()[i['m_obs'], i['cos_phi']]
+    probs = contagens / momentos.n
+    probs = probs[probs > 0]
+    return {
+        'n_eventos': momentos.n,
+        'std_bruta': np.sqrt(var[i['m_obs']]),
+        'std_trr': np.sqrt(var[i['m_trr']]),
+        'correlacao': correlacao,
+        'sigma': abs(correlacao * np.sqrt(momentos.n)),
+        'alinhamento': momentos.media[i['fase_trr']],
+        'curvatura_media': momentos.media[i['curvatura_k']],
+        'quantizacao_media': (1 - momentos.media[i['residuo']]) * 100,
+        'entropia_h': -np.sum(probs * np.log2(probs)),
+    }
@@ -0,0 +1,104 @@
+"""
+Varredura em Grade (a0, M/L disco, M/L bojo) da Lei de Cortez no SPARC.
+
+Para cada ponto da grade calculamos, por galáxia, o resíduo médio
+V_TRR - V_obs sobre os pontos de borda (a mesma estatística do script
+de rotação galáctica) e, entre galáxias, a média, o desvio-padrão e o RMS.
+
+A grade é achatada e avaliada em blocos (K pontos x N raios) por
+broadcasting, com K limitado por um orçamento de memória; os blocos são
+distribuídos entre processos. O resultado são cubos (n_a0, n_disk, n_bul)
+e o mínimo do RMS.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .sparc import lei_de_cortez
+
+LIMITE_MEMORIA_MB = 256
+_TEMPORARIOS_POR_PONTO = 6  # Arrays (K, N) vivos simultaneamente no bloco
+
+_ESTADO_WORKER = {}
+
+
+def _dados_armazem(armazem):
+    contagem = np.diff(np.append(armazem.offsets, len(armazem.rad)))
+    return dict(r_m=armazem.r_m, vobs=armazem.vobs, v2_gas=armazem.v2_gas,
+                v2_disk=armazem.v2_disk, v2_bul=armazem.v2_bul,
+                offsets=armazem.offsets, contagem=contagem)
+
+
+def residuos_bloco(dados, parametros):
+    """
+    parametros: (K, 3) com colunas (a0, ml_disk, ml_bul).
+    Retorna o resíduo médio por galáxia, shape (K, n_galaxias).
+    Pontos com r <= 0 ou V_bar^2 <= 0 valem V_TRR = 0, como no script original.
+    """
+    a0, ml_disk, ml_bul = (parametros[:, i:i + 1] for i in range(3))
+    v2_bar = dados['v2_gas'] + ml_disk * dados['v2_disk'] + ml_bul * dados['v2_bul']
+    valido = (dados['r_m'] > 0) & (v2_bar > 0)
+
+    g_bar = np.divide(v2_bar, dados['r_m'], out=np.zeros_like(v2_bar), where=valido)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g_trr = np.where(valido, lei_de_cortez(g_bar, a0), 0.0)
+    v_trr = np.sqrt(g_trr * dados['r_m']) / 1000
+
+    v_trr -= dados['vobs']
+    return np.add.reduceat(v_trr, dados['offsets'], axis=1) / dados['contagem']
+
+
+def residuos_por_galaxia(armazem, a0, ml_disk, ml_bul):
+    """Resíduo médio V_TRR - V_obs (km/s) de cada galáxia em um único ponto."""
+    return residuos_bloco(_dados_armazem(armazem), np.array([[a0, ml_disk, ml_bul]], dtype=np.float64))[0]
+
+
+def _estatisticas_bloco(dados, parametros):
+    por_galaxia = residuos_bloco(dados, parametros)
+    return (por_galaxia.mean(axis=1), por_galaxia.std(axis=1),
+            np.sqrt(np.mean(por_galaxia ** 2, axis=1)))
+
+
+def _inicializar_worker(dados):
+    _ESTADO_WORKER['dados'] = dados
+
+
+def _estatisticas_bloco_worker(parametros):
+    return _estatisticas_bloco(_ESTADO_WORKER['dados'], parametros)
+
+
+def varrer_grade(armazem, a0s, mls_disk, mls_bul, limite_memoria_mb=LIMITE_MEMORIA_MB, n_workers=1):
+    """
+    Avalia a grade completa a0s x mls_disk x mls_bul sobre um armazém SPARC
+    (normalmente ArmazemSPARC.somente_borda()).
+
+    Retorna dict com os cubos 'media', 'desvio', 'rms' e o 'minimo' do RMS
+    como {'a0', 'ml_disk', 'ml_bul', 'rms', 'media', 'desvio', 'indice'}.
+    n_workers=None usa todos os núcleos.
+    """
+    dados = _dados_armazem(armazem)
+    eixos = [np.atleast_1d(np.asarray(e, dtype=np.float64)) for e in (a0s, mls_disk, mls_bul)]
+    forma = tuple(len(e) for e in eixos)
+    parametros = np.stack(np.meshgrid(*eixos, indexing='ij'), axis=-1).reshape(-1, 3)
+
+    bytes_por_ponto = 8 * len(dados['r_m']) * _TEMPORARIOS_POR_PONTO
+    k = max(1, int(limite_memoria_mb * 2**20) // bytes_por_ponto)
+    blocos = [parametros[i:i + k] for i in range(0, len(parametros), k)]
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(blocos))
+    if n_workers <= 1:
+        resultados = [_estatisticas_bloco(dados, b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_inicializar_worker,
+                                 initargs=(dados,)) as pool:
+            resultados = list(pool.map(_estatisticas_bloco_worker, blocos))
+
+    media, desvio, rms = (np.concatenate(c).reshape(forma) for c in zip(*resultados))
+    indice = np.unravel_index(np.nanargmin(rms), forma)
+    minimo = {'a0': eixos[0][indice[0]], 'ml_disk': eixos[1][indice[1]], 'ml_bul': eixos[2][indice[2]],
+              'rms': rms[indice], 'media': media[indice], 'desvio': desvio[indice], 'indice': indice}
+    return {'a0': eixos[0], 'ml_disk': eixos[1], 'ml_bul': eixos[2],
+            'media': media, 'desvio': desvio, 'rms': rms, 'minimo': minimo}
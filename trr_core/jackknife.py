@@ -0,0 +1,107 @@
+"""
+Motor Jackknife por Estatísticas Suficientes (Precessão de Cortez).
+
+O modelo d0 * z * cos(ra - theta0 - OMEGA_P/z) é linear em
+(a, b) = (d0*cos(theta0), d0*sin(theta0)):
+
+    predicao = a * u + b * v,   u = z*cos(phi), v = z*sin(phi),
+    phi = ra - OMEGA_P/z   (graus, como no script original)
+
+O ajuste de mínimos quadrados é então um sistema 2x2 exato construído com
+as somas Suu, Suv, Svv, Suy, Svy. Guardamos essas somas por grupo e cada
+réplica jackknife (delete-1 ou delete-d) é apenas total - grupos removidos.
+"""
+import numpy as np
+
+OMEGA_P = 1128.0
+
+# Colunas das estatísticas por grupo
+SUU, SUV, SVV, SUY, SVY, SYY, N = range(7)
+
+
+def estatisticas_suficientes(ra, z, mag_res, grupos, n_grupos=None, omega_p=OMEGA_P):
+    """Somas (Suu, Suv, Svv, Suy, Svy, Syy, n) por grupo, shape (n_grupos, 7)."""
+    grupos = np.asarray(grupos, dtype=np.intp)
+    if n_grupos is None:
+        n_grupos = int(grupos.max()) + 1
+
+    z = np.asarray(z, dtype=np.float64)
+    phi = np.radians(np.asarray(ra, dtype=np.float64) - omega_p / z)
+    u = z * np.cos(phi)
+    v = z * np.sin(phi)
+    y = np.asarray(mag_res, dtype=np.float64)
+
+    S = np.empty((n_grupos, 7))
+    for col, pesos in ((SUU, u * u), (SUV, u * v), (SVV, v * v),
+                       (SUY, u * y), (SVY, v * y), (SYY, y * y)):
+        S[:, col] = np.bincount(grupos, weights=pesos, minlength=n_grupos)
+    S[:, N] = np.bincount(grupos, minlength=n_grupos)
+    return S
+
+
+def resolver_parametros(S):
+    """
+    Solução exata do sistema 2x2 para cada linha de S (qualquer shape (..., 7)).
+    Retorna (d0, theta0_graus) com d0 >= 0 e theta0 em [0, 360).
+    """
+    S = np.asarray(S)
+    det = S[..., SUU] * S[..., SVV] - S[..., SUV] ** 2
+    a = (S[..., SVV] * S[..., SUY] - S[..., SUV] * S[..., SVY]) / det
+    b = (S[..., SUU] * S[..., SVY] - S[..., SUV] * S[..., SUY]) / det
+    return np.hypot(a, b), np.degrees(np.arctan2(b, a)) % 360
+
+
+def jackknife_delete_um(S):
+    """Réplicas removendo um grupo por vez: (d0, theta0) de tamanho n_grupos."""
+    return resolver_parametros(S.sum(axis=0) - S)
+
+
+def jackknife_delete_d(S, d, n_replicas=1000, semente=None):
+    """
+    Réplicas removendo d grupos sorteados (sem reposição) por réplica.
+    Cada réplica custa uma soma de d linhas e uma solução 2x2.
+    """
+    n_grupos = len(S)
+    if not 1 <= d < n_grupos:
+        raise ValueError("d deve estar entre 1 e n_grupos - 1.")
+    rng = np.random.default_rng(semente)
+    removidos = np.argsort(rng.random((n_replicas, n_grupos)), axis=1)[:, :d]
+    return resolver_parametros(S.sum(axis=0) - S[removidos].sum(axis=1))
+
+
+def erro_jackknife(valores, n_grupos, d=1, angular=False):
+    """
+    Média e erro-padrão jackknife. Para delete-d usa o fator (G - d) / d
+    (Shao & Wu). angular=True trata os valores como ângulos em graus.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if angular:
+        rad = np.radians(valores)
+        media = np.degrees(np.arctan2(np.sin(rad).mean(), np.cos(rad).mean())) % 360
+        desvios = (valores - media + 180) % 360 - 180
+    else:
+        media = valores.mean()
+        desvios = valores - media
+    variancia = (n_grupos - d) / d * np.mean(desvios ** 2)
+    return media, np.sqrt(variancia)
+
+
+# ==============================================================================
+# Construtores de Grupos
+# ==============================================================================
+
+def grupos_aleatorios(n, n_grupos, semente=None):
+    """Dobras aleatórias de tamanhos iguais (±1)."""
+    rng = np.random.default_rng(semente)
+    return rng.permutation(np.arange(n) % n_grupos)
+
+
+def grupos_fatias_ra(ra, n_grupos):
+    """Fatias de ascensão reta de largura igual."""
+    return np.minimum((np.asarray(ra) % 360) * n_grupos // 360, n_grupos - 1).astype(np.intp)
+
+
+def grupos_blocos_ceu(ra, dec, n_ra, n_dec):
+    """Blocos de área igual: faixas em sin(dec) x fatias em RA."""
+    faixa = np.minimum(((np.sin(np.radians(dec)) + 1) / 2 * n_dec).astype(np.intp), n_dec - 1)
+    return faixa * n_ra + grupos_fatias_ra(ra, n_ra)
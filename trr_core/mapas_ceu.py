@@ -0,0 +1,258 @@
+"""
+Mapas HEALPix dos Resíduos do DR16Q (contagem, médias e correlação local).
+
+O pixel HEALPix (esquema RING) de cada quasar é calculado UMA vez por
+nside e quadro, em blocos, e gravado como '.npy' int32 na pasta de cache
+do catálogo (registrado no mesmo manifesto: se o FITS mudar, os pixels
+são refeitos). Os mapas saem de np.bincount com pesos: n, soma de x, y,
+x^2, y^2 e xy por pixel, sem laços em Python.
+
+ang2pix, pix2vec e nest2ring seguem as fórmulas de Górski et al. (2005)
+(loc2pix, pix2loc e xyf2ring do healpix_base), vetorizadas; o healpy não
+é necessário. Os mapas são gravados e lidos em FITS no formato HEALPix
+(PIXTYPE, ORDERING, NSIDE, COORDSYS), compatível com healpy.
+"""
+import os
+
+import numpy as np
+
+from .catalogo_sdss import (COLUNAS_DR16Q, TAMANHO_BLOCO_LINHAS, _abrir_cache, _gravar_manifesto,
+                            _ler_manifesto, _mascara_cortes, pasta_cache_padrao)
+from .coordenadas import radec_para_vetores, rotacionar
+
+NSIDES_PADRAO = (64, 128, 256)
+NSIDE_MAXIMO = 8192      # 12 * nside^2 cabe em int32
+N_MINIMO_PIXEL = 10      # Correlação local só com pelo menos estes objetos
+UNSEEN = -1.6375e30      # Valor de pixel vazio da convenção HEALPix
+SISTEMAS = {'icrs': 'C', 'galactic': 'G', 'ecliptic': 'E'}
+
+
+def ang2pix_ring(nside, v):
+    """Pixel RING de vetores unitários (n, 3)."""
+    z = v[..., 2]
+    za = np.abs(z)
+    tt = np.mod(np.arctan2(v[..., 1], v[..., 0]) * (2 / np.pi), 4.0)  # phi / (pi/2) em [0, 4)
+    pix = np.empty(z.shape, dtype=np.int64)
+
+    equatorial = za <= 2 / 3
+    # Faixa equatorial
+    t1 = nside * (0.5 + tt[equatorial])
+    t2 = nside * z[equatorial] * 0.75
+    jp = (t1 - t2).astype(np.int64)
+    jm = (t1 + t2).astype(np.int64)
+    ir = nside + 1 + jp - jm
+    kshift = 1 - (ir & 1)
+    ip = np.mod((jp + jm - nside + kshift + 1) // 2, 4 * nside)
+    pix[equatorial] = 2 * nside * (nside - 1) + (ir - 1) * 4 * nside + ip
+
+    # Calotas polares
+    polar = ~equatorial
+    ttp = tt[polar]
+    tp = ttp - np.floor(ttp)
+    tmp = nside * np.sqrt(3 * (1 - za[polar]))
+    jp = (tp * tmp).astype(np.int64)
+    jm = ((1 - tp) * tmp).astype(np.int64)
+    ir = jp + jm + 1
+    ip = np.mod((ttp * ir).astype(np.int64), 4 * ir)
+    npix = 12 * nside * nside
+    pix[polar] = np.where(z[polar] > 0, 2 * ir * (ir - 1) + ip, npix - 2 * ir * (ir + 1) + ip)
+    return pix
+
+
+def pix2vec_ring(nside, pix):
+    """Vetores unitários (n, 3) dos centros dos pixels RING."""
+    pix = np.asarray(pix, dtype=np.int64)
+    npix = 12 * nside * nside
+    ncap = 2 * nside * (nside - 1)
+    z = np.empty(pix.shape)
+    phi = np.empty(pix.shape)
+
+    norte = pix < ncap
+    sul = pix >= npix - ncap
+    equador = ~(norte | sul)
+
+    p = pix[norte]
+    anel = (1 + np.sqrt(1 + 2 * p).astype(np.int64)) >> 1
+    iphi = p + 1 - 2 * anel * (anel - 1)
+    z[norte] = 1 - anel ** 2 * 4.0 / npix
+    phi[norte] = (iphi - 0.5) * np.pi / (2 * anel)
+
+    p = pix[equador] - ncap
+    anel = p // (4 * nside) + nside
+    iphi = p % (4 * nside) + 1
+    fodd = np.where((anel + nside) & 1, 1.0, 0.5)
+    z[equador] = (2 * nside - anel) * 2.0 / (3 * nside)
+    phi[equador] = (iphi - fodd) * np.pi / (2 * nside)
+
+    p = npix - pix[sul]
+    anel = (1 + np.sqrt(2 * p - 1).astype(np.int64)) >> 1
+    iphi = 4 * anel + 1 - (p - 2 * anel * (anel - 1))
+    z[sul] = -1 + anel ** 2 * 4.0 / npix
+    phi[sul] = (iphi - 0.5) * np.pi / (2 * anel)
+
+    seno = np.sqrt(np.maximum(1 - z * z, 0))
+    return np.stack((seno * np.cos(phi), seno * np.sin(phi), z), axis=-1)
+
+
+def _comprimir_bits(v):
+    """Bits pares de v juntados (desfaz o entrelaçamento do índice NEST)."""
+    v = v & 0x5555555555555555
+    v = (v | (v >> 1)) & 0x3333333333333333
+    v = (v | (v >> 2)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v >> 4)) & 0x00FF00FF00FF00FF
+    v = (v | (v >> 8)) & 0x0000FFFF0000FFFF
+    return (v | (v >> 16)) & 0x00000000FFFFFFFF
+
+
+_JRLL = np.array([2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4])
+_JPLL = np.array([1, 3, 5, 7, 0, 2, 4, 6, 1, 3, 5, 7])
+
+
+def nest2ring(nside, pix):
+    """Converte índices NEST em RING."""
+    pix = np.asarray(pix, dtype=np.int64)
+    npix = 12 * nside * nside
+    ncap = 2 * nside * (nside - 1)
+    nl4 = 4 * nside
+    face = pix // (nside * nside)
+    ipf = pix % (nside * nside)
+    ix = _comprimir_bits(ipf)
+    iy = _comprimir_bits(ipf >> 1)
+
+    jr = _JRLL[face] * nside - ix - iy - 1
+    nr = np.where(jr < nside, jr, np.where(jr > 3 * nside, nl4 - jr, nside))
+    antes = np.where(jr < nside, 2 * nr * (nr - 1),
+                     np.where(jr > 3 * nside, npix - 2 * (nr + 1) * nr, ncap + (jr - nside) * nl4))
+    kshift = np.where((jr >= nside) & (jr <= 3 * nside), (jr - nside) & 1, 0)
+    jp = (_JPLL[face] * nr + ix - iy + 1 + kshift) // 2
+    jp = np.where(jp > nl4, jp - nl4, np.where(jp < 1, jp + nl4, jp))
+    return antes + jp - 1
+
+
+def ler_mapa_healpix(caminho, campo=0):
+    """
+    Lê uma coluna de um mapa HEALPix em FITS (ex.: SMICA, campo 0 = I_STOKES).
+    Retorna (mapa em ordem RING float64, nside, coordsys). Pixels UNSEEN,
+    NaN ou infinitos viram NaN.
+    """
+    from astropy.io import fits
+
+    with fits.open(caminho, memmap=True) as hdul:
+        cabecalho = hdul[1].header
+        mapa = np.asarray(hdul[1].data.field(campo), dtype=np.float64).ravel()
+        nside = int(cabecalho['NSIDE'])
+        ordem = str(cabecalho.get('ORDERING', 'RING')).strip().upper()
+        sistema = str(cabecalho.get('COORDSYS', 'G')).strip().upper()[:1]
+    if len(mapa) != 12 * nside * nside:
+        raise ValueError(f"Mapa parcial ou inconsistente: {len(mapa)} pixels para NSIDE={nside}.")
+    mapa[~np.isfinite(mapa) | np.isclose(mapa, UNSEEN)] = np.nan
+    if ordem.startswith('NEST'):
+        ring = np.empty_like(mapa)
+        ring[nest2ring(nside, np.arange(len(mapa)))] = mapa
+        mapa = ring
+    return mapa, nside, sistema
+
+
+def _calcular_pixels(ra, dec, nsides, quadro, saidas):
+    for i in range(0, len(ra), TAMANHO_BLOCO_LINHAS):
+        v = radec_para_vetores(ra[i:i + TAMANHO_BLOCO_LINHAS], dec[i:i + TAMANHO_BLOCO_LINHAS])
+        if quadro != 'icrs':
+            v = rotacionar(v, 'icrs', quadro, in_place=True)
+        for nside, saida in zip(nsides, saidas):
+            saida[i:i + TAMANHO_BLOCO_LINHAS] = ang2pix_ring(nside, v)
+
+
+def pixels_dr16q(caminho, nsides=NSIDES_PADRAO, quadro='icrs', pasta_cache=None):
+    """
+    {nside: pixel RING (int32) de cada linha do catálogo COMPLETO}, em
+    memmap do cache; calculados só para os nsides ainda ausentes.
+    """
+    for nside in nsides:
+        if nside > NSIDE_MAXIMO or nside & (nside - 1):
+            raise ValueError(f"nside deve ser potência de 2 <= {NSIDE_MAXIMO}: {nside}")
+    pasta = pasta_cache or pasta_cache_padrao(caminho)
+    coords = _abrir_cache(caminho, pasta, {'ra': COLUNAS_DR16Q['ra'], 'dec': ('DEC', None)})
+    manifesto = _ler_manifesto(caminho, pasta)
+    feitos = manifesto.setdefault('healpix', [])
+    arquivo = {nside: os.path.join(pasta, f"healpix_{quadro}_{nside}.npy") for nside in nsides}
+
+    faltam = [nside for nside in nsides if f"{quadro}_{nside}" not in feitos]
+    if faltam:
+        n = len(coords['ra'])
+        saidas = [np.lib.format.open_memmap(arquivo[ns] + '.tmp', mode='w+', shape=(n,), dtype=np.int32)
+                  for ns in faltam]
+        _calcular_pixels(coords['ra'], coords['dec'], faltam, quadro, saidas)
+        for ns, saida in zip(faltam, saidas):
+            saida.flush()
+            del saida
+            os.replace(arquivo[ns] + '.tmp', arquivo[ns])
+        saidas.clear()
+        feitos.extend(f"{quadro}_{ns}" for ns in faltam)
+        _gravar_manifesto(pasta, manifesto)
+    return {nside: np.load(arquivo[nside], mmap_mode='r') for nside in nsides}
+
+
+def carregar_dr16q_pixels(caminho, nsides=NSIDES_PADRAO, colunas=None, cortes=None, quadro='icrs',
+                          pasta_cache=None):
+    """
+    Como carregar_dr16q, com uma coluna extra 'pix_<nside>' por nside
+    (pixels do cache, recortados com a mesma máscara).
+    """
+    pasta = pasta_cache or pasta_cache_padrao(caminho)
+    dados = dict(_abrir_cache(caminho, pasta, COLUNAS_DR16Q if colunas is None else colunas))
+    dados.update({f"pix_{ns}": pix for ns, pix in pixels_dr16q(caminho, nsides, quadro, pasta).items()})
+    mascara = _mascara_cortes(dados, cortes or {})
+    if mascara is None:
+        return dados
+    return {nome: arr[mascara] for nome, arr in dados.items()}
+
+
+def mapas_residuos(pix, x, y, nside, n_minimo=N_MINIMO_PIXEL):
+    """
+    Mapas por pixel: 'contagem', 'residuo_medio' (x), 'predicao_media' (y),
+    'correlacao' local de Pearson entre x e y e 'contribuicao' de cada pixel
+    à correlação global (com x e y centralizados, a soma do mapa é o r
+    global). Pixels vazios (ou com menos de n_minimo objetos, na correlação)
+    valem UNSEEN.
+    """
+    npix = 12 * nside * nside
+    pix = np.asarray(pix, dtype=np.intp)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = np.bincount(pix, minlength=npix).astype(np.float64)
+    sx, sy, sxx, syy, sxy = (np.bincount(pix, weights=w, minlength=npix)
+                             for w in (x, y, x * x, y * y, x * y))
+
+    com_dados = n > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_x = np.where(com_dados, sx / n, UNSEEN)
+        media_y = np.where(com_dados, sy / n, UNSEEN)
+        cov = sxy - sx * sy / n
+        vx = sxx - sx ** 2 / n
+        vy = syy - sy ** 2 / n
+        r = cov / np.sqrt(vx * vy)
+    valido = (n >= n_minimo) & (vx > 0) & (vy > 0)
+    contribuicao = sxy / np.sqrt(np.dot(x, x) * np.dot(y, y))
+    return {'contagem': n, 'residuo_medio': media_x, 'predicao_media': media_y,
+            'correlacao': np.where(valido, r, UNSEEN), 'contribuicao': contribuicao}
+
+
+def gravar_mapas_fits(caminho, mapas, nside, quadro='icrs'):
+    """Grava {nome: mapa (12*nside^2,)} como tabela HEALPix RING (uma coluna por mapa)."""
+    from astropy.io import fits
+
+    colunas = [fits.Column(name=nome.upper(), format='D', array=np.asarray(m, dtype=np.float64))
+               for nome, m in mapas.items()]
+    hdu = fits.BinTableHDU.from_columns(colunas)
+    cabecalho = hdu.header
+    cabecalho['PIXTYPE'] = ('HEALPIX', 'HEALPIX pixelisation')
+    cabecalho['ORDERING'] = ('RING', 'Pixel ordering scheme')
+    cabecalho['NSIDE'] = (nside, 'Resolution parameter of HEALPIX')
+    cabecalho['FIRSTPIX'] = 0
+    cabecalho['LASTPIX'] = 12 * nside * nside - 1
+    cabecalho['INDXSCHM'] = ('IMPLICIT', 'Indexing: IMPLICIT or EXPLICIT')
+    cabecalho['OBJECT'] = ('FULLSKY', 'Sky coverage')
+    cabecalho['COORDSYS'] = (SISTEMAS[quadro], 'Ecliptic, Galactic or Celestial (equatorial)')
+    tmp = caminho + '.tmp'
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(tmp, overwrite=True)
+    os.replace(tmp, caminho)
@@ -0,0 +1,315 @@
+"""
+Navier-Stokes Incompressível Pseudo-Espectral em Caixa Periódica (2-D/3-D).
+
+Caixa [0, 2 pi)^d com n pontos por eixo; o estado é o espectro real
+(scipy.fft.rfftn) da velocidade, mantido livre de divergência por
+projeção. O termo não linear vem na forma rotacional (vetor de Lamb
+u x omega, a pressão absorve o resto), com desaliasamento pela regra de
+2/3, e a viscosidade é integrada exatamente por fator integrante em um
+Runge-Kutta de 2ª ordem (Heun). O passo dt segue a condição CFL a cada
+passo.
+
+Com cortez=True, soma-se o arrasto -nu_c(|u|) u no espaço físico, com
+taxa nu_c(|u|) = gamma (1 - g(|u|)) tirada do gradiente de Cortez
+g(v) = (1 - v/c) exp(-v/c) do script de finitude. Como g <= 1 para
+v >= 0, a taxa é >= 0 (nula em repouso, ~2 gamma |u|/c para |u| << c) e
+o termo só retira energia: dE/dt ganha -<nu_c(|u|) |u|^2>.
+
+As FFTs rodam com workers= threads e todas as etapas intermediárias usam
+buffers pré-alocados reutilizados entre os passos; apenas as saídas das
+FFTs são alocadas (scipy.fft não aceita out=). A cada passo registramos
+energia, enstrofia e vorticidade máxima (indicadores de explosão); os
+checkpoints são '.npy' em memmap (velocidade.npy + estado.json),
+gravados de forma atômica e retomáveis.
+"""
+import csv
+import json
+import os
+
+import numpy as np
+from scipy import fft as sfft
+
+from .rastreio import etapa
+
+NU_PADRAO = 1e-3
+CFL_PADRAO = 0.5
+DT_MAXIMO = 1e-2
+VELOCIDADE_LIMITE = 1.0  # c do fator de Cortez, em unidades da caixa
+AMORTECIMENTO_CORTEZ = 1.0  # gamma: escala da taxa de arrasto de Cortez (1/tempo)
+CAMPOS_DIAGNOSTICO = ('passo', 't', 'dt', 'energia', 'enstrofia', 'vorticidade_max')
+
+
+def gradiente_cortez(v, c=VELOCIDADE_LIMITE):
+    """Fator de Cortez (1 - v/c) exp(-v/c) do script de finitude."""
+    s = np.asarray(v, dtype=np.float64) / c
+    return (1 - s) * np.exp(-s)
+
+
+def _truncar_diagnosticos(caminho, passo):
+    """
+    Mantém só as linhas com passo < 'passo' (as anteriores ao checkpoint
+    retomado); linhas gravadas depois dele, ou cortadas por uma queda, saem.
+    """
+    with open(caminho, newline='', encoding='utf-8') as f:
+        linhas = f.read().splitlines(keepends=True)
+
+    def valida(linha):
+        campos = linha.rstrip('\r\n').split(',')
+        try:
+            return len(campos) == len(CAMPOS_DIAGNOSTICO) and int(campos[0]) < passo
+        except ValueError:
+            return False
+
+    manter = linhas[:1] + [l for l in linhas[1:] if l.endswith('\n') and valida(l)]
+    with open(caminho + '.tmp', 'w', newline='', encoding='utf-8') as f:
+        f.writelines(manter)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def taylor_green(n, dim=3):
+    """Vórtice de Taylor-Green (amplitude 1) em (dim, n, ..., n)."""
+    eixo = 2 * np.pi * np.arange(n) / n
+    if dim == 2:
+        x, y = np.meshgrid(eixo, eixo, indexing='ij')
+        return np.stack((np.sin(x) * np.cos(y), -np.cos(x) * np.sin(y)))
+    x, y, z = np.meshgrid(eixo, eixo, eixo, indexing='ij')
+    return np.stack((np.sin(x) * np.cos(y) * np.cos(z), -np.cos(x) * np.sin(y) * np.cos(z),
+                     np.zeros_like(x)))
+
+
+class FluxoEspectral:
+    """
+    Estado e buffers de uma simulação. uh: (dim,) + forma espectral.
+    workers=None usa todos os núcleos nas FFTs.
+    """
+
+    def __init__(self, n, dim=3, nu=NU_PADRAO, cortez=False, c=VELOCIDADE_LIMITE,
+                 gamma=AMORTECIMENTO_CORTEZ, cfl=CFL_PADRAO, dt_max=DT_MAXIMO, workers=None):
+        if dim not in (2, 3):
+            raise ValueError(f"dim deve ser 2 ou 3, não {dim}.")
+        self.n, self.dim, self.nu = n, dim, nu
+        self.cortez, self.c, self.gamma, self.cfl, self.dt_max = cortez, c, gamma, cfl, dt_max
+        self.workers = workers or os.cpu_count() or 1
+        self.t = 0.0
+        self.passo_atual = 0
+        self.eixos = tuple(range(1, dim + 1))
+        self.forma = (n,) * dim
+        forma_k = (n,) * (dim - 1) + (n // 2 + 1,)
+
+        numeros = [np.fft.fftfreq(n, 1.0 / n)] * (dim - 1) + [np.fft.rfftfreq(n, 1.0 / n)]
+        self.k = [ki.reshape([-1 if j == i else 1 for j in range(dim)]) for i, ki in enumerate(numeros)]
+        self.k2 = np.zeros(forma_k)
+        for ki in self.k:
+            self.k2 += ki ** 2
+        self.inv_k2 = np.divide(1.0, self.k2, out=np.zeros(forma_k), where=self.k2 > 0)
+        self.mascara = np.ones(forma_k, dtype=bool)
+        for ki in self.k:
+            self.mascara &= np.abs(ki) < n / 3
+
+        # Buffers reutilizados entre os passos
+        n_vort = 3 if dim == 3 else 1
+        self.uh = np.zeros((dim,) + forma_k, dtype=np.complex128)
+        self._uh1 = np.empty_like(self.uh)
+        self._wh = np.empty((n_vort,) + forma_k, dtype=np.complex128)
+        self._ck = np.empty((2,) + forma_k, dtype=np.complex128)
+        self._fator_visc = np.empty(forma_k)
+        self._lamb = np.empty((dim,) + self.forma)
+        self._r = np.empty((2,) + self.forma)
+
+    # --------------------------------------------------------------------------
+    # Estado
+    # --------------------------------------------------------------------------
+    def definir_velocidade(self, u):
+        """Velocidade física (dim, n, ..., n); projetada e desaliasada."""
+        self.uh[...] = sfft.rfftn(np.asarray(u, dtype=np.float64), axes=self.eixos, workers=self.workers)
+        self.uh *= self.mascara
+        self._projetar(self.uh)
+
+    def velocidade(self):
+        return sfft.irfftn(self.uh, s=self.forma, axes=self.eixos, workers=self.workers)
+
+    def _projetar(self, vh):
+        """vh <- vh - k (k . vh) / k^2 (remove a parte gradiente)."""
+        div, tmp = self._ck
+        np.multiply(self.k[0], vh[0], out=div)
+        for ki, vi in zip(self.k[1:], vh[1:]):
+            np.multiply(ki, vi, out=tmp)
+            div += tmp
+        div *= self.inv_k2
+        for ki, vi in zip(self.k, vh):
+            np.multiply(ki, div, out=tmp)
+            vi -= tmp
+
+    def _vorticidade(self, uh):
+        """omega_h = i k x uh em self._wh (escalar em 2-D)."""
+        tmp = self._ck[0]
+        pares = ((1, 2), (2, 0), (0, 1)) if self.dim == 3 else ((0, 1),)
+        for w, (a, b) in zip(self._wh, pares):
+            np.multiply(self.k[a], uh[b], out=w)
+            np.multiply(self.k[b], uh[a], out=tmp)
+            w -= tmp
+            w *= 1j
+        return self._wh
+
+    # --------------------------------------------------------------------------
+    # Termo não linear e passo
+    # --------------------------------------------------------------------------
+    def _nao_linear(self, uh, diagnostico=False):
+        """P[u x omega - nu_c(|u|) u] desaliasado; com diagnóstico, também as estatísticas."""
+        u = sfft.irfftn(uh, s=self.forma, axes=self.eixos, workers=self.workers)
+        w = sfft.irfftn(self._vorticidade(uh), s=self.forma, axes=self.eixos, workers=self.workers)
+        quad, tmp = self._r
+        lamb = self._lamb
+
+        if self.dim == 3:
+            for i, (a, b) in enumerate(((1, 2), (2, 0), (0, 1))):
+                np.multiply(u[a], w[b], out=lamb[i])
+                np.multiply(u[b], w[a], out=tmp)
+                lamb[i] -= tmp
+        else:
+            np.multiply(u[1], w[0], out=lamb[0])
+            np.multiply(u[0], w[0], out=lamb[1])
+            np.negative(lamb[1], out=lamb[1])
+
+        estatisticas = None
+        if diagnostico or self.cortez:
+            np.multiply(u[0], u[0], out=quad)
+            for ui in u[1:]:
+                np.multiply(ui, ui, out=tmp)
+                quad += tmp
+        if diagnostico:
+            estatisticas = {'energia': 0.5 * float(quad.mean()), 'velocidade_max': float(np.sqrt(quad.max()))}
+        if self.cortez:
+            # quad <- nu_c(|u|) = gamma (1 - g(|u|)); o arrasto -nu_c u entra junto com o vetor de Lamb
+            np.sqrt(quad, out=quad)
+            quad /= self.c
+            np.negative(quad, out=tmp)
+            np.exp(tmp, out=tmp)
+            np.subtract(1.0, quad, out=quad)
+            quad *= tmp
+            np.subtract(1.0, quad, out=quad)
+            quad *= self.gamma
+            if diagnostico:
+                estatisticas['amortecimento_max'] = float(quad.max())
+            for li, ui in zip(lamb, u):
+                np.multiply(quad, ui, out=tmp)
+                li -= tmp
+        if diagnostico:
+            np.multiply(w[0], w[0], out=quad)
+            for wi in w[1:]:
+                np.multiply(wi, wi, out=tmp)
+                quad += tmp
+            estatisticas['enstrofia'] = 0.5 * float(quad.mean())
+            estatisticas['vorticidade_max'] = float(np.sqrt(quad.max()))
+
+        nh = sfft.rfftn(lamb, axes=self.eixos, workers=self.workers)
+        nh *= self.mascara
+        self._projetar(nh)
+        return nh, estatisticas
+
+    def passo(self, dt_limite=None):
+        """
+        Um passo de Heun com fator integrante e dt por CFL (no máximo
+        dt_limite; com cortez, também nu_c * dt <= 1, dentro da região
+        estável de Heun). Retorna os diagnósticos do início do passo.
+        """
+        n0, est = self._nao_linear(self.uh, diagnostico=True)
+        dx = 2 * np.pi / self.n
+        vmax = est['velocidade_max']
+        dt = self.dt_max if vmax == 0 else min(self.dt_max, self.cfl * dx / (np.sqrt(self.dim) * vmax))
+        if est.get('amortecimento_max', 0) > 0:
+            dt = min(dt, 1.0 / est['amortecimento_max'])
+        if dt_limite is not None:
+            dt = min(dt, dt_limite)
+
+        E = self._fator_visc
+        np.multiply(self.k2, -self.nu * dt, out=E)
+        np.exp(E, out=E)
+        np.multiply(n0, dt, out=self._uh1)
+        self._uh1 += self.uh
+        self._uh1 *= E
+        n1, _ = self._nao_linear(self._uh1)
+
+        n0 *= 0.5 * dt
+        self.uh += n0
+        self.uh *= E
+        n1 *= 0.5 * dt
+        self.uh += n1
+
+        linha = {'passo': self.passo_atual, 't': self.t, 'dt': dt, 'energia': est['energia'],
+                 'enstrofia': est['enstrofia'], 'vorticidade_max': est['vorticidade_max']}
+        self.t += dt
+        self.passo_atual += 1
+        return linha
+
+    def executar(self, t_final, pasta=None, max_passos=None, intervalo_checkpoint=100):
+        """
+        Integra até t_final (ou max_passos). Com pasta, grava diagnosticos.csv
+        linha a linha e checkpoints a cada intervalo_checkpoint passos e no
+        fim. Para se algum diagnóstico deixar de ser finito. Retorna a lista
+        de diagnósticos (dicts com CAMPOS_DIAGNOSTICO).
+        """
+        historico = []
+        arquivo = escritor = None
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+            caminho = os.path.join(pasta, 'diagnosticos.csv')
+            novo = self.passo_atual == 0 or not os.path.exists(caminho)
+            if not novo:
+                _truncar_diagnosticos(caminho, self.passo_atual)
+            arquivo = open(caminho, 'w' if novo else 'a', newline='', encoding='utf-8')
+            escritor = csv.DictWriter(arquivo, fieldnames=CAMPOS_DIAGNOSTICO)
+            if novo:
+                escritor.writeheader()
+        try:
+            with etapa('navier_stokes.executar', n=self.n, dim=self.dim, cortez=self.cortez) as e:
+                while self.t < t_final and (max_passos is None or len(historico) < max_passos):
+                    linha = self.passo(dt_limite=t_final - self.t)
+                    historico.append(linha)
+                    if escritor:
+                        escritor.writerow(linha)
+                        arquivo.flush()
+                    if not all(np.isfinite(v) for v in linha.values()):
+                        print(f"AVISO: diagnóstico não finito no passo {linha['passo']} (t={linha['t']:.4f}).")
+                        break
+                    if pasta and self.passo_atual % intervalo_checkpoint == 0:
+                        self.salvar_checkpoint(pasta)
+                e.linhas = len(historico) * self.n ** self.dim
+        finally:
+            if arquivo:
+                arquivo.close()
+        if pasta:
+            self.salvar_checkpoint(pasta)
+        return historico
+
+    # --------------------------------------------------------------------------
+    # Checkpoints
+    # --------------------------------------------------------------------------
+    def salvar_checkpoint(self, pasta):
+        """velocidade.npy (memmap) + estado.json, ambos trocados atomicamente."""
+        os.makedirs(pasta, exist_ok=True)
+        final = os.path.join(pasta, 'velocidade.npy')
+        mapa = np.lib.format.open_memmap(final + '.tmp', mode='w+', dtype=np.float64,
+                                         shape=(self.dim,) + self.forma)
+        mapa[...] = self.velocidade()
+        mapa.flush()
+        del mapa  # Fecha o memmap antes do os.replace (exigido no Windows)
+        os.replace(final + '.tmp', final)
+
+        estado = {'t': self.t, 'passo': self.passo_atual, 'n': self.n, 'dim': self.dim, 'nu': self.nu,
+                  'cortez': self.cortez, 'c': self.c, 'gamma': self.gamma, 'cfl': self.cfl, 'dt_max': self.dt_max}
+        arq = os.path.join(pasta, 'estado.json')
+        with open(arq + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(estado, f, indent=1)
+        os.replace(arq + '.tmp', arq)
+
+    @classmethod
+    def carregar_checkpoint(cls, pasta, workers=None):
+        """Retoma uma simulação gravada por salvar_checkpoint."""
+        with open(os.path.join(pasta, 'estado.json'), encoding='utf-8') as f:
+            estado = json.load(f)
+        fluxo = cls(estado['n'], estado['dim'], estado['nu'], estado['cortez'], estado['c'],
+                    estado.get('gamma', AMORTECIMENTO_CORTEZ), estado['cfl'], estado['dt_max'], workers)
+        fluxo.definir_velocidade(np.load(os.path.join(pasta, 'velocidade.npy'), mmap_mode='r'))
+        fluxo.t, fluxo.passo_atual = estado['t'], estado['passo']
+        return fluxo
@@ -0,0 +1,239 @@
+"""
+Ajuste de Órbita por Arco (Kepler + J2 secular) para resíduos LAGEOS-2.
+
+As posições SP3 (com tempo) são divididas em arcos; em cada arco ajustamos
+elementos médios não-singulares em relação ao nodo,
+    (a, ex = e cos w, ey = e sin w, i, Omega, lambda = M + w),
+propagados com as taxas seculares de J2 (Omega, w e M). A posição sai da
+equação de Kepler generalizada, resolvida por Newton em todo o arco de uma
+vez, e o Jacobiano é analítico (as derivadas das taxas de J2 entram apenas
+por 'a', que domina). O mínimo-quadrado usa scipy least_squares e os arcos
+são distribuídos entre processos.
+
+Os resíduos observado - modelo são projetados no referencial RTN do modelo
+(radial, ao longo da trilha, normal). Os termos de curto período de J2
+(amplitude de alguns km) não estão no modelo: arcos curtos os absorvem
+apenas em parte.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.optimize import least_squares
+
+MU_TERRA = 398600.4418  # km^3/s^2
+RAIO_TERRA = 6378.137  # km
+J2 = 1.08262668e-3
+DURACAO_ARCO_H = 24.0  # Duração máxima de um arco
+LACUNA_MAXIMA_S = 3600.0  # Uma lacuna maior inicia novo arco
+PONTOS_MINIMOS = 20
+
+
+def _taxas_j2(a, ex, ey, i):
+    """
+    Taxas (dOmega/dt, dw/dt, dlambda/dt = dM/dt + dw/dt) em rad/s e seu
+    gradiente (3, 4) em relação a (a, ex, ey, i).
+    """
+    e2 = ex * ex + ey * ey
+    n = np.sqrt(MU_TERRA / a ** 3)
+    fator = 0.75 * n * J2 * (RAIO_TERRA / (a * (1 - e2))) ** 2
+    c, s = np.cos(i), np.sin(i)
+    eta = np.sqrt(1 - e2)
+    taxas = np.array([-2 * fator * c,
+                      fator * (5 * c * c - 1),
+                      n + fator * (eta * (3 * c * c - 1) + 5 * c * c - 1)])
+
+    # fator ~ a^-7/2 (1 - e^2)^-2 ; n ~ a^-3/2
+    d_fator_e2 = 2 * fator / (1 - e2)
+    d_e2 = np.array([d_fator_e2 * -2 * c,
+                     d_fator_e2 * (5 * c * c - 1),
+                     d_fator_e2 * (eta * (3 * c * c - 1) + 5 * c * c - 1) - fator * (3 * c * c - 1) / (2 * eta)])
+    grad = np.empty((3, 4))
+    grad[:, 0] = -3.5 * (taxas - [0, 0, n]) / a - np.array([0, 0, 1.5 * n / a])
+    grad[:, 1] = d_e2 * 2 * ex
+    grad[:, 2] = d_e2 * 2 * ey
+    grad[:, 3] = [2 * fator * s, -10 * fator * c * s, -fator * (6 * eta + 10) * c * s]
+    return taxas, grad
+
+
+def _kepler_generalizado(lam, ex, ey, iteracoes=12):
+    """Resolve lambda = F - ex sin F + ey cos F para a longitude excêntrica F."""
+    F = lam.copy()
+    for _ in range(iteracoes):
+        s, c = np.sin(F), np.cos(F)
+        F -= (F - ex * s + ey * c - lam) / (1 - ex * c - ey * s)
+    return F
+
+
+def _estado(elementos, t, derivadas=False):
+    """
+    Posição (n, 3) em t (s desde o início do arco); com derivadas=True,
+    também a velocidade (n, 3) e o Jacobiano (n, 3, 6).
+    """
+    a, ex0, ey0, i, omega0, lam0 = elementos
+    (d_omega, d_w, d_lam), grad_taxas = _taxas_j2(a, ex0, ey0, i)
+
+    rot = d_w * t
+    cr, sr = np.cos(rot), np.sin(rot)
+    ex, ey = ex0 * cr - ey0 * sr, ex0 * sr + ey0 * cr
+    omega = omega0 + d_omega * t
+    F = _kepler_generalizado(lam0 + d_lam * t, ex, ey)
+
+    s_f, c_f = np.sin(F), np.cos(F)
+    raiz = np.sqrt(1 - ex * ex - ey * ey)
+    beta = 1 / (1 + raiz)
+    X1 = a * ((1 - beta * ey * ey) * c_f + beta * ex * ey * s_f - ex)
+    Y1 = a * ((1 - beta * ex * ex) * s_f + beta * ex * ey * c_f - ey)
+
+    so, co = np.sin(omega), np.cos(omega)
+    si, ci = np.sin(i), np.cos(i)
+    P = np.column_stack((co, so, np.zeros_like(co)))
+    Q = np.column_stack((-ci * so, ci * co, np.full_like(co, si)))
+    pos = X1[:, None] * P + Y1[:, None] * Q
+    if not derivadas:
+        return pos
+
+    D = 1 - ex * c_f - ey * s_f
+    dX_dF = a * (-(1 - beta * ey * ey) * s_f + beta * ex * ey * c_f)
+    dY_dF = a * ((1 - beta * ex * ex) * c_f - beta * ex * ey * s_f)
+    dr_dF = dX_dF[:, None] * P + dY_dF[:, None] * Q
+    dP_dO = np.column_stack((-so, co, np.zeros_like(co)))
+    dQ_dO = np.column_stack((-ci * co, -ci * so, np.zeros_like(co)))
+    dr_dO = X1[:, None] * dP_dO + Y1[:, None] * dQ_dO
+    dr_di = Y1[:, None] * np.column_stack((si * so, -si * co, np.full_like(co, ci)))
+
+    # (ex, ey) no instante t, com F fixo, e via F
+    db_dex, db_dey = beta ** 2 * ex / raiz, beta ** 2 * ey / raiz
+    dX_dex = a * (-ey * ey * db_dex * c_f + (beta * ey + ex * ey * db_dex) * s_f - 1) + dX_dF * s_f / D
+    dX_dey = a * (-(2 * beta * ey + ey * ey * db_dey) * c_f + (beta * ex + ex * ey * db_dey) * s_f) - dX_dF * c_f / D
+    dY_dex = a * (-(2 * beta * ex + ex * ex * db_dex) * s_f + (beta * ey + ex * ey * db_dex) * c_f) + dY_dF * s_f / D
+    dY_dey = a * (-ex * ex * db_dey * s_f + (beta * ex + ex * ey * db_dey) * c_f - 1) - dY_dF * c_f / D
+    dr_dex = dX_dex[:, None] * P + dY_dex[:, None] * Q
+    dr_dey = dX_dey[:, None] * P + dY_dey[:, None] * Q
+
+    # Efeito de cada taxa (Omega, w, lambda) acumulado até t
+    dr_dtaxas = (dr_dO, -ey[:, None] * dr_dex + ex[:, None] * dr_dey, dr_dF / D[:, None])
+
+    J = np.empty((len(t), 3, 6))
+    J[:, :, 0] = pos / a
+    J[:, :, 1] = dr_dex * cr[:, None] + dr_dey * sr[:, None]
+    J[:, :, 2] = -dr_dex * sr[:, None] + dr_dey * cr[:, None]
+    J[:, :, 3] = dr_di
+    J[:, :, 4] = dr_dO
+    J[:, :, 5] = dr_dF / D[:, None]
+    for k in range(3):
+        for j, col in enumerate((0, 1, 2, 3)):
+            J[:, :, col] += dr_dtaxas[k] * (grad_taxas[k, j] * t)[:, None]
+    vel = dr_dF * (d_lam / D)[:, None] + dr_dO * d_omega
+    return pos, vel, J
+
+
+def _elementos_iniciais(t, pos):
+    """Elementos osculadores a partir das duas primeiras posições (velocidade por diferença)."""
+    k = min(2, len(t) - 1)
+    r = pos[0]
+    v = (pos[k] - pos[0]) / (t[k] - t[0])
+    # Correção de segunda ordem da diferença progressiva: v(t0) = v_media + a_grav * dt / 2
+    v += MU_TERRA * r / np.linalg.norm(r) ** 3 * (t[k] - t[0]) / 2
+
+    h = np.cross(r, v)
+    i = np.arccos(h[2] / np.linalg.norm(h))
+    omega = np.arctan2(h[0], -h[1])
+    rn, v2 = np.linalg.norm(r), v @ v
+    a = 1 / (2 / rn - v2 / MU_TERRA)
+    e_vec = ((v2 - MU_TERRA / rn) * r - (r @ v) * v) / MU_TERRA
+    nodo = np.array([np.cos(omega), np.sin(omega), 0.0])
+    perp = np.cross(h / np.linalg.norm(h), nodo)
+    ex, ey = e_vec @ nodo, e_vec @ perp
+    u = np.arctan2(r @ perp, r @ nodo)  # argumento de latitude
+    w = np.arctan2(ey, ex)
+    e = np.hypot(ex, ey)
+    nu = u - w
+    E = 2 * np.arctan2(np.sqrt(1 - e) * np.sin(nu / 2), np.sqrt(1 + e) * np.cos(nu / 2))
+    lam = E - e * np.sin(E) + w
+    return np.array([a, ex, ey, i, omega, lam])
+
+
+def ajustar_arco(t, pos):
+    """
+    Ajusta um arco: t (s, crescente), pos (n, 3) em km.
+    Retorna (elementos, resíduos RTN (n, 3) em km, rms 3-D em km).
+    """
+    t = np.asarray(t, dtype=np.float64) - t[0]
+    x0 = _elementos_iniciais(t, pos)
+
+    def residuo(x):
+        return (_estado(x, t) - pos).ravel()
+
+    def jacobiano(x):
+        return _estado(x, t, derivadas=True)[2].reshape(-1, 6)
+
+    sol = least_squares(residuo, x0, jac=jacobiano, method='lm', x_scale='jac')
+    modelo, vel, _ = _estado(sol.x, t, derivadas=True)
+    R = modelo / np.linalg.norm(modelo, axis=1, keepdims=True)
+    N = np.cross(modelo, vel)
+    N /= np.linalg.norm(N, axis=1, keepdims=True)
+    T = np.cross(N, R)
+    d = pos - modelo
+    rtn = np.column_stack((np.einsum('ij,ij->i', d, R), np.einsum('ij,ij->i', d, T),
+                           np.einsum('ij,ij->i', d, N)))
+    return sol.x, rtn, float(np.sqrt(np.mean(np.sum(d * d, axis=1))))
+
+
+def dividir_arcos(tempo, duracao_h=DURACAO_ARCO_H, lacuna_s=LACUNA_MAXIMA_S):
+    """Índice do arco de cada época (tempo datetime64 ordenado)."""
+    s = (tempo - tempo[0]) / np.timedelta64(1, 's')
+    novo = np.zeros(len(s), dtype=bool)
+    novo[1:] = np.diff(s) > lacuna_s
+    bloco = np.cumsum(novo)
+    inicio = s[np.r_[0, np.flatnonzero(novo)]]
+    # Dentro de cada bloco contínuo, cortes a cada duracao_h
+    fatia = np.floor((s - inicio[bloco]) / (duracao_h * 3600)).astype(np.int64)
+    _, arco = np.unique(np.column_stack((bloco, fatia)), axis=0, return_inverse=True)
+    return arco.ravel()
+
+
+def _ajustar_arco_worker(args):
+    t, pos = args
+    try:
+        return ajustar_arco(t, pos)
+    except (ValueError, np.linalg.LinAlgError) as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def residuos_orbita(tempo, pos, duracao_h=DURACAO_ARCO_H, lacuna_s=LACUNA_MAXIMA_S, n_workers=None):
+    """
+    Ajusta todos os arcos (em paralelo) e devolve dict com 'radial',
+    'along', 'cross' (km, NaN em arcos descartados), 'arco', 'rms_arco',
+    'elementos' (por arco) e 'falhas'.
+    """
+    arco = dividir_arcos(tempo, duracao_h, lacuna_s)
+    s = (tempo - tempo[0]) / np.timedelta64(1, 's')
+    n_arcos = arco.max() + 1 if len(arco) else 0
+    # Uma ordenação e um corte nas fronteiras: O(n log n) em vez de uma varredura por arco
+    ordem = np.argsort(arco, kind='stable')
+    grupos = np.split(ordem, np.cumsum(np.bincount(arco, minlength=n_arcos))[:-1])
+    validos = [g for g in grupos if len(g) >= PONTOS_MINIMOS]
+    tarefas = [(s[g], pos[g]) for g in validos]
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(tarefas)) if tarefas else 1
+    if n_workers <= 1:
+        resultados = list(map(_ajustar_arco_worker, tarefas))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            resultados = list(pool.map(_ajustar_arco_worker, tarefas, chunksize=max(1, len(tarefas) // (4 * n_workers))))
+
+    rtn = np.full((len(tempo), 3), np.nan)
+    rms = np.full(n_arcos, np.nan)
+    elementos = np.full((n_arcos, 6), np.nan)
+    falhas = []
+    for g, (x, r, extra) in zip(validos, resultados):
+        k = arco[g[0]]
+        if x is None:
+            falhas.append(f"arco {k}: {extra}")
+            continue
+        rtn[g], rms[k], elementos[k] = r, extra, x
+    return {'radial': rtn[:, 0], 'along': rtn[:, 1], 'cross': rtn[:, 2], 'arco': arco,
+            'rms_arco': rms, 'elementos': elementos, 'falhas': falhas}
@@ -0,0 +1,139 @@
+"""
+Acesso Rápido ao Pantheon+ (SNe Ia): tabela tipada e covariância STAT+SYS.
+
+A tabela é lida pelo motor C do pandas apenas nas colunas usadas, com
+dtype float64. O separador e o mapeamento de colunas (zCMB, MU_SH0ES, ...)
+são resolvidos uma vez e lembrados em um JSON ao lado do arquivo; a
+próxima leitura só confere o cabeçalho.
+
+A covariância publicada (N na primeira linha, depois N*N valores) é
+restrita às linhas usadas e fatorada por Cholesky. O fator é salvo em
+'.npy' ao lado da covariância, com chave (tamanho, mtime, linhas usadas),
+e reaberto em memmap nas execuções seguintes.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import cholesky
+
+# Papel -> nomes aceitos (em minúsculas), na ordem de preferência.
+# 'sh0es' (com zero) é a grafia do arquivo publicado Pantheon+SH0ES.dat
+CANDIDATOS_COLUNAS = {
+    'z': ('zcmb', 'z'),
+    'mu': ('mu_shoes', 'mu_pantheon', 'm_b_corr', 'mu_sh0es'),
+    'ra': ('ra',),
+    'dec': ('dec',),
+    'mu_err': ('mu_err', 'mu_err_shoes', 'mu_sh0es_err_diag'),
+}
+OBRIGATORIAS = ('z', 'mu', 'ra', 'dec')
+
+
+def _detectar_separador(cabecalho):
+    for sep in ('\t', ',', ';'):
+        if sep in cabecalho:
+            return sep
+    return r'\s+'
+
+
+def _dividir_cabecalho(cabecalho, sep):
+    if sep == r'\s+':
+        return cabecalho.split()
+    return [c.strip() for c in cabecalho.split(sep)]
+
+
+def _mapear_colunas(nomes):
+    cols = {c.lower(): c for c in nomes}
+    mapa = {}
+    for papel, candidatos in CANDIDATOS_COLUNAS.items():
+        mapa[papel] = next((cols[c] for c in candidatos if c in cols), None)
+    if mapa['mu'] is None:
+        raise KeyError("ERRO: Módulo de distância (MU) não encontrado.")
+    faltantes = [p for p in OBRIGATORIAS if mapa[p] is None]
+    if faltantes:
+        raise KeyError(f"ERRO: Colunas obrigatórias ausentes: {faltantes}")
+    return mapa
+
+
+def _arquivo_mapa(caminho):
+    return os.path.splitext(caminho)[0] + '_colunas.json'
+
+
+def _resolver_layout(caminho):
+    """(separador, mapa de colunas), lembrados em disco enquanto o cabeçalho não mudar."""
+    with open(caminho, encoding='utf-8') as f:
+        cabecalho = f.readline().rstrip('\r\n')
+
+    arq = _arquivo_mapa(caminho)
+    if os.path.exists(arq):
+        with open(arq, encoding='utf-8') as f:
+            salvo = json.load(f)
+        if salvo.get('cabecalho') == cabecalho:
+            return salvo['sep'], salvo['colunas']
+
+    sep = _detectar_separador(cabecalho)
+    mapa = _mapear_colunas(_dividir_cabecalho(cabecalho, sep))
+    try:
+        with open(arq, 'w', encoding='utf-8') as f:
+            json.dump({'cabecalho': cabecalho, 'sep': sep, 'colunas': mapa}, f, indent=1)
+    except OSError:
+        pass  # Pasta somente-leitura: apenas não lembramos o mapeamento
+    return sep, mapa
+
+
+def ler_pantheon(caminho):
+    """
+    Retorna {papel: ndarray float64} para z, mu, ra, dec e mu_err (None se
+    ausente), sem as linhas incompletas, e 'linha' com a posição original de
+    cada objeto no arquivo (para recortar a covariância).
+    """
+    sep, mapa = _resolver_layout(caminho)
+    usadas = {papel: nome for papel, nome in mapa.items() if nome is not None}
+    df = pd.read_csv(caminho, sep=sep, engine='c', usecols=list(usadas.values()),
+                     dtype={nome: np.float64 for nome in usadas.values()})
+
+    validas = df[[usadas[p] for p in OBRIGATORIAS]].notna().all(axis=1).to_numpy()
+    dados = {papel: df[nome].to_numpy()[validas] for papel, nome in usadas.items()}
+    dados.setdefault('mu_err', None)
+    dados['linha'] = np.flatnonzero(validas)
+    return dados
+
+
+def ler_covariancia(caminho_cov):
+    """Covariância no formato publicado: N na primeira linha, depois N*N valores."""
+    with open(caminho_cov, 'rb') as f:
+        n = int(f.readline())
+        valores = np.array(f.read().split(), dtype=np.float64)
+    if valores.size != n * n:
+        raise ValueError(f"Covariância inconsistente: {valores.size} valores para N={n}.")
+    return valores.reshape(n, n)
+
+
+def _chave_fator(caminho_cov, linhas):
+    st = os.stat(caminho_cov)
+    h = hashlib.blake2b(digest_size=8)
+    h.update(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    h.update(np.ascontiguousarray(linhas, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def carregar_cholesky(caminho_cov, linhas):
+    """
+    Fator triangular inferior L da covariância restrita a 'linhas'
+    (C[linhas][:, linhas] = L L^T). Calculado uma vez e reaberto do disco.
+    """
+    arq = f"{os.path.splitext(caminho_cov)[0]}_chol_{_chave_fator(caminho_cov, linhas)}.npy"
+    if os.path.exists(arq):
+        return np.load(arq, mmap_mode='r')
+
+    print(f"Fatorando covariância {os.path.basename(caminho_cov)} (Cholesky, uma única vez)...")
+    C = ler_covariancia(caminho_cov)[np.ix_(linhas, linhas)]
+    L = cholesky(C, lower=True, overwrite_a=True, check_finite=False)
+    try:
+        np.save(arq + '.tmp.npy', L)
+        os.replace(arq + '.tmp.npy', arq)
+    except OSError as e:
+        print(f"AVISO: não foi possível salvar o fator de Cholesky ({e}).")
+    return L
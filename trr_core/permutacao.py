@@ -0,0 +1,234 @@
+"""
+Motor de Teste de Permutação (Hipótese Nula por Embaralhamento).
+
+A correlação de Pearson entre um vetor embaralhado e uma predição fixa
+só depende da ordem dos resíduos: média e norma são invariantes à
+permutação. Padronizamos os dois vetores UMA vez e cada bloco de
+embaralhamentos vira um único produto matriz-vetor.
+
+Reprodutibilidade: cada bloco recebe o seu próprio fluxo SeedSequence
+(filho de ordem fixa), então o resultado é idêntico bit a bit para
+qualquer número de processos. O tamanho do bloco depende apenas do
+limite de memória, nunca do número de workers.
+
+Amostras pequenas (n! <= LIMITE_ENUMERACAO, ex.: as 10 passagens do
+Micius) usam a distribuição nula EXATA: todas as n! permutações. As
+primeiras n - TAMANHO_CAUDA posições são fixadas por prefixo; a cauda é
+percorrida pelo algoritmo de Heap (uma troca por passo), atualizando o
+produto escalar de todos os prefixos de uma vez.
+"""
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+LIMITE_MEMORIA_MB = 256  # Memória máxima de um bloco de permutações (por worker)
+LIMITE_ENUMERACAO = math.factorial(10)  # Acima disto: Monte Carlo (a nula exata ocupa 8 * n! bytes)
+TAMANHO_CAUDA = 7        # Posições percorridas pelo algoritmo de Heap (7! = 5040 passos vetorizados)
+TOLERANCIA_EMPATE = 1e-10  # Deriva da atualização incremental ao comparar com r_obs
+
+# Estado global de cada processo worker (preenchido pelo inicializador)
+_ESTADO_WORKER = {}
+
+
+def padronizar(v):
+    """Centraliza e normaliza o vetor para norma unitária (float64)."""
+    v = np.asarray(v, dtype=np.float64)
+    v_c = v - v.mean()
+    norma = np.sqrt(np.dot(v_c, v_c))
+    if norma == 0:
+        raise ValueError("Vetor constante: correlação indefinida.")
+    return v_c / norma
+
+
+def tamanho_bloco_permutacoes(n, limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """Quantas permutações de tamanho n cabem em um bloco de memória."""
+    return max(1, int(limite_memoria_mb * 2**20) // (8 * n))
+
+
+def _permutar_bloco(x, semente, n_bloco):
+    # Cada linha do buffer é uma permutação independente de x
+    rng = np.random.default_rng(semente)
+    buffer = np.tile(x, (n_bloco, 1))
+    rng.permuted(buffer, axis=1, out=buffer)
+    return buffer
+
+
+def _pontuar_bloco(x_pad, y_pad, semente, n_bloco):
+    return _permutar_bloco(x_pad, semente, n_bloco) @ y_pad
+
+
+def _inicializar_worker(x_pad, y_pad):
+    _ESTADO_WORKER['x'] = x_pad
+    _ESTADO_WORKER['y'] = y_pad
+
+
+def _pontuar_bloco_worker(semente, n_bloco):
+    return _pontuar_bloco(_ESTADO_WORKER['x'], _ESTADO_WORKER['y'], semente, n_bloco)
+
+
+def _plano_blocos(n, n_perm, semente, limite_memoria_mb):
+    """Tamanhos dos blocos e um fluxo SeedSequence independente por bloco."""
+    bloco = max(1, min(n_perm, tamanho_bloco_permutacoes(n, limite_memoria_mb)))
+    tamanhos = [bloco] * (n_perm // bloco)
+    if n_perm % bloco:
+        tamanhos.append(n_perm % bloco)
+    return tamanhos, np.random.SeedSequence(semente).spawn(len(tamanhos))
+
+
+def gerar_blocos_permutados(x, n_perm, semente=None, limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """
+    Gera blocos (k, n) de permutações de x, com o mesmo plano de sementes do
+    teste de correlação. Para estatísticas que não são um produto escalar
+    (ex.: ajustes lineares em lote), consumidas bloco a bloco.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    tamanhos, sementes = _plano_blocos(len(x), n_perm, semente, limite_memoria_mb)
+    for s, k in zip(sementes, tamanhos):
+        yield _permutar_bloco(x, s, k)
+
+
+def teste_permutacao_correlacao(x, y, n_perm=1000, semente=None, n_workers=1,
+                                limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """
+    Correlação observada de (x, y) e a distribuição nula obtida embaralhando x.
+
+    Retorna (r_obs, r_nulo), com r_nulo de tamanho n_perm na ordem dos blocos.
+    n_workers=None usa todos os núcleos disponíveis.
+    """
+    x_pad = padronizar(x)
+    y_pad = padronizar(y)
+    if x_pad.shape != y_pad.shape:
+        raise ValueError("x e y devem ter o mesmo tamanho.")
+
+    r_obs = float(np.dot(x_pad, y_pad))
+    return r_obs, projecoes_permutadas(x_pad, y_pad, n_perm, semente, n_workers, limite_memoria_mb)
+
+
+def projecoes_permutadas(x_pad, Y, n_perm=1000, semente=None, n_workers=1,
+                         limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """
+    Produtos x_permutado @ Y para n_perm embaralhamentos de x_pad, com Y de
+    shape (n,) ou (n, k) (várias predições no mesmo embaralhamento).
+    Retorna (n_perm,) ou (n_perm, k), na ordem dos blocos.
+    """
+    tamanhos, sementes = _plano_blocos(len(x_pad), n_perm, semente, limite_memoria_mb)
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(tamanhos))
+
+    if n_workers <= 1:
+        blocos = [_pontuar_bloco(x_pad, Y, s, k) for s, k in zip(sementes, tamanhos)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_inicializar_worker,
+                                 initargs=(x_pad, Y)) as pool:
+            blocos = list(pool.map(_pontuar_bloco_worker, sementes, tamanhos))
+
+    return np.concatenate(blocos) if blocos else np.empty((0,) + np.shape(Y)[1:])
+
+
+def significancia_permutacao(r_obs, r_nulo):
+    """
+    Sigma (distância à média nula em desvios-padrão) e p-valor bicaudal
+    empírico com a correção (k + 1) / (N + 1).
+    """
+    mu_nulo = np.mean(r_nulo)
+    sigma = (r_obs - mu_nulo) / np.std(r_nulo)
+    extremos = np.count_nonzero(np.abs(r_nulo - mu_nulo) >= abs(r_obs - mu_nulo))
+    p_valor = (extremos + 1) / (len(r_nulo) + 1)
+    return sigma, p_valor
+
+
+@lru_cache(maxsize=None)
+def _trocas_heap(m):
+    """Trocas (i, j) do algoritmo de Heap iterativo: visita as m! ordens com m! - 1 trocas."""
+    contador = [0] * m
+    trocas = []
+    i = 1
+    while i < m:
+        if contador[i] < i:
+            trocas.append((0 if i % 2 == 0 else contador[i], i))
+            contador[i] += 1
+            i = 1
+        else:
+            contador[i] = 0
+            i += 1
+    return tuple(trocas)
+
+
+def _enumerar_bloco(x_pad, y_pad, prefixos):
+    """Produtos x_permutado @ y_pad de todas as permutações que começam por cada prefixo."""
+    n_pref, k = prefixos.shape
+    m = len(x_pad) - k
+    livres = np.ones((n_pref, len(x_pad)), dtype=bool)
+    livres[np.arange(n_pref)[:, None], prefixos] = False
+    cauda = x_pad[np.nonzero(livres)[1].reshape(n_pref, m)]
+
+    y_cauda = y_pad[k:]
+    colunas = [cauda[:, j].copy() for j in range(m)]
+    trocas = _trocas_heap(m)
+    produtos = np.empty((len(trocas) + 1, n_pref))
+    d = x_pad[prefixos] @ y_pad[:k] + cauda @ y_cauda
+    produtos[0] = d
+    for passo, (a, b) in enumerate(trocas, 1):
+        # Trocar as posições a e b muda o produto em (x_b - x_a) * (y_a - y_b)
+        d += (colunas[b] - colunas[a]) * (y_cauda[a] - y_cauda[b])
+        colunas[a], colunas[b] = colunas[b], colunas[a]
+        produtos[passo] = d
+    return produtos.T.ravel()
+
+
+def _enumerar_bloco_worker(prefixos):
+    return _enumerar_bloco(_ESTADO_WORKER['x'], _ESTADO_WORKER['y'], prefixos)
+
+
+def teste_permutacao_exato(x, y, n_workers=1, limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """
+    Correlação observada e a distribuição nula EXATA: as n! correlações de
+    (x permutado, y), uma por permutação (ordem por prefixo). Retorna (r_obs, r_nulo).
+    """
+    x_pad = padronizar(x)
+    y_pad = padronizar(y)
+    if x_pad.shape != y_pad.shape:
+        raise ValueError("x e y devem ter o mesmo tamanho.")
+    n = len(x_pad)
+    k = max(0, n - TAMANHO_CAUDA)
+    prefixos = np.array(list(itertools.permutations(range(n), k)), dtype=np.intp)  # (n!/(n-k)!, k)
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    por_bloco = max(1, int(limite_memoria_mb * 2**20) // (8 * math.factorial(n - k)))
+    por_bloco = min(por_bloco, -(-len(prefixos) // n_workers))
+    blocos = [prefixos[i:i + por_bloco] for i in range(0, len(prefixos), por_bloco)]
+    n_workers = min(n_workers, len(blocos))
+
+    if n_workers <= 1:
+        partes = [_enumerar_bloco(x_pad, y_pad, b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_inicializar_worker,
+                                 initargs=(x_pad, y_pad)) as pool:
+            partes = list(pool.map(_enumerar_bloco_worker, blocos))
+    return float(np.dot(x_pad, y_pad)), np.concatenate(partes)
+
+
+def teste_permutacao(x, y, n_perm=1000, semente=None, n_workers=1,
+                     limite_enumeracao=LIMITE_ENUMERACAO, limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """
+    Nula exata se n! <= limite_enumeracao, senão n_perm embaralhamentos em lote.
+    Retorna (r_obs, r_nulo, exato).
+    """
+    if math.factorial(len(x)) <= limite_enumeracao:
+        return teste_permutacao_exato(x, y, n_workers, limite_memoria_mb) + (True,)
+    return teste_permutacao_correlacao(x, y, n_perm, semente, n_workers, limite_memoria_mb) + (False,)
+
+
+def p_valor_exato(r_obs, r_nulo):
+    """
+    P-valor bicaudal exato sobre a nula completa: fração das n! permutações
+    com |r| >= |r_obs| (a média exata da nula é zero; a identidade conta).
+    """
+    return np.count_nonzero(np.abs(r_nulo) >= abs(r_obs) - TOLERANCIA_EMPATE) / len(r_nulo)
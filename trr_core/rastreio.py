@@ -0,0 +1,208 @@
+"""
+Rastreio de Etapas (opcional): tempo de parede, CPU, linhas e RSS por etapa.
+
+Desligado por padrão. Com a variável de ambiente TRR_RASTREIO definida
+(prefixo dos arquivos de saída; '1' usa 'rastreio_trr'), cada etapa
+nomeada grava:
+  - <prefixo>.jsonl: uma linha JSON por etapa (agregação entre execuções);
+  - <prefixo>_<pid>.trace.json: eventos 'X' no formato Chrome trace
+    (chrome://tracing, Perfetto), em modo array sem o ']' final, que o
+    formato permite; assim um processo interrompido ou um worker do pool
+    (que sai sem atexit) ainda deixa um trace válido.
+
+Desligado, etapa() devolve um objeto nulo compartilhado e rastrear()
+devolve a própria função, sem custo por chamada.
+
+    with etapa('sdss.monte_carlo', linhas=n) as e:
+        ...
+        e.linhas = n_validos   # opcional, se só for conhecido no fim
+
+O RSS vem do psutil quando instalado, senão de /proc/self/statm (Linux);
+sem nenhum dos dois, os campos de memória ficam nulos. O tempo de CPU é
+o do processo (time.process_time), incluindo todas as suas threads.
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # Opcional: apenas o RSS fora do Linux depende dele
+    psutil = None
+
+VARIAVEL_AMBIENTE = 'TRR_RASTREIO'
+PREFIXO_PADRAO = 'rastreio_trr'
+
+_valor = os.environ.get(VARIAVEL_AMBIENTE, '').strip()
+ATIVO = _valor not in ('', '0')
+PREFIXO = PREFIXO_PADRAO if _valor == '1' else _valor
+
+_trava = threading.Lock()
+_local = threading.local()
+_saidas = {}  # pid -> (arquivo jsonl, arquivo trace)
+
+
+def _rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _arquivos():
+    # Por pid: processos filhos (fork) não podem reutilizar os descritores do pai
+    pid = os.getpid()
+    saida = _saidas.get(pid)
+    if saida is None:
+        jsonl = open(PREFIXO + '.jsonl', 'a', encoding='utf-8')
+        trace = open(f"{PREFIXO}_{pid}.trace.json", 'w', encoding='utf-8')
+        trace.write('[\n')
+        saida = _saidas[pid] = (jsonl, trace)
+    return saida
+
+
+def _registrar(registro, evento):
+    with _trava:
+        jsonl, trace = _arquivos()
+        jsonl.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        jsonl.flush()
+        trace.write(json.dumps(evento, ensure_ascii=False) + ',\n')
+        trace.flush()
+
+
+class Etapa:
+    """Uma etapa em andamento; 'linhas' pode ser ajustado dentro do bloco."""
+
+    def __init__(self, nome, linhas=None, **args):
+        self.nome = nome
+        self.linhas = linhas
+        self.args = args
+
+    def __enter__(self):
+        pilha = getattr(_local, 'pilha', None)
+        if pilha is None:
+            pilha = _local.pilha = []
+        self.pai = pilha[-1].nome if pilha else None
+        self.profundidade = len(pilha)
+        pilha.append(self)
+        self.rss_inicio = _rss_mb()
+        self.inicio_epoca = time.time()
+        self.cpu_inicio = time.process_time()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        duracao = time.perf_counter() - self.inicio
+        cpu = time.process_time() - self.cpu_inicio
+        rss_fim = _rss_mb()
+        _local.pilha.pop()
+
+        rss_delta = rss_fim - self.rss_inicio if rss_fim is not None and self.rss_inicio is not None else None
+        registro = {'etapa': self.nome, 'pai': self.pai, 'profundidade': self.profundidade,
+                    'inicio': self.inicio_epoca, 'parede_s': duracao, 'cpu_s': cpu,
+                    'linhas': self.linhas,
+                    'linhas_por_s': self.linhas / duracao if self.linhas is not None and duracao > 0 else None,
+                    'rss_inicio_mb': self.rss_inicio, 'rss_delta_mb': rss_delta,
+                    'pid': os.getpid(), 'tid': threading.get_ident(),
+                    'erro': tipo.__name__ if tipo is not None else None}
+        if self.args:
+            registro['args'] = self.args
+        evento = {'name': self.nome, 'ph': 'X', 'ts': self.inicio_epoca * 1e6, 'dur': duracao * 1e6,
+                  'pid': registro['pid'], 'tid': registro['tid'],
+                  'args': {k: registro[k] for k in ('cpu_s', 'linhas', 'linhas_por_s', 'rss_delta_mb', 'erro')
+                           if registro[k] is not None}}
+        evento['args'].update(self.args)
+        _registrar(registro, evento)
+        return False
+
+
+class _EtapaNula:
+    """Substituto sem custo quando o rastreio está desligado."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_NULA = _EtapaNula()
+
+
+def etapa(nome, linhas=None, **args):
+    """Gerenciador de contexto de uma etapa nomeada (args extras vão para o trace)."""
+    if not ATIVO:
+        return _NULA
+    return Etapa(nome, linhas, **args)
+
+
+def rastrear(nome=None, linhas=None):
+    """
+    Decorador: a chamada inteira vira uma etapa (nome padrão: o da função).
+    linhas(resultado) opcional conta as linhas processadas a partir do retorno.
+    """
+    def decorar(funcao):
+        if not ATIVO:
+            return funcao
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*a, **kw):
+            with Etapa(rotulo) as e:
+                resultado = funcao(*a, **kw)
+                if linhas is not None:
+                    e.linhas = linhas(resultado)
+                return resultado
+        return envolvida
+    return decorar
+
+
+def linhas_colunas(dados):
+    """Contador para rastrear(): número de linhas de um {coluna: array}."""
+    return len(next(iter(dados.values()))) if dados else 0
+
+
+def agregar(caminho_jsonl):
+    """
+    Totais por etapa a partir do JSON lines: {etapa: {'chamadas', 'parede_s',
+    'cpu_s', 'linhas', 'linhas_por_s', 'rss_delta_max_mb'}}.
+    """
+    totais = {}
+    with open(caminho_jsonl, encoding='utf-8') as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            r = json.loads(linha)
+            t = totais.setdefault(r['etapa'], {'chamadas': 0, 'parede_s': 0.0, 'cpu_s': 0.0,
+                                                'linhas': 0, 'rss_delta_max_mb': None})
+            t['chamadas'] += 1
+            t['parede_s'] += r['parede_s']
+            t['cpu_s'] += r['cpu_s']
+            t['linhas'] += r['linhas'] or 0
+            if r['rss_delta_mb'] is not None:
+                anterior = t['rss_delta_max_mb']
+                t['rss_delta_max_mb'] = r['rss_delta_mb'] if anterior is None else max(anterior, r['rss_delta_mb'])
+    for t in totais.values():
+        t['linhas_por_s'] = t['linhas'] / t['parede_s'] if t['linhas'] and t['parede_s'] > 0 else None
+    return totais
+
+
+if __name__ == "__main__":
+    import sys
+
+    totais = agregar(sys.argv[1] if len(sys.argv) > 1 else PREFIXO_PADRAO + '.jsonl')
+    print(f"{'Etapa':<32} | {'N':>5} | {'Parede (s)':>10} | {'CPU (s)':>9} | {'Linhas/s':>12} | {'dRSS max (MB)':>13}")
+    print("-" * 96)
+    for nome, t in sorted(totais.items(), key=lambda item: -item[1]['parede_s']):
+        taxa = f"{t['linhas_por_s']:.3e}" if t['linhas_por_s'] else "-"
+        rss = f"{t['rss_delta_max_mb']:.1f}" if t['rss_delta_max_mb'] is not None else "-"
+        print(f"{nome:<32} | {t['chamadas']:>5} | {t['parede_s']:>10.3f} | {t['cpu_s']:>9.3f} | {taxa:>12} | {rss:>13}")
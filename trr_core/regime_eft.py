@@ -0,0 +1,152 @@
+"""
+Mapa de Regimes da Transição EFT chi(Phi): ativação da TRR e sigma esperado.
+
+A transição logística chi = 1 / (1 + exp(-k (Phi - Phi_lim))) com
+k = 1e10 estoura exp() longe do limiar (ex.: Phi = -1 no LHC). Aqui ela
+é avaliada por scipy.special.expit (e log_expit para log chi), estáveis
+em toda a reta real.
+
+O mapa cobre potencial gravitacional x densidade em grades logarítmicas
+de dezenas de décadas. As linhas de potencial são calculadas em blocos,
+com o tamanho limitado por LIMITE_MEMORIA_MB, e gravadas direto em '.npy'
+abertos como memmap (chi.npy, sigma.npy e eixos.npz na pasta de saída);
+um mapa de 10^8 células não precisa caber na memória.
+
+A fronteira chi = nível é localizada, para cada densidade, por bissecção
+vetorizada em log10|Phi|, sem refinar a grade.
+"""
+import os
+
+import numpy as np
+from scipy.special import expit, log_expit
+
+from .rastreio import etapa
+
+POT_LIMITE = -1e-9        # Potencial crítico onde a TRR "desperta"
+INCLINACAO_K = 1e10       # Inclinação da transição
+SIGMA_TRR = 46.43         # Sigma com a TRR plenamente ativa
+RUIDO_EINSTEIN = 0.22     # Sigma do regime sem ativação
+LIMIAR_CHI = 0.01         # Abaixo disso vale o ruído de Einstein
+
+LIMITE_MEMORIA_MB = 256
+_TEMPORARIOS_POR_CELULA = 4  # float64 vivos por célula no bloco (argumento, chi, sigma, conversão)
+TOLERANCIA_DECADAS = 1e-12   # Largura final do intervalo da bissecção em log10|Phi|
+
+
+def chi_transicao(potencial, k=INCLINACAO_K, pot_limite=POT_LIMITE):
+    """Ativação chi(Phi) estável (sem overflow para nenhum Phi)."""
+    return expit(k * (np.asarray(potencial, dtype=np.float64) - pot_limite))
+
+
+def log_chi_transicao(potencial, k=INCLINACAO_K, pot_limite=POT_LIMITE):
+    """log(chi), finito mesmo onde chi sofre underflow (ex.: -1e10 no LHC)."""
+    return log_expit(k * (np.asarray(potencial, dtype=np.float64) - pot_limite))
+
+
+def modelo_padrao(potencial, densidade):
+    """chi(Phi, rho) do script de calibração: só depende do potencial."""
+    return np.broadcast_to(chi_transicao(potencial), np.broadcast_shapes(np.shape(potencial),
+                                                                        np.shape(densidade)))
+
+
+def sigma_esperado(chi):
+    """Sigma implicado por chi: SIGMA_TRR * chi acima de LIMIAR_CHI, senão o ruído."""
+    chi = np.asarray(chi, dtype=np.float64)
+    return np.where(chi > LIMIAR_CHI, SIGMA_TRR * chi, RUIDO_EINSTEIN)
+
+
+def eixo_potencial(decada_min, decada_max, n):
+    """Potenciais negativos -10^u, u de decada_min a decada_max (|Phi| crescente)."""
+    return -np.logspace(decada_min, decada_max, n)
+
+
+def eixo_densidade(decada_min, decada_max, n):
+    return np.logspace(decada_min, decada_max, n)
+
+
+def linhas_por_bloco(n_colunas, limite_memoria_mb=LIMITE_MEMORIA_MB):
+    return max(1, int(limite_memoria_mb * 2**20) // (8 * n_colunas * _TEMPORARIOS_POR_CELULA))
+
+
+def gerar_mapa(potenciais, densidades, pasta, modelo=modelo_padrao, dtype=np.float32,
+               limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """
+    Grava os mapas chi e sigma (n_potenciais, n_densidades) em pasta/chi.npy
+    e pasta/sigma.npy, bloco a bloco, e os eixos em pasta/eixos.npz.
+    modelo(Phi (k, 1), rho (1, m)) -> chi (k, m). Retorna os mapas reabertos
+    em memmap somente-leitura.
+    """
+    potenciais = np.asarray(potenciais, dtype=np.float64)
+    densidades = np.asarray(densidades, dtype=np.float64)
+    forma = (len(potenciais), len(densidades))
+    os.makedirs(pasta, exist_ok=True)
+
+    finais = {nome: os.path.join(pasta, nome + '.npy') for nome in ('chi', 'sigma')}
+    mapas = {nome: np.lib.format.open_memmap(arq + '.tmp', mode='w+', dtype=dtype, shape=forma)
+             for nome, arq in finais.items()}
+    k = linhas_por_bloco(forma[1], limite_memoria_mb)
+    with etapa('regime.mapa', linhas=forma[0] * forma[1], blocos=-(-forma[0] // k)):
+        for i in range(0, forma[0], k):
+            chi = modelo(potenciais[i:i + k, None], densidades[None, :])
+            mapas['chi'][i:i + k] = chi
+            mapas['sigma'][i:i + k] = sigma_esperado(chi)
+    for mapa in mapas.values():
+        mapa.flush()
+    mapas.clear()  # Fecha os memmaps antes do os.replace (exigido no Windows)
+    for arq in finais.values():
+        os.replace(arq + '.tmp', arq)
+    np.savez(os.path.join(pasta, 'eixos.npz'), potenciais=potenciais, densidades=densidades)
+    return abrir_mapa(pasta)
+
+
+def abrir_mapa(pasta):
+    """{'chi', 'sigma' (memmaps), 'potenciais', 'densidades'} de um mapa gravado."""
+    with np.load(os.path.join(pasta, 'eixos.npz')) as eixos:
+        mapa = {nome: eixos[nome] for nome in ('potenciais', 'densidades')}
+    for nome in ('chi', 'sigma'):
+        mapa[nome] = np.load(os.path.join(pasta, nome + '.npy'), mmap_mode='r')
+    return mapa
+
+
+def fronteira_transicao(densidades, decada_min, decada_max, nivel=0.5, modelo=modelo_padrao,
+                        tolerancia=TOLERANCIA_DECADAS):
+    """
+    |Phi| da fronteira chi = nível para cada densidade, por bissecção em
+    u = log10|Phi| no intervalo [decada_min, decada_max]. Supõe chi
+    monótono em |Phi| por densidade; densidades sem cruzamento no
+    intervalo retornam NaN.
+    """
+    rho = np.asarray(densidades, dtype=np.float64)
+    a = np.full(rho.shape, float(decada_min))
+    b = np.full(rho.shape, float(decada_max))
+    fa = modelo(-10.0 ** a, rho) - nivel
+    fb = modelo(-10.0 ** b, rho) - nivel
+    cruza = np.sign(fa) != np.sign(fb)
+
+    for _ in range(int(np.ceil(np.log2((decada_max - decada_min) / tolerancia)))):
+        meio = (a + b) / 2
+        fm = modelo(-10.0 ** meio, rho) - nivel
+        mesmo_lado = np.sign(fm) == np.sign(fa)
+        a = np.where(mesmo_lado, meio, a)
+        fa = np.where(mesmo_lado, fm, fa)
+        b = np.where(mesmo_lado, b, meio)
+    return np.where(cruza, 10.0 ** ((a + b) / 2), np.nan)
+
+
+def posicionar(experimentos, mapa=None, modelo=modelo_padrao):
+    """
+    experimentos: {nome: {'pot': Phi, 'rho': densidade, ...}}. Retorna
+    {nome: {'chi', 'log_chi', 'sigma', 'celula'}}; log_chi é o da
+    transição padrão e 'celula' é o índice (linha, coluna) mais próximo em
+    log no mapa, se houver mapa.
+    """
+    resultado = {}
+    for nome, dados in experimentos.items():
+        chi = float(modelo(np.float64(dados['pot']), np.float64(dados['rho'])))
+        item = {'chi': chi, 'log_chi': float(log_chi_transicao(dados['pot'])),
+                'sigma': float(sigma_esperado(chi))}
+        if mapa is not None:
+            item['celula'] = (int(np.argmin(np.abs(np.log10(-mapa['potenciais']) - np.log10(-dados['pot'])))),
+                              int(np.argmin(np.abs(np.log10(mapa['densidades']) - np.log10(dados['rho'])))))
+        resultado[nome] = item
+    return resultado
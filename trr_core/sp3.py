@@ -0,0 +1,153 @@
+"""
+Leitor Vetorizado de Órbitas SP3-c/d (ILRS / IGS).
+
+O arquivo é lido inteiro em bytes e classificado por linha pelo primeiro
+caractere: cabeçalho ('#', '+', '%', '/'), épocas ('*') e posições ('P').
+Cada linha de posição herda a época do último '*' anterior (soma
+cumulativa), o satélite é comparado pelo ID EXATO (colunas 2-4, ex.:
+'L52') e X, Y, Z e relógio são decodificados por fatias de largura fixa
+sobre uma matriz de bytes, sem split linha a linha.
+
+Vários arquivos (glob de produtos diários ou semanais) são lidos em
+paralelo e concatenados em um único conjunto ordenado no tempo; épocas
+repetidas entre produtos sobrepostos ficam com o arquivo mais recente
+(o último na ordem do glob).
+"""
+import glob
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+LARGURA_LINHA = 80
+# Registro de posição: 'P' + ID (3) + X, Y, Z (km, 14 cada) + relógio (us, 14)
+FATIA_ID = slice(1, 4)
+FATIAS_XYZ = (slice(4, 18), slice(18, 32), slice(32, 46))
+FATIA_RELOGIO = slice(46, 60)
+RELOGIO_AUSENTE = 999999.0
+
+
+def _ler_bytes(caminho):
+    abrir = gzip.open if caminho.endswith('.gz') else open
+    with abrir(caminho, 'rb') as f:
+        return f.read()
+
+
+def _matriz_linhas(linhas):
+    """Lista de linhas (bytes) -> matriz (n, LARGURA_LINHA) de bytes, com espaços à direita."""
+    return np.array([l.ljust(LARGURA_LINHA)[:LARGURA_LINHA] for l in linhas],
+                    dtype=f'S{LARGURA_LINHA}').view('S1').reshape(len(linhas), LARGURA_LINHA)
+
+
+def _coluna(matriz, fatia):
+    """Fatia de largura fixa da matriz de bytes -> array de strings de bytes."""
+    bloco = np.ascontiguousarray(matriz[:, fatia])
+    return bloco.view(f'S{bloco.shape[1]}').ravel()
+
+
+def _ler_cabecalho(linhas):
+    primeira = linhas[0].decode('ascii', 'replace')
+    cab = {'versao': primeira[1], 'tipo': primeira[2], 'n_epocas': int(primeira[32:39]),
+           'satelites': [], 'sistema_tempo': None, 'intervalo': None}
+    for linha in linhas[1:]:
+        texto = linha.decode('ascii', 'replace').rstrip()
+        if texto.startswith('##'):
+            cab['intervalo'] = float(texto[24:38])
+        elif texto.startswith('+ '):
+            campo = texto[9:60]
+            cab['satelites'] += [campo[i:i + 3].strip() for i in range(0, len(campo), 3)
+                                 if campo[i:i + 3].strip() not in ('', '0', '00')]
+        elif texto.startswith('%c') and cab['sistema_tempo'] is None:
+            cab['sistema_tempo'] = texto[9:12].strip()
+        elif texto.startswith('*'):
+            break
+    return cab
+
+
+def _epocas(linhas):
+    """Linhas '*' -> datetime64[ns]."""
+    tempos = np.empty(len(linhas), dtype='datetime64[ns]')
+    for i, l in enumerate(linhas):
+        ano, mes, dia, hora, minuto = (int(l[a:b]) for a, b in ((3, 7), (8, 10), (11, 13), (14, 16), (17, 19)))
+        segundos = float(l[20:31])
+        tempos[i] = (np.datetime64(f"{ano:04d}-{mes:02d}-{dia:02d}", 'ns')
+                     + np.timedelta64(hora * 3600 + minuto * 60, 's')
+                     + np.timedelta64(int(round(segundos * 1e9)), 'ns'))
+    return tempos
+
+
+def ler_sp3(caminho, satelites=None):
+    """
+    Um arquivo SP3-c/d. satelites: IDs exatos (ex.: ['L52']) ou None para todos.
+
+    Retorna dict com 'cabecalho', 'tempo' (datetime64[ns]), 'sat' (IDs),
+    'pos' (n, 3) em km e 'relogio' (us, NaN se ausente). Posições ausentes
+    (X = Y = Z = 0) são descartadas.
+    """
+    linhas = _ler_bytes(caminho).splitlines()
+    if not linhas or linhas[0][:1] != b'#':
+        raise ValueError(f"{caminho}: não é um arquivo SP3.")
+    cabecalho = _ler_cabecalho(linhas)
+
+    tipo = np.array([l[:1] for l in linhas], dtype='S1')
+    eh_epoca = tipo == b'*'
+    eh_pos = tipo == b'P'
+    epoca_da_linha = np.cumsum(eh_epoca) - 1
+    tempos = _epocas([linhas[i] for i in np.flatnonzero(eh_epoca)])
+
+    idx = np.flatnonzero(eh_pos & (epoca_da_linha >= 0))
+    matriz = _matriz_linhas([linhas[i] for i in idx]) if idx.size else np.empty((0, LARGURA_LINHA), 'S1')
+    sat = np.char.strip(_coluna(matriz, FATIA_ID)).astype('U3')
+
+    manter = np.ones(len(idx), dtype=bool) if satelites is None else np.isin(sat, list(satelites))
+    matriz, idx, sat = matriz[manter], idx[manter], sat[manter]
+    pos = np.column_stack([_coluna(matriz, f).astype(np.float64) for f in FATIAS_XYZ]) if len(idx) \
+        else np.empty((0, 3))
+    relogio = np.char.strip(_coluna(matriz, FATIA_RELOGIO))
+    relogio = np.where(relogio == b'', b'nan', relogio).astype(np.float64)
+    relogio[relogio >= RELOGIO_AUSENTE] = np.nan
+
+    valido = np.any(pos != 0.0, axis=1)
+    return {'cabecalho': cabecalho, 'tempo': tempos[epoca_da_linha[idx]][valido], 'sat': sat[valido],
+            'pos': pos[valido], 'relogio': relogio[valido]}
+
+
+def _ler_sp3_worker(args):
+    return ler_sp3(*args)
+
+
+def ler_sp3_multiplos(padrao, satelites=None, n_workers=None):
+    """
+    Todos os arquivos do glob (ou lista de caminhos), lidos em paralelo.
+
+    Retorna dict como ler_sp3, mais 'arquivo' (índice em 'arquivos') e
+    'cabecalhos', ordenado por (tempo, sat) e sem épocas duplicadas.
+    """
+    arquivos = sorted(glob.glob(padrao)) if isinstance(padrao, str) else list(padrao)
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhum arquivo SP3 em {padrao}.")
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(arquivos))
+
+    tarefas = [(a, satelites) for a in arquivos]
+    if n_workers <= 1:
+        partes = list(map(_ler_sp3_worker, tarefas))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            partes = list(pool.map(_ler_sp3_worker, tarefas))
+
+    dados = {chave: np.concatenate([p[chave] for p in partes]) for chave in ('tempo', 'sat', 'pos', 'relogio')}
+    dados['arquivo'] = np.repeat(np.arange(len(arquivos)), [len(p['tempo']) for p in partes])
+
+    # Ordem por (tempo, sat, arquivo mais recente primeiro); mantém o primeiro de cada (tempo, sat)
+    ordem = np.lexsort((-dados['arquivo'], dados['sat'], dados['tempo']))
+    dados = {chave: v[ordem] for chave, v in dados.items()}
+    novo = np.ones(len(ordem), dtype=bool)
+    novo[1:] = (dados['tempo'][1:] != dados['tempo'][:-1]) | (dados['sat'][1:] != dados['sat'][:-1])
+    dados = {chave: v[novo] for chave, v in dados.items()}
+
+    dados['arquivos'] = arquivos
+    dados['cabecalhos'] = [p['cabecalho'] for p in partes]
+    return dados
@@ -0,0 +1,164 @@
+"""
+Armazém SPARC (Rotmod_LTG): curvas de rotação em arrays concatenados.
+
+Todos os arquivos .dat são lidos UMA vez (em paralelo) e concatenados em
+arrays float64 com offsets por galáxia. Os termos bariônicos já vêm em SI
+(r em metros, V^2 em (m/s)^2) separados por componente, de modo que
+qualquer M/L ou a0 é avaliado em uma única passada vetorizada; o erro
+médio por galáxia sai de np.add.reduceat.
+
+O armazém é salvo em um único '.npz' ao lado da pasta, com chave nos nomes,
+tamanhos e mtimes dos arquivos. Falhas de leitura são registradas em
+'falhas' em vez de silenciosamente ignoradas.
+"""
+import glob
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .rastreio import rastrear
+
+KPC_EM_METROS = 3.086e19
+COLUNAS_SPARC = ['Rad', 'Vobs', 'errV', 'Vgas', 'Vdisk', 'Vbul', 'SBdis', 'SBbul']
+FRACAO_BORDA = 0.8  # Regime de baixa aceleração: Rad > 0.8 * r_max
+CAMPOS = ('rad', 'vobs', 'errv', 'r_m', 'v2_gas', 'v2_disk', 'v2_bul', 'borda')
+
+
+def lei_de_cortez(g_bar, a0):
+    """
+    Lei de Cortez g = g_bar / (1 - exp(-sqrt(g_bar/a0))), vetorizada.
+    expm1 mantém a precisão quando sqrt(g_bar/a0) << 1 (g -> sqrt(g_bar*a0)).
+    """
+    return g_bar / -np.expm1(-np.sqrt(g_bar / a0))
+
+
+def _ler_galaxia(arquivo):
+    try:
+        df = pd.read_csv(arquivo, sep=r'\s+', comment='#', header=None, names=COLUNAS_SPARC)
+        df = df.apply(pd.to_numeric, errors='coerce').dropna()
+        return arquivo, df.to_numpy(dtype=np.float64), None
+    except Exception as e:  # Registrada em ArmazemSPARC.falhas
+        return arquivo, None, f"{type(e).__name__}: {e}"
+
+
+def _chave_pasta(arquivos):
+    h = hashlib.blake2b(digest_size=16)
+    for arq in arquivos:
+        st = os.stat(arq)
+        h.update(f"{os.path.basename(arq)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+
+class ArmazemSPARC:
+    """
+    Curvas de rotação concatenadas. offsets[i] é o início da galáxia i
+    nos arrays; 'borda' marca os pontos com Rad > FRACAO_BORDA * r_max.
+    """
+
+    def __init__(self, nomes, offsets, falhas=(), **arrays):
+        self.nomes = list(nomes)
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+        self.falhas = [str(f) for f in falhas]
+        for campo in CAMPOS:
+            setattr(self, campo, arrays[campo])
+
+    def __len__(self):
+        return len(self.nomes)
+
+    # --------------------------------------------------------------------------
+    # Construção e cache
+    # --------------------------------------------------------------------------
+    @classmethod
+    def de_tabelas(cls, tabelas, falhas=()):
+        """tabelas: lista de (nome, array (n, 8) nas COLUNAS_SPARC)."""
+        tabelas = [(nome, t) for nome, t in tabelas if len(t)]
+        nomes = [nome for nome, _ in tabelas]
+        tamanhos = [len(t) for _, t in tabelas]
+        offsets = np.concatenate(([0], np.cumsum(tamanhos)[:-1])) if tabelas else np.empty(0)
+        dados = np.concatenate([t for _, t in tabelas]) if tabelas else np.empty((0, 8))
+
+        rad, vobs, errv, vgas, vdisk, vbul = (dados[:, i] for i in range(6))
+        r_max = np.repeat(np.maximum.reduceat(rad, offsets) if tabelas else rad, tamanhos)
+        return cls(nomes, offsets, falhas,
+                   rad=rad, vobs=vobs, errv=errv,
+                   r_m=rad * KPC_EM_METROS,
+                   v2_gas=vgas ** 2 * 1e6, v2_disk=vdisk ** 2 * 1e6, v2_bul=vbul ** 2 * 1e6,
+                   borda=rad > r_max * FRACAO_BORDA)
+
+    @classmethod
+    @rastrear('sparc.carregar', linhas=lambda armazem: len(armazem.rad))
+    def carregar(cls, pasta, arquivo_cache=None, n_workers=None):
+        """
+        Lê todos os .dat da pasta (ou reabre o .npz se a pasta não mudou).
+        Retorna um armazém vazio se a pasta não tiver arquivos.
+        """
+        arquivos = sorted(glob.glob(os.path.join(pasta, "*.dat")))
+        if not arquivos:
+            return cls.de_tabelas([])
+
+        arquivo_cache = arquivo_cache or os.path.normpath(pasta) + '_store.npz'
+        chave = _chave_pasta(arquivos)
+        if os.path.exists(arquivo_cache):
+            with np.load(arquivo_cache) as npz:
+                if str(npz['chave']) == chave:
+                    return cls(npz['nomes'], npz['offsets'], npz['falhas'],
+                               **{campo: npz[campo] for campo in CAMPOS})
+
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            resultados = list(pool.map(_ler_galaxia, arquivos))
+
+        tabelas = [(os.path.basename(arq), t) for arq, t, erro in resultados if erro is None]
+        falhas = [f"{os.path.basename(arq)} -> {erro}" for arq, _, erro in resultados if erro is not None]
+        for falha in falhas:
+            print(f"AVISO SPARC: falha ao ler {falha}")
+
+        armazem = cls.de_tabelas(tabelas, falhas)
+        try:
+            np.savez(arquivo_cache, chave=chave, nomes=np.array(armazem.nomes), offsets=armazem.offsets,
+                     falhas=np.array(armazem.falhas, dtype=str),
+                     **{campo: getattr(armazem, campo) for campo in CAMPOS})
+        except OSError as e:
+            print(f"AVISO SPARC: cache não salvo ({e}).")
+        return armazem
+
+    def somente_borda(self):
+        """Novo armazém apenas com os pontos de borda (galáxias vazias removidas)."""
+        contagem = np.add.reduceat(self.borda, self.offsets, dtype=np.intp) if len(self) else np.empty(0, int)
+        manter = contagem > 0
+        tamanhos = contagem[manter]
+        offsets = np.concatenate(([0], np.cumsum(tamanhos)[:-1])) if manter.any() else np.empty(0)
+        return ArmazemSPARC([n for n, m in zip(self.nomes, manter) if m], offsets, self.falhas,
+                            **{campo: getattr(self, campo)[self.borda] for campo in CAMPOS})
+
+    # --------------------------------------------------------------------------
+    # Física
+    # --------------------------------------------------------------------------
+    def velocidades_trr(self, a0, ml_disk=0.5, ml_bul=0.7):
+        """
+        V_TRR (km/s) pela Lei de Cortez g = g_bar / (1 - exp(-sqrt(g_bar/a0))).
+        Pontos com r <= 0 ou V_bar^2 <= 0 retornam NaN.
+        """
+        v2_bar = self.v2_gas + ml_disk * self.v2_disk + ml_bul * self.v2_bul
+        valido = (self.r_m > 0) & (v2_bar > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            g_bar = np.where(valido, v2_bar / self.r_m, np.nan)
+            g_trr = lei_de_cortez(g_bar, a0)
+            return np.sqrt(g_trr * self.r_m) / 1000
+
+    def erro_medio_absoluto(self, a0, ml_disk=0.5, ml_bul=0.7):
+        """
+        MAE por galáxia (km/s) sobre os pontos válidos; NaN para galáxias
+        sem ponto válido.
+        """
+        if not len(self):
+            return np.empty(0)
+        v_trr = self.velocidades_trr(a0, ml_disk, ml_bul)
+        valido = np.isfinite(v_trr)
+        erro = np.where(valido, np.abs(v_trr - self.vobs), 0.0)
+        soma = np.add.reduceat(erro, self.offsets)
+        contagem = np.add.reduceat(valido, self.offsets, dtype=np.intp)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(contagem > 0, soma / contagem, np.nan)
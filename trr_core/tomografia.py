@@ -0,0 +1,190 @@
+"""
+Tomografia em Redshift da Correlação de Ressonância (SDSS DR16Q).
+
+A predição de Cortez de cada quasar depende só do seu próprio (z, RA), e
+o detrending por média da janela não altera a correlação de Pearson.
+Com o catálogo ordenado por z UMA vez, as somas cumulativas de x, y, x^2,
+y^2 e xy nas bordas de uma grade em z dão a correlação de qualquer janela
+[z_lo, z_hi) em O(1): o mapa r(z_lo, z_hi) inteiro sai de subtrações.
+
+Nulo de permutação na mesma estrutura: os resíduos são embaralhados
+dentro de cada bin elementar da grade, o que é uma permutação válida
+dentro de TODA janela (união de bins) e preserva a dependência em z dos
+resíduos. As somas de x e x^2 por bin não mudam; cada embaralhamento só
+refaz a soma cumulativa de xy. Um fluxo SeedSequence por bloco, como em
+permutacao.py: resultado idêntico para qualquer número de processos.
+
+Sob a permutação COMPLETA de uma janela, E[r] = 0 e Var[r] = 1/(n - 1)
+exatamente; sigma_local = r*sqrt(n - 1) é essa escala assintótica e serve
+de estatística comum a todas as janelas. O nulo executado (dentro dos
+bins) é mais restrito: preserva a parte da correlação entre bins (média
+nula pode ser != 0 em janelas de vários bins) e tem desvio um pouco menor
+(~0.93-0.95/sqrt(n - 1) em catálogos sintéticos). Por isso só p_valor,
+p_global e sigma_global são exatos sob ele; sigma_padronizado =
+(r - media_nula) / desvio_nulo é a padronização contra o nulo simulado.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import norm
+
+D0_NOMINAL = 0.794
+OMEGA_P = 1128.0
+DIRECAO_INI = 148.9
+N_MINIMO = 30            # Janelas com menos objetos ficam NaN
+LIMITE_MEMORIA_MB = 256  # Memória máxima de um bloco de embaralhamentos (por worker)
+
+# Colunas das somas cumulativas
+N, SX, SY, SXX, SYY, SXY = range(6)
+
+_ESTADO_WORKER = {}
+
+
+def predicao_cortez(ra, z, d0=D0_NOMINAL, omega_p=OMEGA_P, direcao=DIRECAO_INI):
+    """Predição de paridade Spin-2 do script SDSS: -d0 * z * cos(ra - fase(z))."""
+    fase = (direcao + omega_p / z) % 360
+    return -(d0 * z * np.cos(np.radians(ra - fase)))
+
+
+def preparar_tomografia(z, ra, mag, bordas, d0=D0_NOMINAL, omega_p=OMEGA_P, direcao=DIRECAO_INI):
+    """
+    Ordena o catálogo por z e acumula as somas nas bordas da grade.
+    Retorna dict com 'bordas', 'x', 'y' (ordenados e centralizados),
+    'inicio' (índice do primeiro objeto >= cada borda) e 'P' (n_bordas, 6).
+    """
+    bordas = np.asarray(bordas, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    dentro = (z >= bordas[0]) & (z < bordas[-1])
+    ordem = np.argsort(z[dentro], kind='stable')
+    z_ord = z[dentro][ordem]
+    ra_ord = np.asarray(ra, dtype=np.float64)[dentro][ordem]
+
+    # Centralizar não muda r e evita cancelamento nas somas de quadrados
+    x = np.asarray(mag, dtype=np.float64)[dentro][ordem] - 5 * np.log10(z_ord)
+    x -= x.mean() if len(x) else 0.0
+    y = predicao_cortez(ra_ord, z_ord, d0, omega_p, direcao)
+    y -= y.mean() if len(y) else 0.0
+
+    inicio = np.searchsorted(z_ord, bordas, side='left')
+    termos = np.column_stack((np.ones_like(x), x, y, x * x, y * y, x * y))
+    P = np.vstack((np.zeros(6), np.cumsum(termos, axis=0)))[inicio]
+    return {'bordas': bordas, 'x': x, 'y': y, 'inicio': inicio, 'P': P}
+
+
+def _correlacao_somas(S, sxy, n_minimo):
+    n = S[..., N]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - S[..., SX] * S[..., SY] / n
+        vx = S[..., SXX] - S[..., SX] ** 2 / n
+        vy = S[..., SYY] - S[..., SY] ** 2 / n
+        r = cov / np.sqrt(vx * vy)
+    return np.where((n >= n_minimo) & (vx > 0) & (vy > 0), r, np.nan)
+
+
+def correlacao_janelas(tomo, i, j, n_minimo=N_MINIMO):
+    """r e n das janelas [bordas[i], bordas[j]) (i, j arrays de índices de borda)."""
+    S = tomo['P'][j] - tomo['P'][i]
+    return _correlacao_somas(S, S[..., SXY], n_minimo), S[..., N].astype(np.int64)
+
+
+def mapa_correlacao(tomo, n_minimo=N_MINIMO):
+    """Matriz r[i, j] para todas as janelas i < j da grade (NaN fora disso)."""
+    k = len(tomo['bordas'])
+    i, j = np.triu_indices(k, 1)
+    mapa = np.full((k, k), np.nan)
+    mapa[i, j] = correlacao_janelas(tomo, i, j, n_minimo)[0]
+    return mapa
+
+
+def janelas_deslizantes(n_bordas, largura, passo=1):
+    """Índices (i, j) das janelas de 'largura' bins, deslizando de 'passo' bins."""
+    i = np.arange(0, n_bordas - largura, passo)
+    return i, i + largura
+
+
+def janelas_todas(n_bordas, largura_min=1, largura_max=None):
+    """Todas as janelas com largura (em bins) entre largura_min e largura_max."""
+    i, j = np.triu_indices(n_bordas, 1)
+    largura = j - i
+    manter = (largura >= largura_min) & (largura <= (largura_max or n_bordas))
+    return i[manter], j[manter]
+
+
+# ------------------------------------------------------------------------------
+# Nulo de permutação dentro dos bins
+# ------------------------------------------------------------------------------
+def _nulo_bloco(estado, semente, n_bloco):
+    x, y, inicio = estado['x'], estado['y'], estado['inicio']
+    rng = np.random.default_rng(semente)
+    buffer = np.tile(x, (n_bloco, 1))
+    for a, b in zip(inicio[:-1], inicio[1:]):
+        if b - a > 1:
+            rng.permuted(buffer[:, a:b], axis=1, out=buffer[:, a:b])
+    np.multiply(buffer, y, out=buffer)
+    np.cumsum(buffer, axis=1, out=buffer)
+    P_xy = np.hstack((np.zeros((n_bloco, 1)), buffer))[:, inicio]
+
+    S = estado['S']
+    r = _correlacao_somas(S, P_xy[:, estado['j']] - P_xy[:, estado['i']], estado['n_minimo'])
+    valido = np.isfinite(estado['r_obs'])
+    extremos = (np.abs(r) >= np.abs(estado['r_obs'])) & valido
+    sigma_max = np.nanmax(np.abs(r[:, valido]) * np.sqrt(S[valido, N] - 1), axis=1) if valido.any() \
+        else np.full(n_bloco, np.nan)
+    return np.nansum(r, axis=0), np.nansum(r ** 2, axis=0), extremos.sum(axis=0), sigma_max
+
+
+def _inicializar_worker(estado):
+    _ESTADO_WORKER['estado'] = estado
+
+
+def _nulo_bloco_worker(semente, n_bloco):
+    return _nulo_bloco(_ESTADO_WORKER['estado'], semente, n_bloco)
+
+
+def nulo_janelas(tomo, i, j, n_perm=1000, semente=None, n_workers=1, n_minimo=N_MINIMO,
+                 limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """
+    Nulo de permutação dentro dos bins para as janelas (i, j). Retorna dict
+    com 'r_obs', 'n', 'sigma_local' (= r sqrt(n-1), escala da permutação
+    completa), 'media_nula', 'desvio_nulo', 'sigma_padronizado'
+    ((r - media_nula) / desvio_nulo), 'p_valor' ((k+1)/(N+1), bicaudal),
+    'maximos_nulos' de |sigma_local| entre janelas, 'p_global' e
+    'sigma_global' do maior |sigma_local| (exatos sob o nulo dentro dos bins).
+    """
+    i = np.atleast_1d(np.asarray(i, dtype=np.intp))
+    j = np.atleast_1d(np.asarray(j, dtype=np.intp))
+    r_obs, n = correlacao_janelas(tomo, i, j, n_minimo)
+    estado = {'x': tomo['x'], 'y': tomo['y'], 'inicio': tomo['inicio'], 'i': i, 'j': j,
+              'S': tomo['P'][j] - tomo['P'][i], 'r_obs': r_obs, 'n_minimo': n_minimo}
+
+    # Buffer (k, N) e temporários (k, janelas); o bloco não depende de n_workers
+    bytes_por_perm = 8 * (len(tomo['x']) + 1 + 4 * len(i))
+    bloco = max(1, min(n_perm, int(limite_memoria_mb * 2**20) // bytes_por_perm))
+    tamanhos = [bloco] * (n_perm // bloco) + ([n_perm % bloco] if n_perm % bloco else [])
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(tamanhos))
+    if n_workers <= 1:
+        partes = [_nulo_bloco(estado, s, k) for s, k in zip(sementes, tamanhos)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_inicializar_worker,
+                                 initargs=(estado,)) as pool:
+            partes = list(pool.map(_nulo_bloco_worker, sementes, tamanhos))
+
+    soma = sum(p[0] for p in partes)
+    soma2 = sum(p[1] for p in partes)
+    extremos = sum(p[2] for p in partes)
+    maximos = np.concatenate([p[3] for p in partes])
+    media = soma / n_perm
+    sigma_local = r_obs * np.sqrt(n - 1)
+    p_global = (1 + np.sum(maximos >= np.nanmax(np.abs(sigma_local)))) / (n_perm + 1)
+    desvio = np.sqrt(np.maximum(soma2 / n_perm - media ** 2, 0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sigma_padronizado = (r_obs - media) / desvio
+    return {'r_obs': r_obs, 'n': n, 'sigma_local': sigma_local, 'media_nula': media,
+            'desvio_nulo': desvio, 'sigma_padronizado': sigma_padronizado,
+            'p_valor': (extremos + 1) / (n_perm + 1), 'maximos_nulos': maximos,
+            'p_global': p_global, 'sigma_global': norm.isf(p_global / 2)}
@@ -0,0 +1,147 @@
+"""
+Executor de Varredura de Universos (D0, OMEGA_P) para o Score de Unificação.
+
+Cada componente do erro total declara exatamente de quais constantes
+depende (ex.: SPARC só de A0, Navier-Stokes só de D0). Em uma grade
+(D0, OMEGA_P) cada componente é avaliado uma única vez por combinação
+distinta dessas constantes; a memória persiste entre as passadas de
+refinamento. As avaliações distintas vão para um pool de processos e as
+linhas da tabela (CSV) são gravadas assim que cada ponto fica completo.
+
+Após cada passada a grade é refeita em torno do mínimo com passo menor;
+no fim, um ajuste quadrático local mede a curvatura (Hessiana) do erro.
+"""
+import csv
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# nome: coluna da tabela; funcao(const) -> float; dependencias: atributos de const; peso no total
+Componente = namedtuple('Componente', 'nome funcao dependencias peso')
+
+
+def _avaliar(fabrica, funcao, d0, omega):
+    return funcao(fabrica(d0, omega))
+
+
+def _chave(fabrica, componente, d0, omega, cache_const):
+    const = cache_const.get((d0, omega))
+    if const is None:
+        const = cache_const[(d0, omega)] = fabrica(d0, omega)
+    return (componente.nome,) + tuple(getattr(const, dep) for dep in componente.dependencias)
+
+
+def _refinar(eixo, centro):
+    """Nova grade com o mesmo número de pontos, cobrindo +/- um passo em torno do centro."""
+    if len(eixo) < 2:
+        return eixo
+    passo = np.min(np.diff(np.sort(eixo)))
+    return np.linspace(centro - passo, centro + passo, len(eixo))
+
+
+def curvatura_local(d0s, omegas, erros):
+    """
+    Ajuste quadrático E ~ c + g.x + x^T H x / 2 em torno do mínimo.
+    Retorna (gradiente, Hessiana) nas variáveis que de fato variam.
+    """
+    X = [np.asarray(v, dtype=np.float64) for v in (d0s, omegas) if np.ptp(v) > 0]
+    if not X:
+        return np.empty(0), np.empty((0, 0))
+    i_min = np.argmin(erros)
+    X = [x - x[i_min] for x in X]
+    colunas = [np.ones_like(X[0])] + X
+    pares = [(i, j) for i in range(len(X)) for j in range(i, len(X))]
+    colunas += [X[i] * X[j] * (0.5 if i == j else 1.0) for i, j in pares]
+    coef = np.linalg.lstsq(np.column_stack(colunas), erros, rcond=None)[0]
+
+    grad = coef[1:1 + len(X)]
+    H = np.zeros((len(X), len(X)))
+    for (i, j), c in zip(pares, coef[1 + len(X):]):
+        H[i, j] = H[j, i] = c
+    return grad, H
+
+
+def varrer_universos(componentes, fabrica, d0s, omegas, arquivo_tabela=None,
+                     n_workers=1, refinamentos=0):
+    """
+    Avalia o erro total sum(peso * componente) na grade d0s x omegas.
+
+    fabrica(d0, omega) deve construir as constantes (ex.: TRR_Constants) e
+    ser importável pelos processos filhos. Retorna dict com as linhas
+    (lista de dicts), o mínimo e a curvatura da última passada.
+    """
+    memoria = {}
+    cache_const = {}
+    linhas = []
+    d0s = np.atleast_1d(np.asarray(d0s, dtype=np.float64))
+    omegas = np.atleast_1d(np.asarray(omegas, dtype=np.float64))
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    arquivo = open(arquivo_tabela, 'w', newline='', encoding='utf-8') if arquivo_tabela else None
+    escritor = None
+    if arquivo:
+        campos = ['passada', 'd0', 'omega_p'] + [c.nome for c in componentes] + ['total_error']
+        escritor = csv.DictWriter(arquivo, fieldnames=campos)
+        escritor.writeheader()
+
+    pool = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    try:
+        for passada in range(refinamentos + 1):
+            pontos = [(float(d0), float(om)) for d0 in d0s for om in omegas]
+            chaves = {p: [_chave(fabrica, c, *p, cache_const) for c in componentes] for p in pontos}
+
+            # Pontos que esperam por cada chave ainda não calculada
+            esperando = {}
+            for p, ks in chaves.items():
+                for k, comp in zip(ks, componentes):
+                    if k not in memoria:
+                        esperando.setdefault(k, (comp, p, []))[2].append(p)
+            faltam = {p: sum(k not in memoria for k in ks) for p, ks in chaves.items()}
+
+            def concluir(p):
+                valores = {c.nome: memoria[k] for c, k in zip(componentes, chaves[p])}
+                total = sum(c.peso * valores[c.nome] for c in componentes)
+                linha = dict(passada=passada, d0=p[0], omega_p=p[1], total_error=total, **valores)
+                linhas.append(linha)
+                if escritor:
+                    escritor.writerow(linha)
+                    arquivo.flush()
+
+            for p in pontos:
+                if faltam[p] == 0:
+                    concluir(p)
+
+            def registrar(k, valor):
+                memoria[k] = valor
+                for p in esperando[k][2]:
+                    faltam[p] -= 1
+                    if faltam[p] == 0:
+                        concluir(p)
+
+            if pool is None:
+                for k, (comp, p, _) in esperando.items():
+                    registrar(k, _avaliar(fabrica, comp.funcao, *p))
+            else:
+                futuros = {pool.submit(_avaliar, fabrica, comp.funcao, *p): k
+                           for k, (comp, p, _) in esperando.items()}
+                for futuro in as_completed(futuros):
+                    registrar(futuros[futuro], futuro.result())
+
+            desta = [l for l in linhas if l['passada'] == passada]
+            melhor = min(desta, key=lambda l: l['total_error'])
+            if passada < refinamentos:
+                d0s = _refinar(d0s, melhor['d0'])
+                omegas = _refinar(omegas, melhor['omega_p'])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if arquivo:
+            arquivo.close()
+
+    gradiente, hessiana = curvatura_local([l['d0'] for l in desta], [l['omega_p'] for l in desta],
+                                          np.array([l['total_error'] for l in desta]))
+    return {'linhas': linhas, 'minimo': melhor, 'gradiente': gradiente, 'hessiana': hessiana,
+            'avaliacoes': len(memoria)}
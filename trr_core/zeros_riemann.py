@@ -0,0 +1,295 @@
+"""
+Gerador Local dos Zeros Não-Triviais de Riemann (sem LMFDB / rede).
+
+Z(t) = exp(i*theta(t)) * zeta(1/2 + i*t) é real; seus zeros são as partes
+imaginárias dos zeros na linha crítica. Z é avaliada em lote:
+  - t < LIMIAR_RIEMANN_SIEGEL: Euler-Maclaurin (precisão de máquina);
+  - acima: Riemann-Siegel com as correções C0..C3 (derivadas de Psi via
+    uma série de Chebyshev calculada uma vez).
+
+Os zeros são separados nos intervalos entre pontos de Gram (theta(g_n) = n*pi).
+Entre dois pontos de Gram 'bons' g_a < g_b existem exatamente b - a zeros;
+blocos onde a contagem de trocas de sinal fica curta são amostrados mais
+finamente. As raízes são refinadas em lote (Illinois) e cada bloco de
+alturas é resolvido em um processo.
+
+Os zeros verificados são anexados a uma tabela float64 bruta ('.f64'); um
+JSON ao lado guarda quantos zeros são válidos e o próximo ponto de Gram,
+de modo que uma geração interrompida continua de onde parou. A leitura é
+por memmap (zero-copy).
+"""
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.special import bernoulli, factorial, lambertw
+
+ARQUIVO_ZEROS = 'zeros_riemann.f64'
+LIMIAR_RIEMANN_SIEGEL = 400.0  # Abaixo disso: Euler-Maclaurin
+ORDEM_EULER_MACLAURIN = 12
+TAMANHO_BLOCO_GRAM = 4096  # Intervalos de Gram por tarefa
+PROFUNDIDADE_MAXIMA = 8  # Subdivisões 2^k de um bloco de Gram deficiente
+LIMITE_MEMORIA_MB = 64
+
+# Coeficientes B_2k / (2k)! do resto de Euler-Maclaurin
+_B2K_FATORIAL = bernoulli(2 * ORDEM_EULER_MACLAURIN)[2::2] / factorial(np.arange(2, 2 * ORDEM_EULER_MACLAURIN + 1, 2))
+
+
+def theta_rs(t):
+    """Função theta de Riemann-Siegel (série assintótica, t > ~10)."""
+    t = np.asarray(t, dtype=np.float64)
+    return (t / 2 * np.log(t / (2 * np.pi)) - t / 2 - np.pi / 8
+            + 1 / (48 * t) + 7 / (5760 * t ** 3) + 31 / (80640 * t ** 5))
+
+
+# ------------------------------------------------------------------------------
+# Coeficientes de correção de Riemann-Siegel: Psi(p) e derivadas em [0, 1]
+# ------------------------------------------------------------------------------
+def _psi(p):
+    return np.cos(2 * np.pi * (p * p - p - 1 / 16)) / np.cos(2 * np.pi * p)
+
+
+def _coeficientes_correcao():
+    # Ajuste longe de p = 1/4 e 3/4 (singularidades removíveis, onde o quociente
+    # perde dígitos); grau 22 já atinge a precisão de máquina em Psi
+    p = np.linspace(0, 1, 4001)
+    p = p[(np.abs(p - 0.25) > 0.05) & (np.abs(p - 0.75) > 0.05)]
+    psi = np.polynomial.Chebyshev.fit(p, _psi(p), 22, domain=[0, 1])
+    d = [psi] + [psi.deriv(k) for k in range(1, 10)]
+    pi2, pi4, pi6 = np.pi ** 2, np.pi ** 4, np.pi ** 6
+    return (d[0],
+            -d[3] / (96 * pi2),
+            d[2] / (64 * pi2) + d[6] / (18432 * pi4),
+            -d[1] / (64 * pi2) - d[5] / (3840 * pi4) - d[9] / (5308416 * pi6))
+
+
+_C0, _C1, _C2, _C3 = _coeficientes_correcao()
+
+
+# ------------------------------------------------------------------------------
+# Z(t) em lote
+# ------------------------------------------------------------------------------
+def _z_euler_maclaurin(t):
+    s = 0.5 + 1j * t
+    N = int(t.max() / np.pi) + 20
+    log_n = np.log(np.arange(1, N))
+    soma = np.exp(-np.outer(s, log_n)).sum(axis=1)
+    n_s = np.exp(-s * np.log(N))
+    soma += N * n_s / (s - 1) + 0.5 * n_s
+    termo = s * n_s / N
+    for k, coef in enumerate(_B2K_FATORIAL, start=1):
+        soma += coef * termo
+        termo = termo * (s + 2 * k - 1) * (s + 2 * k) / N ** 2
+    return (np.exp(1j * theta_rs(t)) * soma).real
+
+
+def _z_riemann_siegel(t):
+    a = np.sqrt(t / (2 * np.pi))
+    N = np.floor(a).astype(np.intp)
+    p = a - N
+    n = np.arange(1, N.max() + 1)
+    fase = theta_rs(t)[:, None] - t[:, None] * np.log(n)
+    termos = np.cos(fase, out=fase) / np.sqrt(n)
+    termos[n > N[:, None]] = 0.0
+    w = 1 / a
+    resto = _C0(p) + w * (_C1(p) + w * (_C2(p) + w * _C3(p)))
+    sinal = np.where(N % 2 == 1, 1.0, -1.0)  # (-1)^(N-1)
+    return 2 * termos.sum(axis=1) + sinal * resto / np.sqrt(a)
+
+
+def funcao_z(t, limite_memoria_mb=LIMITE_MEMORIA_MB):
+    """Z(t) de Hardy para um array de alturas t > 0, em blocos limitados em memória."""
+    t = np.asarray(t, dtype=np.float64)
+    forma = t.shape
+    t = t.ravel()
+    z = np.empty_like(t)
+    for metodo, sel in ((_z_euler_maclaurin, t < LIMIAR_RIEMANN_SIEGEL),
+                        (_z_riemann_siegel, t >= LIMIAR_RIEMANN_SIEGEL)):
+        idx = np.flatnonzero(sel)
+        if not idx.size:
+            continue
+        termos = np.sqrt(t[idx].max() / (2 * np.pi)) if metodo is _z_riemann_siegel else t[idx].max() / np.pi
+        k = max(1, int(limite_memoria_mb * 2**20) // (32 * (int(termos) + 16)))
+        for i in range(0, idx.size, k):
+            bloco = idx[i:i + k]
+            z[bloco] = metodo(t[bloco])
+    return z.reshape(forma)
+
+
+# ------------------------------------------------------------------------------
+# Pontos de Gram e busca em blocos
+# ------------------------------------------------------------------------------
+def pontos_gram(n):
+    """g_n com theta(g_n) = n*pi, para n >= -1 (escalar ou array)."""
+    n = np.asarray(n, dtype=np.float64)
+    g = 2 * np.pi * np.exp(1 + lambertw((8 * n + 1) / (8 * np.e)).real)
+    for _ in range(3):  # Newton; theta'(t) ~ log(t/2pi)/2
+        g -= (theta_rs(g) - n * np.pi) / (0.5 * np.log(g / (2 * np.pi)))
+    return g
+
+
+def _gram_bom(n, z):
+    """Lei de Gram: (-1)^n Z(g_n) > 0."""
+    return np.where(np.asarray(n) % 2 == 0, z, -z) > 0
+
+
+def _proximo_gram_bom(n):
+    while not _gram_bom(n, funcao_z(pontos_gram(n))):
+        n += 1
+    return n
+
+
+def _refinar_raizes(a, b, fa, fb, max_iter=100):
+    """Illinois em lote sobre os colchetes [a, b] com troca de sinal."""
+    c = np.full_like(a, np.nan)
+    lado = np.zeros(a.shape, dtype=np.int8)
+    ativos = np.arange(a.size)
+    for _ in range(max_iter):
+        if not ativos.size:
+            break
+        i = ativos
+        ci = (a[i] * fb[i] - b[i] * fa[i]) / (fb[i] - fa[i])
+        fc = funcao_z(ci)
+        tol = np.maximum(1e-11, 16 * np.finfo(np.float64).eps * ci)
+        c[i] = ci
+
+        troca_a = np.sign(fc) == np.sign(fa[i])
+        ia, ib = i[troca_a], i[~troca_a]
+        a[ia], fa[ia] = ci[troca_a], fc[troca_a]
+        fb[ia[lado[ia] == -1]] *= 0.5
+        lado[ia] = -1
+        b[ib], fb[ib] = ci[~troca_a], fc[~troca_a]
+        fa[ib[lado[ib] == 1]] *= 0.5
+        lado[ib] = 1
+        ativos = i[(b[i] - a[i] > tol) & (fc != 0)]
+    return c
+
+
+def _trocas_de_sinal(t, z):
+    k = np.flatnonzero(np.signbit(z[:-1]) != np.signbit(z[1:]))
+    return t[k], t[k + 1], z[k], z[k + 1]
+
+
+def zeros_no_bloco(n0, n1):
+    """
+    Todos os zeros entre os pontos de Gram bons g_n0 e g_n1 (n1 - n0 zeros),
+    ordenados. RuntimeError se a contagem não fechar após PROFUNDIDADE_MAXIMA.
+    """
+    n = np.arange(n0, n1 + 1)
+    g = pontos_gram(n)
+    z = funcao_z(g)
+    bons = np.flatnonzero(_gram_bom(n, z))
+    if bons[0] != 0 or bons[-1] != len(n) - 1:
+        raise ValueError(f"g_{n0} e g_{n1} precisam ser pontos de Gram bons.")
+
+    # Blocos de Gram (entre bons consecutivos) com trocas de sinal faltando
+    trocas = np.concatenate(([0], np.cumsum(np.signbit(z[:-1]) != np.signbit(z[1:]))))
+    deficientes = [(a, b) for a, b in zip(bons[:-1], bons[1:]) if trocas[b] - trocas[a] < b - a]
+
+    grosso = _trocas_de_sinal(g, z)
+    manter = np.ones(len(grosso[0]), dtype=bool)
+    for a, b in deficientes:
+        manter &= ~((grosso[0] >= g[a]) & (grosso[1] <= g[b]))
+    colchetes = [tuple(c[manter] for c in grosso)]
+
+    for a, b in deficientes:
+        for prof in range(1, PROFUNDIDADE_MAXIMA + 1):
+            frac = np.arange(2 ** prof) / 2 ** prof
+            t = np.append((g[a:b, None] + frac * np.diff(g[a:b + 1])[:, None]).ravel(), g[b])
+            bloco = _trocas_de_sinal(t, funcao_z(t))
+            if len(bloco[0]) == b - a:
+                colchetes.append(bloco)
+                break
+        else:
+            raise RuntimeError(f"Zeros faltando entre g_{n0 + a} e g_{n0 + b} (verificação de Gram falhou).")
+
+    a, b, fa, fb = (np.concatenate(c) for c in zip(*colchetes))
+    if len(a) != n1 - n0:
+        raise RuntimeError(f"Contagem inconsistente entre g_{n0} e g_{n1}: {len(a)} != {n1 - n0}.")
+    return np.sort(_refinar_raizes(a, b, fa, fb))
+
+
+# ------------------------------------------------------------------------------
+# Tabela em disco (retomável) e leitura zero-copy
+# ------------------------------------------------------------------------------
+def _arquivo_estado(arquivo):
+    return arquivo + '.json'
+
+
+def _ler_estado(arquivo):
+    """{'zeros': válidos na tabela, 'gram': próximo ponto de Gram bom}."""
+    try:
+        with open(_arquivo_estado(arquivo), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'zeros': 0, 'gram': -1}
+
+
+def _gravar_estado(arquivo, estado):
+    tmp = _arquivo_estado(arquivo) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(tmp, _arquivo_estado(arquivo))
+
+
+def _zeros_bloco_worker(limites):
+    return zeros_no_bloco(*limites)
+
+
+def gerar_zeros(n_zeros, arquivo=ARQUIVO_ZEROS, n_workers=1, tamanho_bloco=TAMANHO_BLOCO_GRAM):
+    """
+    Garante pelo menos n_zeros zeros verificados na tabela, continuando de
+    onde a última geração parou. n_workers=None usa todos os núcleos.
+    Retorna o número de zeros na tabela.
+    """
+    estado = _ler_estado(arquivo)
+    if estado['zeros'] >= n_zeros:
+        return estado['zeros']
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    # Descarta um anexo interrompido antes da atualização do estado
+    with open(arquivo, 'ab') as f:
+        f.truncate(estado['zeros'] * 8)
+
+    pool = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+    try:
+        while estado['zeros'] < n_zeros:
+            n_blocos = min(4 * n_workers, math.ceil((n_zeros - estado['zeros']) / tamanho_bloco))
+            limites = [estado['gram']]
+            for _ in range(n_blocos):
+                limites.append(_proximo_gram_bom(limites[-1] + tamanho_bloco))
+            tarefas = list(zip(limites[:-1], limites[1:]))
+
+            resultados = map(_zeros_bloco_worker, tarefas) if pool is None else pool.map(_zeros_bloco_worker, tarefas)
+            for (_, n1), zeros in zip(tarefas, resultados):
+                with open(arquivo, 'ab') as f:
+                    f.write(zeros.astype('<f8').tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                estado = {'zeros': estado['zeros'] + len(zeros), 'gram': int(n1)}
+                _gravar_estado(arquivo, estado)
+            print(f"Zeros de Riemann: {estado['zeros']} verificados (até t = {zeros[-1]:.2f}).")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return estado['zeros']
+
+
+def carregar_zeros(arquivo=ARQUIVO_ZEROS, n=None):
+    """Os n primeiros zeros da tabela (todos se n=None), em memmap somente-leitura."""
+    disponiveis = _ler_estado(arquivo)['zeros']
+    if n is not None and n > disponiveis:
+        raise ValueError(f"A tabela {arquivo} tem {disponiveis} zeros; pedidos {n} (use gerar_zeros).")
+    n = disponiveis if n is None else n
+    if n == 0:
+        return np.empty(0)
+    return np.memmap(arquivo, dtype='<f8', mode='r', shape=(n,))
+
+
+def zeros_riemann(n, arquivo=ARQUIVO_ZEROS, n_workers=None):
+    """Os n primeiros zeros (gera localmente o que faltar na tabela)."""
+    gerar_zeros(n, arquivo, n_workers=n_workers)
+    return carregar_zeros(arquivo, n)